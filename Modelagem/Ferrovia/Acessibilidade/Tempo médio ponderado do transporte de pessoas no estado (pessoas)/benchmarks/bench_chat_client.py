@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark: ChatClient com Session única x modo concorrente (pool por threads)
+
+Sobe um servidor local que imita o /chat da API proxy (HTTP/1.1 com
+keep-alive, resposta após `--latencia` segundos) e dispara o mesmo lote de
+prompts a partir de um ThreadPoolExecutor com 1, 2, 4, 8 e 16 threads,
+medindo requisições por segundo e quantas conexões TCP o servidor recebeu:
+
+- Session única: o ChatClient padrão, com a Session compartilhada entre as threads;
+- concorrente: ChatClient(concorrencia=threads), Session por thread e um
+  pool keep-alive do tamanho da concorrência.
+
+O pool padrão do requests guarda 10 conexões: acima disso a Session única
+abre conexões novas e descarta as que sobram a cada chamada.
+
+Uso:
+    python benchmarks/bench_chat_client.py --requisicoes 400 --latencia 0.05
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_PROJETO)
+
+from chat_client import ChatClient
+
+PROMPT = "Extraia a demanda anual da proposta Araguari/ Campos Altos (RP 12-33)."
+
+
+class ServidorStub(ThreadingHTTPServer):
+    """Servidor /chat com contagem de conexões recebidas"""
+    
+    daemon_threads = True
+    request_queue_size = 64
+    
+    def __init__(self, latencia):
+        super().__init__(('127.0.0.1', 0), ManipuladorStub)
+        self.latencia = latencia
+        self.conexoes = 0
+        self.lock = threading.Lock()
+
+
+class ManipuladorStub(BaseHTTPRequestHandler):
+    # HTTP/1.1: a conexão fica aberta entre requisições (keep-alive)
+    protocol_version = "HTTP/1.1"
+    
+    def setup(self):
+        super().setup()
+        # Cabeçalho e corpo saem em escritas separadas: sem isso o ACK atrasado soma ~40 ms por chamada
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.conexoes += 1
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.server.latencia)
+        corpo = json.dumps({
+            "sucesso": True,
+            "resposta": '<json>{"Demanda (ano)": "470.930"}</json>',
+            "modelo_usado": payload["modelo"],
+            "tempo_resposta": self.server.latencia,
+            "tokens_gerados": 12,
+            "tokens_prompt": 40
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def medir(client, servidor, threads, requisicoes):
+    """Envia o lote com `threads` threads; retorna (req/s, conexões abertas, erros)"""
+    servidor.conexoes = 0
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        respostas = list(executor.map(lambda _: client.chat(PROMPT, modelo="tinyllama", timeout=30),
+                                      range(requisicoes)))
+    tempo = time.perf_counter() - inicio
+    erros = sum(1 for resposta in respostas if 'erro' in resposta and resposta['erro'])
+    return requisicoes / tempo, servidor.conexoes, erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do ChatClient com várias threads")
+    parser.add_argument("--requisicoes", type=int, default=400, help="Chamadas por medição")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Tempo de resposta do servidor (s)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Níveis de concorrência")
+    args = parser.parse_args()
+    
+    servidor = ServidorStub(args.latencia)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    
+    print(f"🧪 {args.requisicoes} chamadas por medição, latência do servidor {1000 * args.latencia:.0f} ms")
+    for threads in args.threads:
+        unica = medir(ChatClient(base_url), servidor, threads, args.requisicoes)
+        concorrente = medir(ChatClient(base_url, concorrencia=threads), servidor, threads, args.requisicoes)
+        print(f"🧵 {threads} threads: "
+              f"Session única {unica[0]:.0f} req/s ({unica[1]} conexões, {unica[2]} erros), "
+              f"concorrente {concorrente[0]:.0f} req/s ({concorrente[1]} conexões, {concorrente[2]} erros) "
+              f"({concorrente[0] / unica[0]:.2f}x)")
+    
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
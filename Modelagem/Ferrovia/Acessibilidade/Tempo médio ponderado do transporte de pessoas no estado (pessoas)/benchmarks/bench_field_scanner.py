@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark: FieldScanner x regex separadas em extract_structured_data
+
+Compara a implementação anterior de `DataStructureDetector.extract_structured_data`
+(cerca de 20 `re.search` por página, alguns com `.*?` e re.DOTALL sobre o texto
+inteiro) com o `FieldScanner`, que localiza os rótulos uma vez e testa cada
+padrão só nessas posições. Mede as 19 páginas de PARSED_LLM.json, textos no
+formato de rótulos que os padrões reconhecem e um texto longo em que o
+`.*?` com re.DOTALL retrocede, e confere que os resultados são idênticos.
+
+Uso:
+    python benchmarks/bench_field_scanner.py --repeticoes 200
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_PROJETO)
+
+from pdf_processor import DataStructureDetector
+
+# Texto no formato de rótulos esperado pelos padrões (exercita todos os campos)
+TEXTO_ROTULADO = """Código: FER-002
+Categoria: Regional
+Tipo de Empreendimento: Greenfield
+Extensão: 503.5 km
+Tipo de bitola: Métrica
+Total de estações: 8
+1. Araguari - Extensão acumulada: 0 km
+2. Uberlândia - Extensão acumulada: 46.7 km
+Tempo de viagem ida: 551 minutos
+Tempo de viagem ida e volta: 1102 minutos
+Viagens por mês: 27
+Dias de operação por ano: 326
+Demanda por ano: 470.930 passageiros
+Produção quilométrica por ano: 164.307 km
+Classe Econômica: tarifa para o público geral
+Tarifa fixa: R$ 6,98
+Tarifa quilométrica: R$ 0,1447
+Classe Executiva: tarifa diferenciada
+Tarifa fixa: R$ 18,72
+Tarifa quilométrica: R$ 0,2685
+Pass.ano/km: 2,87
+Receita ano/km: R$ 92,24
+"""
+
+# Vários rótulos de classe sem tarifa: o padrão antigo percorre o texto todo a cada rótulo
+TEXTO_LONGO = "Classe Econômica: sem tarifa definida nesta seção\n" * 300
+
+
+class DetectorAntigo:
+    """Reproduz a implementação anterior de extract_structured_data"""
+    
+    def extract_structured_data(self, text):
+        """Extrai dados estruturados usando regex"""
+        data = {}
+        
+        # Extrair código
+        codigo_match = re.search(r'Código:\s*([A-Z0-9-]+)', text, re.IGNORECASE)
+        if codigo_match:
+            data['codigo'] = codigo_match.group(1)
+        
+        # Extrair categoria
+        categoria_match = re.search(r'Categoria:\s*([^\n]+)', text, re.IGNORECASE)
+        if categoria_match:
+            data['categoria'] = categoria_match.group(1).strip()
+        
+        # Extrair tipo de empreendimento
+        tipo_match = re.search(r'Tipo\s+de\s+Empreendimento:\s*([^\n]+)', text, re.IGNORECASE)
+        if tipo_match:
+            data['tipo_empreendimento'] = tipo_match.group(1).strip()
+        
+        # Extrair extensão
+        extensao_match = re.search(r'Extensão:\s*(\d+(?:\.\d+)?)\s*km', text, re.IGNORECASE)
+        if extensao_match:
+            data['extensao_km'] = float(extensao_match.group(1))
+        
+        # Extrair tipo de bitola
+        bitola_match = re.search(r'Tipo\s+de\s+bitola:\s*([^\n]+)', text, re.IGNORECASE)
+        if bitola_match:
+            data['tipo_bitola'] = bitola_match.group(1).strip()
+        
+        # Extrair número de estações
+        estacoes_match = re.search(r'(?:Total\s+de\s+)?estações:\s*(\d+)', text, re.IGNORECASE)
+        if estacoes_match:
+            data['total_estacoes'] = int(estacoes_match.group(1))
+        
+        # Extrair municípios
+        municipios = []
+        municipio_pattern = r'(\d+)\.\s*([^-]+?)\s*-\s*Extensão\s+acumulada:\s*(\d+(?:\.\d+)?)\s*km'
+        for match in re.finditer(municipio_pattern, text, re.IGNORECASE):
+            municipios.append({
+                'ordem': int(match.group(1)),
+                'municipio': match.group(2).strip(),
+                'extensao_acumulada_km': float(match.group(3))
+            })
+        
+        if municipios:
+            data['municipios_atendidos'] = municipios
+        
+        # Extrair características operacionais
+        operacionais = self._extract_operational_data(text)
+        if operacionais:
+            data['caracteristicas_operacionais'] = operacionais
+        
+        # Extrair tarifas
+        tarifas = self._extract_tariff_data(text)
+        if tarifas:
+            data['tarifas'] = tarifas
+        
+        # Extrair desempenho
+        desempenho = self._extract_performance_data(text)
+        if desempenho:
+            data['desempenho'] = desempenho
+        
+        return data
+    
+    def _extract_operational_data(self, text):
+        """Extrai características operacionais"""
+        operacionais = {}
+        
+        # Tempo de viagem ida
+        tempo_ida_match = re.search(r'Tempo\s+de\s+viagem.*?ida.*?:\s*(\d+)\s*minutos', text, re.IGNORECASE)
+        if tempo_ida_match:
+            operacionais['tempo_viagem_ida_min'] = int(tempo_ida_match.group(1))
+        
+        # Tempo de viagem ida e volta
+        tempo_ida_volta_match = re.search(r'Tempo\s+de\s+viagem.*?ida\s+e\s+volta.*?:\s*(\d+)\s*minutos', text, re.IGNORECASE)
+        if tempo_ida_volta_match:
+            operacionais['tempo_viagem_ida_volta_min'] = int(tempo_ida_volta_match.group(1))
+        
+        # Viagens por mês
+        viagens_match = re.search(r'Viagens\s+por\s+mês:\s*(\d+)', text, re.IGNORECASE)
+        if viagens_match:
+            operacionais['viagens_mes'] = int(viagens_match.group(1))
+        
+        # Dias de operação por ano
+        dias_match = re.search(r'Dias\s+de\s+operação\s+por\s+ano:\s*(\d+)', text, re.IGNORECASE)
+        if dias_match:
+            operacionais['dias_operacao_ano'] = int(dias_match.group(1))
+        
+        # Demanda por ano
+        demanda_match = re.search(r'Demanda\s+por\s+ano:\s*([\d.,]+)\s*passageiros', text, re.IGNORECASE)
+        if demanda_match:
+            demanda_str = demanda_match.group(1).replace('.', '').replace(',', '')
+            operacionais['demanda_ano'] = int(demanda_str)
+        
+        # Produção quilométrica
+        producao_match = re.search(r'Produção\s+quilométrica\s+por\s+ano:\s*([\d.,]+)\s*km', text, re.IGNORECASE)
+        if producao_match:
+            producao_str = producao_match.group(1).replace('.', '').replace(',', '')
+            operacionais['producao_quilometrica_km_ano'] = int(producao_str)
+        
+        return operacionais
+    
+    def _extract_tariff_data(self, text):
+        """Extrai dados de tarifas"""
+        tarifas = {}
+        
+        # Tarifa econômica
+        tarifa_eco_fixa = re.search(r'Classe\s+Econômica:.*?Tarifa\s+fixa:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
+        tarifa_eco_km = re.search(r'Classe\s+Econômica:.*?Tarifa\s+quilométrica:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
+        
+        if tarifa_eco_fixa or tarifa_eco_km:
+            tarifas['economica'] = {}
+            if tarifa_eco_fixa:
+                tarifas['economica']['tarifa_fixa_reais'] = float(tarifa_eco_fixa.group(1).replace(',', '.'))
+            if tarifa_eco_km:
+                tarifas['economica']['tarifa_quilometrica_reais'] = float(tarifa_eco_km.group(1).replace(',', '.'))
+        
+        # Tarifa executiva
+        tarifa_exec_fixa = re.search(r'Classe\s+Executiva:.*?Tarifa\s+fixa:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
+        tarifa_exec_km = re.search(r'Classe\s+Executiva:.*?Tarifa\s+quilométrica:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
+        
+        if tarifa_exec_fixa or tarifa_exec_km:
+            tarifas['executiva'] = {}
+            if tarifa_exec_fixa:
+                tarifas['executiva']['tarifa_fixa_reais'] = float(tarifa_exec_fixa.group(1).replace(',', '.'))
+            if tarifa_exec_km:
+                tarifas['executiva']['tarifa_quilometrica_reais'] = float(tarifa_exec_km.group(1).replace(',', '.'))
+        
+        return tarifas
+    
+    def _extract_performance_data(self, text):
+        """Extrai dados de desempenho"""
+        desempenho = {}
+        
+        # Pass.ano/km
+        pass_ano_km_match = re.search(r'Pass\.ano/km:\s*([\d.,]+)', text, re.IGNORECASE)
+        if pass_ano_km_match:
+            desempenho['pass_ano_km'] = float(pass_ano_km_match.group(1).replace('.', '').replace(',', '.'))
+        
+        # Receita ano/km
+        receita_match = re.search(r'Receita\s+ano/km:\s*R\$\s*([\d.,]+)', text, re.IGNORECASE)
+        if receita_match:
+            desempenho['receita_ano_km'] = float(receita_match.group(1).replace('.', '').replace(',', '.'))
+        
+        return desempenho
+
+
+def medir(funcao, textos, repeticoes):
+    """Tempo médio por texto (ms) de `funcao` sobre `textos`"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for texto in textos:
+            funcao(texto)
+    return 1000 * (time.perf_counter() - inicio) / (repeticoes * len(textos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do FieldScanner")
+    parser.add_argument("--repeticoes", type=int, default=200, help="Repetições sobre o conjunto de textos")
+    args = parser.parse_args()
+    
+    with open(os.path.join(PASTA_PROJETO, "PARSED_LLM.json"), encoding="utf-8") as file:
+        paginas = {chave: registro["text"] for chave, registro in json.load(file).items()}
+    
+    antigo = DetectorAntigo()
+    novo = DataStructureDetector(verbose=False)
+    
+    conjuntos = {
+        "PARSED_LLM.json (19 páginas)": list(paginas.values()),
+        "Textos rotulados": [TEXTO_ROTULADO, TEXTO_ROTULADO * 10],
+        "Texto longo (300 rótulos de classe)": [TEXTO_LONGO]
+    }
+    
+    for nome, textos in conjuntos.items():
+        iguais = all(antigo.extract_structured_data(texto) == novo.extract_structured_data(texto) for texto in textos)
+        tempo_antigo = medir(antigo.extract_structured_data, textos, args.repeticoes)
+        tempo_novo = medir(novo.extract_structured_data, textos, args.repeticoes)
+        
+        print(f"📄 {nome}")
+        print(f"🐢 Regex separadas:  {tempo_antigo:.3f} ms/página")
+        print(f"🚀 FieldScanner:     {tempo_novo:.3f} ms/página")
+        print(f"📈 Ganho: {tempo_antigo / tempo_novo:.1f}x")
+        print(f"✅ Resultados idênticos: {iguais}")
+    
+    print("\n📊 Custo por página (PARSED_LLM.json)")
+    for chave, texto in paginas.items():
+        tempo_antigo = medir(antigo.extract_structured_data, [texto], args.repeticoes)
+        tempo_novo = medir(novo.extract_structured_data, [texto], args.repeticoes)
+        print(f"  página {chave}: {len(texto):5d} caracteres | {tempo_antigo:.3f} ms -> {tempo_novo:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark: uma busca `in` por palavra-chave x KeywordMatcher
+
+Compara `KeywordMatcher.find` (uma passada, com contagens, posições e sem
+diferenciar acentos) com as buscas por palavra que ele substituiria, para
+vocabulários de tamanhos crescentes, sobre os textos de PARSED_LLM.json:
+
+- presença: texto.lower() e um `palavra in texto` por palavra, como na
+  triagem do DataStructureDetector e do TextQualityScorer;
+- posições: um laço de `str.find` por palavra, para obter todas as
+  ocorrências, como no contexto de ExtracaoMaximaProcessor.
+
+Para presença com poucas palavras (as 22 do DataStructureDetector) o `in`
+é mais rápido e continua sendo usado; o KeywordMatcher compensa quando são
+precisas posições ou contagens, ou quando o vocabulário passa de ~100 palavras.
+
+Uso:
+    python benchmarks/bench_keyword_matcher.py --repeticoes 100
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+PASTA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA)
+sys.path.insert(0, os.path.join(PASTA, 'old'))
+
+from exemplo_extracao_maxima import ExtracaoMaximaProcessor
+from keyword_matcher import KeywordMatcher
+from pdf_processor import DataStructureDetector
+
+
+def busca_antiga(textos, palavras):
+    for texto in textos:
+        texto_lower = texto.lower()
+        [palavra for palavra in palavras if palavra.lower() in texto_lower]
+
+
+def busca_posicoes(textos, palavras):
+    for texto in textos:
+        texto_lower = texto.lower()
+        posicoes = {}
+        for palavra in palavras:
+            chave = palavra.lower()
+            indice = texto_lower.find(chave)
+            while indice >= 0:
+                posicoes.setdefault(palavra, []).append(indice)
+                indice = texto_lower.find(chave, indice + 1)
+
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    funcao(*args)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do KeywordMatcher")
+    parser.add_argument("--repeticoes", type=int, default=100, help="Vezes que cada texto é processado")
+    args = parser.parse_args()
+    
+    with open(os.path.join(PASTA, 'PARSED_LLM.json'), encoding='utf-8') as file:
+        textos = [registro['text'] for registro in json.load(file).values()]
+    textos = textos * args.repeticoes
+    
+    estrutura = DataStructureDetector(verbose=False).keywords
+    dominios = [palavra for palavras in ExtracaoMaximaProcessor().dominios_especificos.values() for palavra in palavras]
+    # Vocabulário grande: palavras dos próprios textos (nomes de municípios, rótulos, ...)
+    extras = sorted({palavra.lower() for texto in textos[:19] for palavra in re.findall(r'[^\W\d_]{5,}', texto)})
+    
+    vocabularios = {
+        'DataStructureDetector': estrutura,
+        '+ domínios': estrutura + dominios,
+        '+ palavras dos textos': estrutura + dominios + extras
+    }
+    
+    for nome, palavras in vocabularios.items():
+        matcher = KeywordMatcher(palavras)
+        tempo_presenca = medir(busca_antiga, textos, palavras)
+        tempo_posicoes = medir(busca_posicoes, textos, palavras)
+        tempo_novo = medir(lambda: [matcher.find(texto) for texto in textos])
+        print(f"🔎 {nome} ({len(palavras)} palavras): "
+              f"KeywordMatcher {1e6 * tempo_novo / len(textos):.0f} µs/página; "
+              f"in {1e6 * tempo_presenca / len(textos):.0f} µs/página ({tempo_presenca / tempo_novo:.1f}x), "
+              f"str.find {1e6 * tempo_posicoes / len(textos):.0f} µs/página ({tempo_posicoes / tempo_novo:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
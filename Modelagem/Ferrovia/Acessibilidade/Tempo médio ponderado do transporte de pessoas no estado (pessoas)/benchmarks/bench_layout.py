@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark: texto corrido x pares chave/valor pela geometria das palavras
+
+Gera páginas do perfil em duas colunas, extrai o texto com pdfplumber e os
+pares/tabelas com `PDFReader.extract_layout`, e compara o tempo por página e
+o tamanho do contexto que seria enviado ao LLM.
+
+Uso:
+    python benchmarks/bench_layout.py --paginas 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import LayoutExtractor, PDFReader
+from synthetic_pdf import gerar_pdf_perfil_colunas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração por layout")
+    parser.add_argument("--paginas", type=int, default=50, help="Número de páginas do PDF sintético")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = gerar_pdf_perfil_colunas(os.path.join(pasta, "colunas.pdf"), args.paginas)
+        
+        with PDFReader(caminho, verbose=False) as reader:
+            inicio = time.perf_counter()
+            texto = reader.extract_text_pdfplumber(1, args.paginas)
+            tempo_texto = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            layout = reader.extract_layout(1, args.paginas)
+            tempo_layout = time.perf_counter() - inicio
+    
+    chars_texto = sum(page['char_count'] for page in texto) / args.paginas
+    chars_layout = sum(len(LayoutExtractor.to_text(page)) for page in layout) / args.paginas
+    tabelas = layout[0]['tabelas']
+    
+    print(f"📄 Texto corrido:  {1000 * tempo_texto / args.paginas:.1f} ms/página, {chars_texto:.0f} caracteres/página")
+    print(f"📐 Layout:         {1000 * tempo_layout / args.paginas:.1f} ms/página, {chars_layout:.0f} caracteres/página")
+    print(f"🔑 {len(layout[0]['pares'])} pares, {len(tabelas.get('municipios', []))} municípios, "
+          f"{len(tabelas.get('frota', []))} linhas de frota, {len(tabelas.get('tarifas', {}))} classes de tarifa")
+
+
+if __name__ == "__main__":
+    main()
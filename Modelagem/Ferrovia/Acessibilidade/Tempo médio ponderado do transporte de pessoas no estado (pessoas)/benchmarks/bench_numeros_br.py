@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark: conversão de números brasileiros célula a célula x em bloco
+
+Compara `numero_br` aplicado a cada célula (laço em Python) com
+`parse_array`, que fatora a coluna e converte cada valor distinto uma única vez.
+
+Uso:
+    python benchmarks/bench_numeros_br.py --celulas 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numeros_br import numero_br, parse_array
+
+# Valores como aparecem nas fichas e no Extract_Data_PEF.csv
+AMOSTRA = ['470.930', '1.102', '0,1447', '15.155.658', '2,87', 'R$ 8,45', '7.760 passageiros',
+           '36 (km)', 'R$ 5 3.094,19', '2.87', None, '', "['6,98', '18,72']"]
+
+
+def por_celula(valores):
+    resultado = []
+    for valor in valores:
+        try:
+            resultado.append(float(numero_br(valor)))
+        except (TypeError, ValueError):
+            resultado.append(np.nan)
+    return np.array(resultado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da conversão de números brasileiros")
+    parser.add_argument("--celulas", type=int, default=200000, help="Número de células da coluna")
+    args = parser.parse_args()
+    
+    valores = (AMOSTRA * (args.celulas // len(AMOSTRA) + 1))[:args.celulas]
+    
+    inicio = time.perf_counter()
+    antigo = por_celula(valores)
+    tempo_antigo = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    novo, nulos = parse_array(valores)
+    tempo_novo = time.perf_counter() - inicio
+    
+    print(f"🐢 Célula a célula: {tempo_antigo:.2f}s")
+    print(f"🚀 Em bloco:        {tempo_novo:.2f}s")
+    print(f"📈 Ganho: {tempo_antigo / tempo_novo:.1f}x")
+    print(f"✅ Resultados idênticos: {np.array_equal(antigo, novo, equal_nan=True)} ({nulos.sum()} nulos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark: backend pdfminer de passada única x extração página a página
+
+Compara o método antigo (uma chamada a `extract_text(..., page_numbers=[n])`
+por página, que reabre o PDF e percorre a árvore de páginas a cada chamada)
+com `PDFReader.extract_text_pdfminer`, que processa o intervalo em uma única passada.
+
+Uso:
+    python benchmarks/bench_pdfminer.py --paginas 300
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from pdfminer.high_level import extract_text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import PDFReader
+from synthetic_pdf import gerar_pdf_perfis
+
+
+def extrair_pagina_a_pagina(caminho, num_paginas):
+    """Reproduz a implementação anterior de extract_text_pdfminer"""
+    pages = []
+    for page_num in range(num_paginas):
+        text = extract_text(caminho, page_numbers=[page_num])
+        if text and text.strip():
+            pages.append({
+                'page': page_num + 1,
+                'text': text.strip(),
+                'char_count': len(text.strip()),
+                'method': 'pdfminer'
+            })
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do backend pdfminer")
+    parser.add_argument("--paginas", type=int, default=300, help="Número de páginas do PDF sintético")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = gerar_pdf_perfis(os.path.join(pasta, "sintetico.pdf"), args.paginas)
+        print(f"📄 PDF sintético: {args.paginas} páginas ({os.path.getsize(caminho) / 1024:.0f} KB)")
+        
+        inicio = time.perf_counter()
+        antigo = extrair_pagina_a_pagina(caminho, args.paginas)
+        tempo_antigo = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        novo = PDFReader(caminho, verbose=False).extract_text_pdfminer(1, args.paginas)
+        tempo_novo = time.perf_counter() - inicio
+    
+    print(f"🐢 Página a página: {tempo_antigo:.2f}s ({1000 * tempo_antigo / args.paginas:.1f} ms/página)")
+    print(f"🚀 Passada única:   {tempo_novo:.2f}s ({1000 * tempo_novo / args.paginas:.1f} ms/página)")
+    print(f"📈 Ganho: {tempo_antigo / tempo_novo:.1f}x")
+    print(f"✅ Resultados idênticos: {antigo == novo}")
+
+
+if __name__ == "__main__":
+    main()
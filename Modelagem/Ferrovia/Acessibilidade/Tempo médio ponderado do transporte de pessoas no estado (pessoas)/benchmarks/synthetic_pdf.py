@@ -0,0 +1,137 @@
+"""
+📄 Gerador de PDFs sintéticos para benchmarks
+Escreve PDFs mínimos (fonte Helvetica, texto posicionado) sem dependências externas
+"""
+
+from typing import List, Tuple
+
+# Linhas no formato do "Perfil da Proposta" do PEF, usadas para preencher as páginas
+LINHAS_PERFIL = [
+    "Plano Estratégico Ferroviário de Minas Gerais",
+    "Perfil da Proposta da Ferrovia para Transporte de Passageiros",
+    "Proposta: Araguari/ Campos Altos Código: RP 12-33",
+    "Categoria: Proposta Regional Versão: 00",
+    "Características físicas:",
+    "Extensão (km): 503 Tipo bitola: Métrica",
+    "Total de estações: 8",
+    "Características operacionais:",
+    "Tempo de viagem ida (min): 551 Tempo de viagem ida & volta (min): 1.102",
+    "Viagens (mês): 27 Dias de operação (ano): 326",
+    "Demanda (ano): 470.930 Produção quilométrica (km/ano): 164.307",
+    "Desempenho da linha:",
+    "Receita anual (R$): 15.155.658",
+    "Pass,ano/km: 2,87 Receita,ano/km: 92,24",
+]
+
+
+def _escapar(texto: str) -> bytes:
+    texto = texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return texto.encode("cp1252", errors="replace")
+
+
+def gerar_pdf(paginas: List[List[Tuple[float, float, str]]]) -> bytes:
+    """
+    Monta um PDF a partir de uma lista de páginas.
+    
+    Args:
+        paginas: Para cada página, lista de (x, y, texto) em pontos (A4: 595 x 842)
+    
+    Returns:
+        Conteúdo binário do PDF
+    """
+    objetos = []
+    
+    def adicionar(conteudo: bytes) -> int:
+        objetos.append(conteudo)
+        return len(objetos)
+    
+    fonte = adicionar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    id_paginas = adicionar(b"")  # preenchido depois que as páginas existirem
+    
+    filhos = []
+    for itens in paginas:
+        stream = b"BT /F1 10 Tf\n"
+        for x, y, texto in itens:
+            stream += b"1 0 0 1 %.2f %.2f Tm (" % (x, y) + _escapar(texto) + b") Tj\n"
+        stream += b"ET"
+        conteudo = adicionar(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        filhos.append(adicionar(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (id_paginas, fonte, conteudo)
+        ))
+    
+    objetos[id_paginas - 1] = (
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % f for f in filhos) + b"] /Count %d >>" % len(filhos)
+    )
+    catalogo = adicionar(b"<< /Type /Catalog /Pages %d 0 R >>" % id_paginas)
+    
+    saida = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    deslocamentos = []
+    for numero, objeto in enumerate(objetos, 1):
+        deslocamentos.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+    
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for deslocamento in deslocamentos:
+        saida += b"%010d 00000 n \n" % deslocamento
+    saida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, inicio_xref)
+    return saida
+
+
+def gerar_pdf_perfis(caminho: str, num_paginas: int) -> str:
+    """Grava em `caminho` um PDF com `num_paginas` páginas no layout do Perfil da Proposta"""
+    paginas = []
+    for numero in range(1, num_paginas + 1):
+        itens = [(50, 790 - 18 * i, linha) for i, linha in enumerate(LINHAS_PERFIL)]
+        itens.append((290, 40, str(numero)))
+        paginas.append(itens)
+    
+    with open(caminho, "wb") as file:
+        file.write(gerar_pdf(paginas))
+    return caminho
+
+
+# Página do perfil em duas colunas, como no PDF original: (x, texto) por linha
+COLUNAS_PERFIL = [
+    [(50, "Proposta: Belo Horizonte/ Janaúba"), (330, "Código: RP 14-26")],
+    [(50, "Categoria: Proposta Regional"), (330, "Versão: 00")],
+    [(50, "Tipo de empreendimento:")],
+    [(60, "Greenfield")],
+    [(60, "Brownfield (via compartilhada com")],
+    [(60, "operação da carga)")],
+    [(50, "Extensão (km): 665"), (330, "Tipo bitola: Métrica (570,92 km)")],
+    [(50, "Total de estações: 19")],
+    [(50, "Municípios atendidos (extensão acumulado em km):")],
+    [(50, "Belo Horizonte"), (140, "0,00"), (220, "Araçaí"), (300, "132,84"), (390, "Bocaiúva"), (470, "448,11")],
+    [(50, "Santa Luzia"), (140, "23,45"), (220, "Cordisburgo"), (300, "147,95"), (390, "Montes Claros"), (470, "519,00")],
+    [(50, "Vespasiano"), (140, "43,82"), (220, "Curvelo"), (300, "198,66")],
+    [(50, "Tempo de viagem ida (min): 745"), (330, "Tempo de viagem ida & volta (min): 1.490")],
+    [(50, "Viagens (mês): 27"), (330, "Dias de operação (ano): 326")],
+    [(50, "Tarifa do serviço:")],
+    [(50, "Classe Econômica"), (330, "Classe Executiva")],
+    [(50, "6,98"), (100, "Tarifa fixa (R$)"), (330, "18,72"), (380, "Tarifa fixa (R$)")],
+    [(50, "0,1447"), (100, "Tarifa quilométrica (R$)"), (330, "0,2685"), (380, "Tarifa quilométrica (R$)")],
+    [(50, "Receita anual (R$): 22.110.233")],
+    [(50, "Pass,ano/km: 2,95"), (330, "Receita,ano/km: 101,99")],
+    [(50, "Características da frota:")],
+    [(50, "Total de composições: 1"), (330, "Comprimento da composição (m): 256")],
+    [(50, "Tipo carros"), (200, "Quantidade/composição"), (380, "Especificação")],
+    [(50, "Locomotiva"), (240, "1"), (380, "Diesel")],
+    [(50, "Carro de passageiros"), (240, "8")],
+    [(50, "Carros auxiliares"), (240, "2")],
+    [(50, "Capacidade (PAX/viagem): 569")],
+]
+
+
+def gerar_pdf_perfil_colunas(caminho: str, num_paginas: int = 1) -> str:
+    """Grava em `caminho` um PDF com páginas do perfil no layout de duas colunas"""
+    paginas = []
+    for _ in range(num_paginas):
+        paginas.append([
+            (x, 790 - 18 * i, texto) for i, linha in enumerate(COLUNAS_PERFIL) for x, texto in linha
+        ])
+    
+    with open(caminho, "wb") as file:
+        file.write(gerar_pdf(paginas))
+    return caminho
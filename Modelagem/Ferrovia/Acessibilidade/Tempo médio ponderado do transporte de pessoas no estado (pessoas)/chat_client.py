@@ -4,25 +4,530 @@
 Versão atualizada com suporte a timeout configurável
 """
 
+import asyncio
+import hashlib
+import math
+import os
 import requests
 import json
-from typing import Optional, Dict, Any
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # opcional: usado apenas pelo AsyncChatClient
+    httpx = None
+
+# Janela de contexto máxima de cada família de modelos (tokens)
+CONTEXTO_MODELOS = {
+    "tinyllama": 2048,
+    "tinydolphin": 4096,
+    "stablelm2": 4096,
+    "qwen2": 32768,
+    "qwen3": 40960,
+    "deepcoder": 131072,
+    "exaone-deep": 32768
+}
+
+# Janela usada pelo Ollama quando num_ctx não é enviado e o Modelfile não define outra:
+# o que passar disso é cortado sem aviso. Servidores configurados com OLLAMA_CONTEXT_LENGTH
+# (ou versões com outro padrão) pedem OrcamentoPrompt(num_ctx_padrao=...)
+NUM_CTX_PADRAO = 2048
+# Passo usado ao aumentar o num_ctx para um prompt caber na janela real do modelo
+NUM_CTX_PASSO = 2048
+
+class OrcamentoPrompt:
+    """
+    Orçamento de tokens dos prompts enviados ao LLM.
+    
+    Estima os tokens do prompt pelo número de caracteres, com uma razão
+    caracteres/token calibrada por modelo a partir do `tokens_prompt`
+    devolvido pela API, e compara com a janela efetiva (num_ctx) menos a
+    reserva para a resposta. Prompts que não cabem podem ser reduzidos
+    (linhas finais do bloco <contexto>) ou recusados antes do envio.
+    Também acumula os tokens realmente gastos por modelo.
+    
+    A janela máxima de cada modelo vem de CONTEXTO_MODELOS até o ChatClient
+    ler a real (context_length) e o num_ctx do Modelfile no /ollama/show
+    (definir_contexto). Sem num_ctx na chamada nem no Modelfile vale
+    `num_ctx_padrao`, o padrão do servidor Ollama.
+    """
+    
+    # Texto em português nos tokenizadores dos modelos pequenos: ~3,5 caracteres por token
+    CHARS_POR_TOKEN = 3.5
+    # Peso de cada nova medição na calibração (média móvel exponencial)
+    PESO_CALIBRACAO = 0.3
+    # Faixa plausível: fora dela a medição é descartada (ex.: prefixo reaproveitado do cache do Ollama)
+    FAIXA_CALIBRACAO = (1.5, 6.0)
+    CONTEXTO_REGEX = re.compile(r'(<contexto>\s*\n)(.*?)(\n\s*</contexto>)', re.DOTALL)
+    
+    def __init__(self, reserva_resposta: int = 512, margem: float = 0.1,
+                 contextos: Optional[Dict[str, int]] = None, num_ctx_padrao: int = NUM_CTX_PADRAO):
+        """
+        Args:
+            reserva_resposta: Tokens reservados para a resposta quando max_tokens não é informado
+            margem: Fração da janela deixada livre para compensar o erro da estimativa
+            contextos: Janelas máximas por modelo ou família (padrão: CONTEXTO_MODELOS)
+            num_ctx_padrao: Janela do servidor Ollama quando num_ctx não é enviado
+                (padrão: NUM_CTX_PADRAO; ajuste se o servidor usa OLLAMA_CONTEXT_LENGTH)
+        """
+        self.reserva_resposta = reserva_resposta
+        self.margem = margem
+        self.contextos = dict(CONTEXTO_MODELOS if contextos is None else contextos)
+        self.num_ctx_padrao = num_ctx_padrao
+        # num_ctx definido no Modelfile de cada modelo (PARAMETER num_ctx)
+        self.padroes = {}
+        self.chars_por_token = {}
+        self.uso = {}
+        self._lock = threading.Lock()  # registrar é chamado por várias threads no modo concorrente
+    
+    def definir_contexto(self, modelo: str, maximo: Optional[int] = None, num_ctx: Optional[int] = None) -> None:
+        """Registra a janela máxima real do modelo e o num_ctx do seu Modelfile (lidos do /ollama/show)"""
+        with self._lock:
+            if maximo:
+                self.contextos[modelo] = maximo
+            if num_ctx:
+                self.padroes[modelo] = num_ctx
+    
+    def maximo(self, modelo: str) -> Optional[int]:
+        """Janela máxima do modelo (a lida do servidor, senão a da família), None se desconhecida"""
+        return self.contextos.get(modelo) or self.contextos.get(modelo.split(":")[0])
+    
+    def janela(self, modelo: str, num_ctx: Optional[int] = None) -> int:
+        """Janela efetiva do modelo: num_ctx enviado (ou o do Modelfile, ou o padrão do Ollama), limitado ao máximo"""
+        maximo = self.maximo(modelo)
+        efetiva = num_ctx or self.padroes.get(modelo) or self.num_ctx_padrao
+        return min(efetiva, maximo) if maximo else efetiva
+    
+    def num_ctx_necessario(self, prompt: str, modelo: str, max_tokens: Optional[int] = None) -> Optional[int]:
+        """
+        Menor num_ctx (múltiplo de NUM_CTX_PASSO, até a janela máxima do modelo) em que o prompt cabe.
+        
+        Returns:
+            O num_ctx, ou None se a janela máxima do modelo é desconhecida ou não comporta o prompt
+        """
+        maximo = self.maximo(modelo)
+        if not maximo:
+            return None
+        reserva = max_tokens or self.reserva_resposta
+        necessario = math.ceil((self.estimar_tokens(prompt, modelo) + reserva) / (1 - self.margem))
+        num_ctx = min(maximo, -(-necessario // NUM_CTX_PASSO) * NUM_CTX_PASSO)
+        return num_ctx if self.verificar(prompt, modelo, max_tokens, num_ctx)["cabe"] else None
+    
+    def estimar_tokens(self, texto: str, modelo: str) -> int:
+        """Tokens estimados do texto para o modelo"""
+        razao = self.chars_por_token.get(modelo, self.CHARS_POR_TOKEN)
+        return int(-(-len(texto) // razao))
+    
+    def verificar(self, prompt: str, modelo: str, max_tokens: Optional[int] = None,
+                  num_ctx: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compara o prompt com o orçamento do modelo.
+        
+        Returns:
+            dict com 'tokens_estimados', 'limite' (tokens disponíveis para o prompt),
+            'num_ctx', 'cabe' e 'excesso'
+        """
+        janela = self.janela(modelo, num_ctx)
+        reserva = max_tokens or self.reserva_resposta
+        limite = max(0, int(janela * (1 - self.margem)) - reserva)
+        tokens = self.estimar_tokens(prompt, modelo)
+        return {
+            "tokens_estimados": tokens,
+            "limite": limite,
+            "num_ctx": janela,
+            "cabe": tokens <= limite,
+            "excesso": max(0, tokens - limite)
+        }
+    
+    def reduzir(self, prompt: str, modelo: str, limite: int) -> Optional[str]:
+        """
+        Remove linhas do fim do bloco <contexto> até o prompt caber no limite.
+        
+        Returns:
+            O prompt reduzido, ou None se não houver <contexto> ou se nem o
+            prompt sem contexto couber
+        """
+        match = self.CONTEXTO_REGEX.search(prompt)
+        if not match:
+            return None
+        
+        razao = self.chars_por_token.get(modelo, self.CHARS_POR_TOKEN)
+        fixo = len(prompt) - len(match.group(2))
+        disponivel = int(limite * razao) - fixo
+        if disponivel <= 0:
+            return None
+        
+        linhas = match.group(2).split("\n")
+        contexto = []
+        tamanho = 0
+        for linha in linhas:
+            if tamanho + len(linha) + 1 > disponivel:
+                break
+            contexto.append(linha)
+            tamanho += len(linha) + 1
+        if not contexto:
+            return None
+        return prompt[:match.start(2)] + "\n".join(contexto) + prompt[match.end(2):]
+    
+    def registrar(self, modelo: str, prompt: str, resposta: Dict[str, Any]) -> None:
+        """Acumula os tokens gastos e calibra a razão caracteres/token com o tokens_prompt real"""
+        tokens_prompt = resposta.get("tokens_prompt") or 0
+        tokens_gerados = resposta.get("tokens_gerados") or 0
+        
+        with self._lock:
+            uso = self.uso.setdefault(modelo, {"chamadas": 0, "tokens_prompt": 0, "tokens_gerados": 0})
+            uso["chamadas"] += 1
+            uso["tokens_prompt"] += tokens_prompt
+            uso["tokens_gerados"] += tokens_gerados
+            
+            if tokens_prompt:
+                razao = len(prompt) / tokens_prompt
+                minimo, maximo = self.FAIXA_CALIBRACAO
+                if minimo <= razao <= maximo:
+                    atual = self.chars_por_token.get(modelo, self.CHARS_POR_TOKEN)
+                    self.chars_por_token[modelo] = atual + self.PESO_CALIBRACAO * (razao - atual)
+    
+    def resumo(self) -> Dict[str, Any]:
+        """Tokens gastos e razão caracteres/token calibrada de cada modelo"""
+        return {
+            modelo: dict(uso, chars_por_token=round(self.chars_por_token.get(modelo, self.CHARS_POR_TOKEN), 2))
+            for modelo, uso in self.uso.items()
+        }
+
+class PrevisaoTempo:
+    """
+    Prazo de cada chamada a partir da vazão medida de cada modelo.
+    
+    A cada resposta é medido o tempo por token (tokens_gerados e
+    tokens_prompt sobre tempo_resposta, com o prompt pesando PESO_PROMPT de
+    um token gerado) e a média móvel por modelo é atualizada. O prazo de uma
+    chamada é `fator` vezes o tempo previsto para o prompt e a resposta
+    esperada, mais uma folga fixa (carga do modelo, fila). Uma chamada que
+    estoura o prazo é encerrada e aumenta a estimativa do modelo.
+    """
+    
+    PESO_SUAVIZACAO = 0.3
+    # Avaliar um token do prompt custa bem menos que gerar um token (CPU)
+    PESO_PROMPT = 0.1
+    
+    def __init__(self, fator: float = 3.0, folga: float = 30, min_amostras: int = 2):
+        """
+        Args:
+            fator: Múltiplo do tempo previsto tolerado antes de encerrar a chamada
+            folga: Segundos somados ao prazo
+            min_amostras: Respostas medidas antes de o prazo passar a valer
+        """
+        self.fator = fator
+        self.folga = folga
+        self.min_amostras = min_amostras
+        self.segundos_por_token = {}
+        self.tokens_gerados = {}
+        self.amostras = {}
+        self._lock = threading.Lock()
+    
+    def _tokens(self, tokens_prompt: int, tokens_gerados: float) -> float:
+        return tokens_gerados + self.PESO_PROMPT * tokens_prompt
+    
+    def _atualizar(self, medidas: Dict[str, float], modelo: str, valor: float) -> None:
+        atual = medidas.get(modelo)
+        medidas[modelo] = valor if atual is None else atual + self.PESO_SUAVIZACAO * (valor - atual)
+    
+    def prever(self, modelo: str, tokens_prompt: int, max_tokens: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Prazo da próxima chamada ao modelo.
+        
+        Returns:
+            dict com 'previsto' e 'prazo' (segundos) e 'tokens_gerados' esperados,
+            ou None enquanto o modelo tiver menos de `min_amostras` medidas
+        """
+        with self._lock:
+            if self.amostras.get(modelo, 0) < self.min_amostras:
+                return None
+            gerados = self.tokens_gerados[modelo]
+            if max_tokens:
+                gerados = min(gerados, max_tokens)
+            previsto = self.segundos_por_token[modelo] * self._tokens(tokens_prompt, gerados)
+        return {
+            'previsto': round(previsto, 1),
+            'prazo': math.ceil(self.fator * previsto + self.folga),
+            'tokens_gerados': round(gerados)
+        }
+    
+    def registrar(self, modelo: str, tokens_prompt: int, tokens_gerados: int, tempo: float) -> None:
+        """Atualiza a vazão do modelo com uma resposta concluída"""
+        if not tokens_gerados or not tempo or tempo <= 0:
+            return
+        with self._lock:
+            self._atualizar(self.segundos_por_token, modelo, tempo / self._tokens(tokens_prompt or 0, tokens_gerados))
+            self._atualizar(self.tokens_gerados, modelo, tokens_gerados)
+            self.amostras[modelo] = self.amostras.get(modelo, 0) + 1
+    
+    def registrar_estouro(self, modelo: str, tokens_prompt: int, tempo: float) -> None:
+        """Chamada encerrada no prazo: o tempo gasto é um mínimo para a resposta esperada"""
+        with self._lock:
+            if modelo not in self.tokens_gerados:
+                return
+            esperado = self._tokens(tokens_prompt or 0, self.tokens_gerados[modelo])
+            self._atualizar(self.segundos_por_token, modelo, max(tempo / esperado, self.segundos_por_token[modelo]))
+    
+    def resumo(self) -> Dict[str, Any]:
+        """Vazão (tokens/s), resposta média e amostras de cada modelo"""
+        with self._lock:
+            return {
+                modelo: {
+                    'tokens_por_segundo': round(1 / self.segundos_por_token[modelo], 2),
+                    'tokens_gerados': round(self.tokens_gerados[modelo]),
+                    'amostras': self.amostras[modelo]
+                }
+                for modelo in self.amostras
+            }
+
+class FimJSON:
+    """
+    Detecta, durante o streaming, que o bloco JSON pedido ao modelo já fechou.
+    
+    Vale o primeiro `<json>…</json>` ou bloco cercado ```json … ``` fora do
+    raciocínio (`<think>…</think>`); depois dele o restante da geração é
+    descartado, então a conexão pode ser fechada. O texto só é reexaminado
+    quando o token traz um '>' ou um '`', que fecham esses blocos.
+    """
+    
+    THINK_REGEX = re.compile(r'<think>.*?(?:</think>|$)', re.DOTALL)
+    BLOCO_REGEX = re.compile(r'<json>.*?</json>|```json\s.*?```', re.DOTALL | re.IGNORECASE)
+    
+    def __init__(self):
+        self.partes = []
+    
+    def adicionar(self, token: str) -> bool:
+        """Acrescenta o token ao texto; True quando o bloco JSON fechou"""
+        self.partes.append(token)
+        if '>' not in token and '`' not in token:
+            return False
+        texto = self.THINK_REGEX.sub('', ''.join(self.partes))
+        return bool(self.BLOCO_REGEX.search(texto))
+
+class RespostaCache:
+    """
+    Cache persistente (SQLite) das respostas do LLM.
+    
+    A chave é o SHA-256 do nome e do digest do modelo, do prompt enviado,
+    das opções de amostragem (temperature, top_p, top_k, max_tokens,
+    num_ctx) e do ponto de parada da geração (a resposta de um streaming
+    encerrado no </json> não serve para quem pediu a resposta completa):
+    atualizar o modelo com `ollama pull` invalida as respostas antigas.
+    
+    O tamanho total é limitado e as respostas usadas há mais tempo são
+    descartadas primeiro. A conexão é compartilhada entre threads com um lock.
+    """
+    
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'chat_client', 'respostas.sqlite')
+    OPCOES = ("temperature", "top_p", "top_k", "max_tokens", "num_ctx")
+    
+    def __init__(self, path: Optional[str] = None, max_size_mb: int = 256):
+        self.path = str(path or self.DEFAULT_PATH)
+        self.max_size_mb = max_size_mb
+        self.acertos = 0
+        self.faltas = 0
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS respostas ('
+                'chave TEXT PRIMARY KEY, modelo TEXT, resultado TEXT, size INTEGER, last_access REAL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS respostas_last_access ON respostas (last_access)')
+            self._conn.commit()
+        return self._conn
+    
+    @classmethod
+    def chave(cls, payload: Dict[str, Any], digest: str, parada: Optional[str] = None) -> str:
+        """
+        Hash do modelo, digest, prompt e opções de amostragem do payload do /chat
+        
+        Args:
+            parada: Onde a geração é encerrada antes do fim ("json" no
+                streaming com parar_em_json); None para a resposta completa
+        """
+        partes = {"modelo": payload["modelo"], "digest": digest, "prompt": payload["prompt"]}
+        partes.update((opcao, payload.get(opcao)) for opcao in cls.OPCOES)
+        if parada is not None:
+            partes["parada"] = parada
+        return hashlib.sha256(json.dumps(partes, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+    
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Resposta gravada para a chave (None se não houver), contando acerto ou falta"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute('SELECT resultado FROM respostas WHERE chave = ?', (chave,)).fetchone()
+            if row is None:
+                self.faltas += 1
+                return None
+            conn.execute('UPDATE respostas SET last_access = ? WHERE chave = ?', (time.time(), chave))
+            conn.commit()
+            self.acertos += 1
+        return json.loads(row[0])
+    
+    def gravar(self, chave: str, modelo: str, resultado: Dict[str, Any]) -> None:
+        """Grava a resposta e aplica o limite de tamanho"""
+        texto = json.dumps(resultado, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?)',
+                (chave, modelo, texto, len(texto.encode('utf-8')), time.time())
+            )
+            conn.commit()
+            self._evict(conn)
+    
+    def _evict(self, conn):
+        """Descarta as respostas usadas há mais tempo até caber no limite (com folga de 10%)"""
+        limit = self.max_size_mb * 1024 * 1024
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM respostas').fetchone()[0]
+        if total <= limit:
+            return
+        
+        target = total - int(limit * 0.9)
+        freed = 0
+        stale = []
+        for rowid, size in conn.execute('SELECT rowid, size FROM respostas ORDER BY last_access'):
+            stale.append((rowid,))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany('DELETE FROM respostas WHERE rowid = ?', stale)
+        conn.commit()
+    
+    def limpar(self, modelo: Optional[str] = None) -> int:
+        """Remove as respostas de um modelo (ou todas); retorna quantas foram removidas"""
+        with self._lock:
+            conn = self._connect()
+            if modelo is None:
+                removidas = conn.execute('DELETE FROM respostas').rowcount
+            else:
+                removidas = conn.execute('DELETE FROM respostas WHERE modelo = ?', (modelo,)).rowcount
+            conn.commit()
+        return removidas
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """Acertos e faltas desta sessão, número de respostas e tamanho ocupado"""
+        with self._lock:
+            respostas, size = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM respostas'
+            ).fetchone()
+        return {
+            'path': self.path,
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'respostas': respostas,
+            'size_mb': size / (1024 * 1024),
+            'max_size_mb': self.max_size_mb
+        }
+    
+    def fechar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
 
 class ChatClient:
+    """
+    Cliente síncrono da API proxy.
+    
+    Com `concorrencia`, o cliente pode ser usado por várias threads (ex.: um
+    ThreadPoolExecutor que extrai PDFs enquanto o LLM responde): cada thread
+    tem a sua Session, e todas compartilham um único pool de conexões
+    keep-alive com `concorrencia` conexões e uma política de novas tentativas
+    para falhas de conexão e 502/503 do proxy.
     
-    def __init__(self, base_url: str = "http://localhost:8000"):
+        client = ChatClient(concorrencia=4)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            respostas = list(executor.map(lambda prompt: client.chat(prompt, modelo="qwen3:1.7b"), prompts))
+    """
+    
+    # Esperas de 0,5 s, 1 s, 2 s entre as tentativas
+    BACKOFF_TENTATIVAS = 0.5
+    
+    def __init__(self, base_url: str = "http://localhost:8000", orcamento: Optional[OrcamentoPrompt] = None,
+                 cache: Union[bool, RespostaCache, None] = None, concorrencia: Optional[int] = None,
+                 tentativas: int = 2, tempos: Optional[PrevisaoTempo] = None):
+        """
+        Args:
+            base_url: Endereço da API proxy
+            orcamento: Orçamento de tokens (padrão: OrcamentoPrompt())
+            cache: Cache de respostas em disco (True usa o caminho padrão)
+            concorrencia: Threads que usarão o cliente ao mesmo tempo; ativa o
+                modo concorrente (pool de conexões desse tamanho, Session por thread)
+            tentativas: Novas tentativas após falha de conexão ou 502/503 (modo concorrente)
+            tempos: Previsão do prazo de cada chamada (padrão: PrevisaoTempo())
+        """
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
+        # Orçamento de tokens aplicado a todas as chamadas de chat
+        self.orcamento = orcamento or OrcamentoPrompt()
+        # Cache de respostas em disco (opcional): True usa o caminho padrão
+        self.cache = RespostaCache() if cache is True else cache or None
+        self._digests = {}
+        self._digests_lock = threading.Lock()
+        # Janela real e num_ctx do Modelfile por modelo, lidos uma vez do /ollama/show
+        self._contextos = {}
+        self._contextos_lock = threading.Lock()
+        # Vazão medida por modelo: define o prazo de cada chamada
+        self.tempos = tempos or PrevisaoTempo()
+        
+        self.concorrencia = concorrencia
+        self._adaptador = None
+        self._local = threading.local()
+        self._sessao = None
+        if concorrencia:
+            # Timeout de leitura não é repetido: a geração já consumiu o tempo do slot
+            retry = Retry(total=tentativas, connect=tentativas, read=0, status=tentativas,
+                          status_forcelist=(502, 503), allowed_methods=frozenset({"GET", "POST"}),
+                          backoff_factor=self.BACKOFF_TENTATIVAS, raise_on_status=False)
+            # pool_block: uma thread a mais espera uma conexão livre em vez de abrir outra que seria descartada
+            self._adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=concorrencia,
+                                          pool_block=True, max_retries=retry)
+        else:
+            self._sessao = self._nova_sessao()
+    
+    def _nova_sessao(self) -> requests.Session:
+        session = requests.Session()
         
         # Desabilitar proxy para localhost
-        self.session.proxies = {
+        session.proxies = {
             'http': None,
             'https': None
         }
         
         # Configurar trust_env para False para ignorar variáveis de ambiente de proxy
-        self.session.trust_env = False
+        session.trust_env = False
         
+        if self._adaptador is not None:
+            # Todas as Sessions das threads usam o mesmo pool de conexões
+            session.mount('http://', self._adaptador)
+            session.mount('https://', self._adaptador)
+        return session
+    
+    @property
+    def session(self) -> requests.Session:
+        """Session da thread atual no modo concorrente; senão, a Session única do cliente"""
+        if self._sessao is not None:
+            return self._sessao
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._nova_sessao()
+        return session
+    
     def health_check(self) -> Dict[str, Any]:
         """Verifica status da API"""
         try:
@@ -44,31 +549,70 @@ class ChatClient:
             return []
     
     def chat(self, mensagem: str, modelo: str = "tinyllama:latest", 
-             stream: bool = False, timeout: int = 300, **kwargs) -> Dict[str, Any]:
+             stream: bool = False, timeout: int = 300, excesso: str = "reduzir",
+             on_token: Optional[Callable[[str], None]] = None, parar_em_json: bool = True,
+             usar_cache: Optional[bool] = None, **kwargs) -> Dict[str, Any]:
         """
         Conversa com modelo - AGORA COM TIMEOUT CONFIGURÁVEL
         
+        Antes do envio o prompt passa pelo orçamento de tokens (self.orcamento),
+        com a janela real do modelo lida uma vez do servidor (contexto_modelo).
+        Se o prompt não couber na janela padrão e num_ctx não foi informado, o
+        num_ctx enviado é aumentado até a janela máxima do modelo
+        (orcamento['num_ctx_ajustado']); se nem assim couber, é reduzido ou
+        recusado sem chamar a API (código "prompt_excede_contexto"). A
+        resposta traz o orçamento usado em 'orcamento'.
+        
+        Com stream=True os chunks NDJSON do Ollama são lidos à medida que
+        chegam e cada token é repassado a `on_token`. Assim que o bloco
+        <json>…</json> (ou ```json … ```) fecha, a conexão é encerrada e o
+        servidor para de gerar; a resposta traz 'interrompido': True.
+        
+        Com cache (ChatClient(cache=True)), um prompt já respondido pelo mesmo
+        modelo com as mesmas opções volta do disco sem chamar a API. A
+        resposta indica em 'cache' se foi "acerto", "falta" ou "ignorado".
+        
+        Depois de algumas respostas do modelo, o prazo da chamada deixa de ser
+        `timeout` e passa a ser o previsto pela vazão medida (self.tempos) para
+        o prompt e a resposta esperada, vezes um fator. O proxy recebe esse
+        prazo e libera o slot do Ollama ao estourá-lo; a resposta vem com o
+        código "prazo_excedido". O prazo usado fica em orcamento['prazo'].
+        
         Args:
             mensagem: Prompt para o modelo
             modelo: Nome do modelo a usar
             stream: Se usar streaming
             timeout: Timeout em segundos (padrão: 300s = 5min)
-            **kwargs: Parâmetros adicionais (temperature, top_p, etc.)
+            excesso: Prompt acima do orçamento: "reduzir" (corta o fim do
+                bloco <contexto>), "recusar" ou "enviar" (sem verificação)
+            on_token: Função chamada com cada token recebido (só com stream=True)
+            parar_em_json: Encerra a geração quando o bloco JSON fecha (só com stream=True)
+            usar_cache: None usa o cache só com temperature=0 (resposta
+                determinística); True ou False forçam o uso ou não
+            **kwargs: Parâmetros adicionais (temperature, top_p, num_ctx,
+                ajustar_num_ctx=False para não aumentar o num_ctx,
+                prazo_adaptativo=False para usar sempre o timeout, etc.)
         """
+        payload, orcamento = self._preparar(mensagem, modelo, stream, timeout, excesso, kwargs)
+        if payload is None:
+            return orcamento  # prompt recusado pelo orçamento (dict de erro)
+        
+        parada = "json" if stream and parar_em_json else None
+        chave, resultado = self._consultar_cache(payload, usar_cache, parada)
+        if resultado is not None:
+            if stream and on_token:
+                on_token(resultado.get("resposta", ""))
+            return self._resposta_cache(resultado, orcamento)
+        
+        inicio = time.time()
         try:
-            payload = {
-                "modelo": modelo,
-                "prompt": mensagem,
-                "stream": stream,
-                "timeout": timeout,  # Novo parâmetro
-                "temperature": kwargs.get("temperature", 0.7),
-                "top_p": kwargs.get("top_p", 0.9),
-                "top_k": kwargs.get("top_k", 40),
-                "max_tokens": kwargs.get("max_tokens")
-            }
-            
             # Usar timeout maior no cliente para acomodar o timeout do servidor
-            client_timeout = timeout + 30  # 30s extra para comunicação
+            client_timeout = payload["timeout"] + 30  # 30s extra para comunicação
+            
+            if stream:
+                prazo = orcamento["prazo"]["prazo"] if orcamento["prazo"] else None
+                resultado = self._chat_stream(payload, client_timeout, on_token, parar_em_json, prazo)
+                return resultado if "erro" in resultado else self._concluir(resultado, payload, orcamento, chave)
             
             response = self.session.post(
                 f"{self.base_url}/chat",
@@ -77,14 +621,19 @@ class ChatClient:
             )
             response.raise_for_status()
             
-            return response.json()
+            return self._concluir(response.json(), payload, orcamento, chave)
             
         except requests.exceptions.Timeout:
+            if orcamento["prazo"]:
+                return self._prazo_excedido(payload, orcamento, time.time() - inicio)
             return {
                 "erro": f"Timeout: Modelo não respondeu em {timeout}s",
                 "codigo": "timeout"
             }
         except requests.exceptions.RequestException as e:
+            # 504: o proxy encerrou a chamada ao Ollama no prazo enviado
+            if orcamento["prazo"] and getattr(e.response, "status_code", None) == 504:
+                return self._prazo_excedido(payload, orcamento, time.time() - inicio)
             return {
                 "erro": f"Erro de conexão: {str(e)}",
                 "codigo": "conexao"
@@ -95,6 +644,219 @@ class ChatClient:
                 "codigo": "interno"
             }
     
+    def _prazo_excedido(self, payload: Dict[str, Any], orcamento: Dict[str, Any], tempo: float) -> Dict[str, Any]:
+        """Erro da chamada encerrada no prazo previsto; a estimativa do modelo é aumentada"""
+        self.tempos.registrar_estouro(payload["modelo"], orcamento["tokens_estimados"], tempo)
+        prazo = orcamento["prazo"]
+        return {
+            "erro": f"Modelo {payload['modelo']} excedeu o prazo de {prazo['prazo']}s "
+                    f"(previstos {prazo['previsto']}s); chamada encerrada após {tempo:.0f}s",
+            "codigo": "prazo_excedido",
+            "orcamento": orcamento
+        }
+    
+    def _chat_stream(self, payload: Dict[str, Any], timeout: int,
+                     on_token: Optional[Callable[[str], None]], parar_em_json: bool,
+                     prazo: Optional[float] = None) -> Dict[str, Any]:
+        """Lê o NDJSON do /chat chunk a chunk, parando quando o bloco JSON fecha ou o prazo vence"""
+        inicio = time.time()
+        fim_json = FimJSON() if parar_em_json else None
+        partes = []
+        final = {}
+        interrompido = False
+        
+        # Sair do with sem ler o corpo todo fecha a conexão: o proxy cancela a geração no Ollama
+        with self.session.post(f"{self.base_url}/chat", json=payload, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            for linha in response.iter_lines():
+                if not linha:
+                    continue
+                chunk = json.loads(linha)
+                if chunk.get("erro"):
+                    return {"erro": chunk["erro"], "codigo": "stream"}
+                
+                token = chunk.get("response", "")
+                if token:
+                    partes.append(token)
+                    if on_token:
+                        on_token(token)
+                if chunk.get("done"):
+                    final = chunk
+                    break
+                if fim_json and token and fim_json.adicionar(token):
+                    interrompido = True
+                    break
+                if prazo and time.time() - inicio > prazo:
+                    raise requests.exceptions.Timeout(f"Prazo de {prazo}s excedido")
+        
+        return {
+            "sucesso": True,
+            "resposta": "".join(partes),
+            "modelo_usado": payload["modelo"],
+            "tempo_resposta": round(time.time() - inicio, 2),
+            # Sem o chunk final (geração interrompida) cada chunk conta como um token
+            "tokens_gerados": final.get("eval_count", len(partes)),
+            "tokens_prompt": final.get("prompt_eval_count"),
+            "interrompido": interrompido
+        }
+    
+    def _preparar(self, mensagem: str, modelo: str, stream: bool, timeout: int,
+                  excesso: str, kwargs: Dict[str, Any]):
+        """
+        Aplica o orçamento de tokens e monta o payload do /chat.
+        
+        Returns:
+            (payload, orcamento), ou (None, dict de erro) se o prompt foi recusado
+        """
+        self.contexto_modelo(modelo)
+        num_ctx = kwargs.get("num_ctx")
+        orcamento = self.orcamento.verificar(mensagem, modelo, kwargs.get("max_tokens"), num_ctx)
+        orcamento["reduzido"] = False
+        orcamento["num_ctx_ajustado"] = False
+        
+        # Antes de cortar o prompt, usar a janela que o modelo realmente suporta
+        if not orcamento["cabe"] and excesso != "enviar" and num_ctx is None and kwargs.get("ajustar_num_ctx", True):
+            ajustado = self.orcamento.num_ctx_necessario(mensagem, modelo, kwargs.get("max_tokens"))
+            if ajustado is not None:
+                num_ctx = ajustado
+                orcamento = self.orcamento.verificar(mensagem, modelo, kwargs.get("max_tokens"), num_ctx)
+                orcamento["reduzido"] = False
+                orcamento["num_ctx_ajustado"] = True
+        
+        if not orcamento["cabe"] and excesso != "enviar":
+            reduzido = self.orcamento.reduzir(mensagem, modelo, orcamento["limite"]) if excesso == "reduzir" else None
+            if reduzido is None:
+                return None, {
+                    "erro": f"Prompt com ~{orcamento['tokens_estimados']} tokens excede o limite de "
+                            f"{orcamento['limite']} tokens do modelo {modelo} (num_ctx={orcamento['num_ctx']}); "
+                            f"reduza o texto ou aumente num_ctx",
+                    "codigo": "prompt_excede_contexto",
+                    "orcamento": orcamento
+                }
+            tokens_originais = orcamento["tokens_estimados"]
+            mensagem = reduzido
+            orcamento = self.orcamento.verificar(mensagem, modelo, kwargs.get("max_tokens"), num_ctx)
+            orcamento["reduzido"] = True
+            orcamento["num_ctx_ajustado"] = False
+            orcamento["tokens_originais"] = tokens_originais
+        
+        payload = {
+            "modelo": modelo,
+            "prompt": mensagem,
+            "stream": stream,
+            "timeout": timeout,  # Novo parâmetro
+            "temperature": kwargs.get("temperature", 0.7),
+            "top_p": kwargs.get("top_p", 0.9),
+            "top_k": kwargs.get("top_k", 40),
+            "max_tokens": kwargs.get("max_tokens"),
+            "num_ctx": num_ctx
+        }
+        
+        # Prazo pela vazão medida do modelo, nunca acima do timeout pedido
+        prazo = None
+        if kwargs.get("prazo_adaptativo", True):
+            prazo = self.tempos.prever(modelo, orcamento["tokens_estimados"], kwargs.get("max_tokens"))
+        if prazo is not None and prazo["prazo"] < timeout:
+            payload["timeout"] = prazo["prazo"]
+        else:
+            prazo = None
+        orcamento["prazo"] = prazo
+        return payload, orcamento
+    
+    def _concluir(self, resultado: Dict[str, Any], payload: Dict[str, Any], orcamento: Dict[str, Any],
+                  chave: Optional[str] = None) -> Dict[str, Any]:
+        """Registra os tokens gastos e a vazão, grava a resposta no cache e anexa o orçamento"""
+        self.orcamento.registrar(payload["modelo"], payload["prompt"], resultado)
+        if resultado.get("sucesso"):
+            self.tempos.registrar(payload["modelo"], resultado.get("tokens_prompt") or orcamento["tokens_estimados"],
+                                  resultado.get("tokens_gerados"), resultado.get("tempo_resposta"))
+        if chave is not None and resultado.get("sucesso") and not resultado.get("erro"):
+            self.cache.gravar(chave, payload["modelo"], resultado)
+        if self.cache is not None:
+            resultado["cache"] = "falta" if chave is not None else "ignorado"
+        orcamento["tokens_prompt"] = resultado.get("tokens_prompt")
+        orcamento["tokens_gerados"] = resultado.get("tokens_gerados")
+        resultado["orcamento"] = orcamento
+        return resultado
+    
+    def digest_modelo(self, modelo: str) -> Optional[str]:
+        """Digest do modelo instalado no Ollama (memorizado por cliente; None se não encontrado)"""
+        # "tinyllama" é instalado como "tinyllama:latest"
+        nome = modelo if ':' in modelo else f"{modelo}:latest"
+        with self._digests_lock:
+            if nome not in self._digests:
+                dados = self.listar_modelos_detalhado()
+                for item in dados.get("models", []):
+                    self._digests[item["name"]] = item.get("digest")
+                # Modelo ausente também é memorizado; com o servidor fora do ar, tenta de novo depois
+                if "erro" not in dados:
+                    self._digests.setdefault(nome, None)
+            return self._digests.get(nome)
+    
+    def contexto_modelo(self, modelo: str) -> Dict[str, Optional[int]]:
+        """
+        Janela máxima (context_length) e num_ctx do Modelfile do modelo, lidos do /ollama/show.
+        
+        A consulta é feita uma vez por modelo e registrada no orçamento; se o
+        servidor não responder, valem CONTEXTO_MODELOS e o num_ctx_padrao.
+        
+        Returns:
+            dict com 'maximo' e 'num_ctx' (None quando não informados)
+        """
+        with self._contextos_lock:
+            if modelo in self._contextos:
+                return self._contextos[modelo]
+            
+            info = {"maximo": None, "num_ctx": None}
+            try:
+                # "model" nas versões atuais do Ollama, "name" nas anteriores
+                response = self.session.post(f"{self.base_url}/ollama/show",
+                                             json={"model": modelo, "name": modelo}, timeout=15)
+                response.raise_for_status()
+                dados = response.json()
+                for chave, valor in (dados.get("model_info") or {}).items():
+                    if chave.endswith(".context_length") and valor:
+                        info["maximo"] = int(valor)
+                match = re.search(r'^num_ctx\s+(\d+)', dados.get("parameters") or "", re.MULTILINE)
+                if match:
+                    info["num_ctx"] = int(match.group(1))
+            except Exception:
+                pass  # servidor indisponível ou modelo desconhecido: fica a tabela local
+            
+            self._contextos[modelo] = info
+            self.orcamento.definir_contexto(modelo, info["maximo"], info["num_ctx"])
+            return info
+    
+    def _consultar_cache(self, payload: Dict[str, Any], usar_cache: Optional[bool], parada: Optional[str] = None):
+        """
+        Procura a resposta do payload no cache.
+        
+        Respostas completas e respostas cortadas no fim do bloco JSON
+        (`parada`) ficam em chaves diferentes.
+        
+        Returns:
+            (chave, resposta gravada ou None); chave None quando o cache não se aplica
+        """
+        if self.cache is None or usar_cache is False:
+            return None, None
+        if usar_cache is None and payload["temperature"] != 0:
+            return None, None  # amostragem aleatória: a resposta muda a cada chamada
+        
+        digest = self.digest_modelo(payload["modelo"])
+        if digest is None:
+            return None, None  # sem o digest não há como saber se o modelo foi atualizado
+        chave = RespostaCache.chave(payload, digest, parada)
+        return chave, self.cache.obter(chave)
+    
+    @staticmethod
+    def _resposta_cache(resultado: Dict[str, Any], orcamento: Dict[str, Any]) -> Dict[str, Any]:
+        """Resposta vinda do cache: nenhum token gasto nesta chamada"""
+        orcamento["tokens_prompt"] = resultado.get("tokens_prompt")
+        orcamento["tokens_gerados"] = resultado.get("tokens_gerados")
+        resultado["cache"] = "acerto"
+        resultado["orcamento"] = orcamento
+        return resultado
+    
     def baixar_modelo(self, nome_modelo: str, timeout: int = 1800) -> Dict[str, Any]:
         """
         Baixa um modelo do repositório Ollama
@@ -149,6 +911,123 @@ class ChatClient:
         except Exception as e:
             return {"erro": str(e)}
 
+class AsyncChatClient(ChatClient):
+    """
+    Cliente assíncrono para enviar vários prompts de uma vez (httpx).
+    
+    Mantém exatamente `concorrencia` requisições em andamento enquanto houver
+    prompts na fila, reaproveitando as conexões de um pool do httpx, para
+    ocupar todos os slots do Ollama (OLLAMA_NUM_PARALLEL). Os métodos
+    síncronos do ChatClient continuam disponíveis.
+    
+        client = AsyncChatClient(concorrencia=2)
+        respostas = await client.chat_many({pagina: prompt.format(texto) for pagina, texto in paginas.items()},
+                                           modelo="qwen3:1.7b", timeout=600)
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:8000", concorrencia: int = 2,
+                 orcamento: Optional[OrcamentoPrompt] = None, cache: Union[bool, RespostaCache, None] = None,
+                 tempos: Optional[PrevisaoTempo] = None):
+        if httpx is None:
+            raise ImportError("AsyncChatClient requer o httpx: pip install httpx")
+        super().__init__(base_url, orcamento, cache, tempos=tempos)
+        # O pool do httpx é criado por lote em _async_client; os métodos síncronos usam a Session única
+        self.concorrencia = max(1, concorrencia)
+    
+    def _async_client(self, concorrencia: int):
+        """Pool de conexões do tamanho da concorrência, sem proxies do ambiente (como o ChatClient)"""
+        limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+        return httpx.AsyncClient(base_url=self.base_url, limits=limites, trust_env=False)
+    
+    async def _chat_async(self, http, mensagem: str, modelo: str, timeout: int, excesso: str,
+                          kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Uma chamada ao /chat com o cliente httpx do lote (mesmos erros do ChatClient.chat)"""
+        payload, orcamento = self._preparar(mensagem, modelo, False, timeout, excesso, kwargs)
+        if payload is None:
+            return orcamento  # prompt recusado pelo orçamento (dict de erro)
+        
+        # digest_modelo (requests) e o SQLite do cache bloqueiam: rodam fora do loop de eventos
+        chave, resultado = await asyncio.to_thread(self._consultar_cache, payload, kwargs.get("usar_cache"))
+        if resultado is not None:
+            return self._resposta_cache(resultado, orcamento)
+        
+        inicio = time.time()
+        try:
+            response = await http.post("/chat", json=payload, timeout=payload["timeout"] + 30)
+            response.raise_for_status()
+            return await asyncio.to_thread(self._concluir, response.json(), payload, orcamento, chave)
+        except httpx.TimeoutException:
+            if orcamento["prazo"]:
+                return self._prazo_excedido(payload, orcamento, time.time() - inicio)
+            return {
+                "erro": f"Timeout: Modelo não respondeu em {timeout}s",
+                "codigo": "timeout"
+            }
+        except httpx.HTTPError as e:
+            if orcamento["prazo"] and isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 504:
+                return self._prazo_excedido(payload, orcamento, time.time() - inicio)
+            return {
+                "erro": f"Erro de conexão: {str(e)}",
+                "codigo": "conexao"
+            }
+        except Exception as e:
+            return {
+                "erro": f"Erro inesperado: {str(e)}",
+                "codigo": "interno"
+            }
+    
+    async def chat_many(self, prompts: Union[List[str], Dict[Any, str]], modelo: str = "tinyllama:latest",
+                        concorrencia: Optional[int] = None, timeout: int = 300, excesso: str = "reduzir",
+                        **kwargs) -> Union[List[Dict[str, Any]], Dict[Any, Dict[str, Any]]]:
+        """
+        Envia um lote de prompts com concorrência limitada.
+        
+        Args:
+            prompts: Lista de prompts, ou dict {chave: prompt} (ex.: uma faixa
+                de páginas inteira: {209: prompt_209, 211: prompt_211, ...})
+            modelo: Nome do modelo a usar
+            concorrencia: Requisições simultâneas (padrão: self.concorrencia)
+            timeout: Timeout de cada chamada em segundos
+            excesso: Política do orçamento de tokens (ver ChatClient.chat)
+            **kwargs: Parâmetros adicionais (temperature, top_p, num_ctx, usar_cache, etc.)
+        
+        Returns:
+            As respostas na ordem de entrada (lista, ou dict com as mesmas
+            chaves); cada item com erro traz seu próprio {"erro", "codigo"}
+        """
+        chaves = list(prompts) if isinstance(prompts, dict) else None
+        mensagens = [prompts[chave] for chave in chaves] if chaves is not None else list(prompts)
+        concorrencia = max(1, concorrencia or self.concorrencia)
+        resultados = [None] * len(mensagens)
+        proximo = iter(range(len(mensagens)))
+        
+        async def trabalhador(http):
+            # Cada trabalhador pega o próximo prompt assim que termina o anterior
+            for indice in proximo:
+                resultados[indice] = await self._chat_async(http, mensagens[indice], modelo, timeout, excesso, kwargs)
+        
+        # A janela do modelo é lida (requests) uma vez, fora do loop de eventos
+        await asyncio.to_thread(self.contexto_modelo, modelo)
+        async with self._async_client(concorrencia) as http:
+            await asyncio.gather(*(trabalhador(http) for _ in range(min(concorrencia, len(mensagens)))))
+        
+        return dict(zip(chaves, resultados)) if chaves is not None else resultados
+    
+    def chat_many_sync(self, prompts: Union[List[str], Dict[Any, str]], **kwargs):
+        """
+        Versão bloqueante do chat_many para scripts e notebooks.
+        
+        Dentro de um loop de eventos já em execução (Jupyter), o lote roda em
+        uma thread própria; no notebook também é possível usar `await client.chat_many(...)`.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.chat_many(prompts, **kwargs))
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.chat_many(prompts, **kwargs)).result()
+
 # # Função de conveniência para chat rápido
 # def chat_rapido(pergunta: str, modelo: str = "tinyllama:latest", 
 #                 timeout: int = 120) -> str:
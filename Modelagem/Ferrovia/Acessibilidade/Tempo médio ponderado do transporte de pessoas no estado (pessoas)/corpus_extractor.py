@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+📚 Extração incremental de texto de um acervo de PDFs
+
+Percorre uma pasta (ex.: Documents/), extrai todas as páginas de cada PDF com
+o PDFReader em vários processos e grava o resultado em um único banco SQLite:
+
+- files: manifesto com caminho, hash do conteúdo, tamanho, mtime e nº de páginas
+- pages: texto de cada página, indexado por (hash do PDF, método de extração, página)
+
+Ao rodar novamente só os arquivos novos ou alterados são processados.
+Ponteiros do Git LFS (PDFs não baixados) são registrados e ignorados.
+
+Uso:
+    python corpus_extractor.py ../../../../Documents --saida corpus.sqlite --workers 4
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from pdf_processor import PDFReader, PageTextCache, sniff_pdf
+
+
+class CorpusStore:
+    """
+    Banco SQLite com o manifesto dos arquivos e o texto das páginas.
+    
+    As páginas são endereçadas pelo hash do conteúdo e pelo método de
+    extração pedido (--metodo), então cópias do mesmo PDF em pastas
+    diferentes são extraídas e armazenadas uma única vez por método, e
+    extrair com outro método não substitui as páginas que o manifesto ainda
+    usa. Na tabela pages, `method` é a biblioteca que produziu cada página
+    (com 'best' varia por página) e `extraction_method` é o método pedido.
+    """
+    
+    def __init__(self, path):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, pdf_hash TEXT, size INTEGER, mtime_ns INTEGER, '
+            'num_pages INTEGER, method TEXT, status TEXT, error TEXT, processed_at REAL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS files_pdf_hash ON files (pdf_hash)')
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(pages)')]
+        if columns and 'extraction_method' not in columns:
+            self._migrate_pages()
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'pdf_hash TEXT, extraction_method TEXT, page INTEGER, method TEXT, text TEXT, char_count INTEGER, '
+            'quality_score REAL, PRIMARY KEY (pdf_hash, extraction_method, page))'
+        )
+        self.conn.commit()
+    
+    def _migrate_pages(self):
+        """Bancos anteriores (chave sem o método): as páginas ficam com o método do último arquivo extraído"""
+        self.conn.execute('ALTER TABLE pages RENAME TO pages_old')
+        self.conn.execute(
+            'CREATE TABLE pages ('
+            'pdf_hash TEXT, extraction_method TEXT, page INTEGER, method TEXT, text TEXT, char_count INTEGER, '
+            'quality_score REAL, PRIMARY KEY (pdf_hash, extraction_method, page))'
+        )
+        self.conn.execute(
+            'INSERT INTO pages SELECT p.pdf_hash, ('
+            'SELECT f.method FROM files f WHERE f.pdf_hash = p.pdf_hash AND f.status = ? '
+            'ORDER BY f.processed_at DESC LIMIT 1), p.page, p.method, p.text, p.char_count, p.quality_score '
+            'FROM pages_old p', ('ok',)
+        )
+        self.conn.execute('DROP TABLE pages_old')
+        self.conn.commit()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def close(self):
+        self.conn.close()
+    
+    def get_file(self, path):
+        """Entrada do manifesto para o caminho (ou None)"""
+        row = self.conn.execute(
+            'SELECT path, pdf_hash, size, mtime_ns, num_pages, method, status, error, processed_at '
+            'FROM files WHERE path = ?', (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ['path', 'pdf_hash', 'size', 'mtime_ns', 'num_pages', 'method', 'status', 'error', 'processed_at']
+        return dict(zip(keys, row))
+    
+    def has_pages(self, pdf_hash, method):
+        """Indica se as páginas desse conteúdo já foram extraídas com o método"""
+        row = self.conn.execute(
+            'SELECT 1 FROM files WHERE pdf_hash = ? AND method = ? AND status = ? LIMIT 1',
+            (pdf_hash, method, 'ok')
+        ).fetchone()
+        return row is not None
+    
+    def record_file(self, path, pdf_hash, size, mtime_ns, num_pages, method, status, error=None):
+        """Grava (ou substitui) a entrada do manifesto"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (path, pdf_hash, size, mtime_ns, num_pages, method, status, error, time.time())
+        )
+        self.conn.commit()
+    
+    def put_pages(self, pdf_hash, extraction_method, records):
+        """Substitui as páginas de um conteúdo extraídas com o método pelos novos registros"""
+        self.conn.execute('DELETE FROM pages WHERE pdf_hash = ? AND extraction_method = ?',
+                          (pdf_hash, extraction_method))
+        self.conn.executemany(
+            'INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(pdf_hash, extraction_method, record['page'], record['method'], record['text'], record['char_count'],
+              record.get('quality_score')) for record in records]
+        )
+        self.conn.commit()
+    
+    def prune(self, existing_paths, folder=None):
+        """
+        Remove do manifesto os arquivos apagados e as páginas que ficaram sem arquivo.
+        
+        Args:
+            existing_paths: Caminhos absolutos encontrados na pasta percorrida
+            folder: Pasta percorrida; só as entradas dentro dela são removidas
+                (as de outras pastas do mesmo banco não foram verificadas)
+        """
+        paths = [row[0] for row in self.conn.execute('SELECT path FROM files')]
+        if folder is not None:
+            root = os.path.abspath(folder)
+            paths = [path for path in paths if os.path.commonpath([root, path]) == root]
+        removed = [path for path in paths if path not in existing_paths]
+        self.conn.executemany('DELETE FROM files WHERE path = ?', [(path,) for path in removed])
+        self.conn.commit()
+        self.prune_pages()
+        return removed
+    
+    def prune_pages(self):
+        """Remove as páginas de (conteúdo, método) que nenhum arquivo do manifesto usa"""
+        self.conn.execute(
+            'DELETE FROM pages WHERE NOT EXISTS (SELECT 1 FROM files f WHERE f.pdf_hash = pages.pdf_hash '
+            'AND f.method = pages.extraction_method AND f.status = ?)', ('ok',)
+        )
+        self.conn.commit()
+    
+    def get_pages(self, path, start_page=1, end_page=None):
+        """Registros de página de um arquivo do acervo, na ordem das páginas"""
+        end_page = end_page or 2 ** 31
+        rows = self.conn.execute(
+            'SELECT p.page, p.text, p.char_count, p.method, p.quality_score FROM pages p '
+            'JOIN files f ON f.pdf_hash = p.pdf_hash AND f.method = p.extraction_method '
+            'WHERE f.path = ? AND p.page BETWEEN ? AND ? '
+            'ORDER BY p.page', (os.path.abspath(path), start_page, end_page)
+        ).fetchall()
+        return [
+            {'page': page, 'text': text, 'char_count': char_count, 'method': method, 'quality_score': score}
+            for page, text, char_count, method, score in rows
+        ]
+    
+    def search(self, term, limit=50):
+        """Páginas do acervo que contêm o termo: [(caminho, página, trecho), ...]"""
+        rows = self.conn.execute(
+            'SELECT f.path, p.page, p.text FROM pages p '
+            'JOIN files f ON f.pdf_hash = p.pdf_hash AND f.method = p.extraction_method '
+            'WHERE p.text LIKE ? GROUP BY p.pdf_hash, p.page ORDER BY f.path, p.page LIMIT ?',
+            (f'%{term}%', limit)
+        ).fetchall()
+        results = []
+        for path, page, text in rows:
+            position = text.lower().find(term.lower())
+            results.append((path, page, text[max(0, position - 60):position + len(term) + 60]))
+        return results
+    
+    def stats(self):
+        """Totais do acervo por status"""
+        status = dict(self.conn.execute('SELECT status, COUNT(*) FROM files GROUP BY status').fetchall())
+        pages = self.conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        return {'arquivos': status, 'paginas': pages}
+
+
+def find_pdfs(folder):
+    """Lista os PDFs da pasta (recursivo), com caminho absoluto e em ordem"""
+    pdfs = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith('.pdf'):
+                pdfs.append(os.path.abspath(os.path.join(root, name)))
+    return sorted(pdfs)
+
+
+def _extract_file(path, method, cache_path):
+    """Extrai todas as páginas de um PDF (executado nos processos do pool)"""
+    cache = PageTextCache(cache_path) if cache_path else None
+    with PDFReader(path, verbose=False, cache=cache) as reader:
+        records = list(reader.iter_pages(1, reader.get_num_pages(), method=method))
+        return reader.get_num_pages(), records
+
+
+def run(folder, output, workers=1, method='best', cache_path=None, verbose=True):
+    """
+    Extrai o acervo da pasta para o banco `output`, processando só o que mudou.
+    
+    Returns:
+        dict com as contagens de arquivos extraídos, reaproveitados, ignorados e com erro
+    """
+    summary = {'extraidos': 0, 'inalterados': 0, 'reaproveitados': 0, 'lfs': 0, 'erros': 0}
+    pdfs = find_pdfs(folder)
+    
+    with CorpusStore(output) as store:
+        removed = store.prune(set(pdfs), folder)
+        pending = {}
+        
+        for path in pdfs:
+            stat = os.stat(path)
+            entry = store.get_file(path)
+            if (entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+                    and entry['method'] == method and entry['status'] in ('ok', 'lfs_pointer')):
+                summary['inalterados'] += 1
+                continue
+            
+            info = sniff_pdf(path)
+            if info['status'] != 'pdf':
+                status = 'lfs_pointer' if info['status'] == 'lfs_pointer' else 'erro'
+                store.record_file(path, None, stat.st_size, stat.st_mtime_ns, None, method, status, info['motivo'])
+                summary['lfs' if status == 'lfs_pointer' else 'erros'] += 1
+                continue
+            
+            pdf_hash = PageTextCache.compute_hash(path)
+            if store.has_pages(pdf_hash, method):
+                # Mesmo conteúdo já extraído (arquivo tocado ou cópia em outra pasta)
+                num_pages = store.conn.execute(
+                    'SELECT num_pages FROM files WHERE pdf_hash = ? AND method = ? AND status = ? LIMIT 1',
+                    (pdf_hash, method, 'ok')
+                ).fetchone()[0]
+                store.record_file(path, pdf_hash, stat.st_size, stat.st_mtime_ns, num_pages, method, 'ok')
+                summary['reaproveitados'] += 1
+                continue
+            
+            if pdf_hash in {item[0] for item in pending.values()}:
+                # Cópia de um arquivo que já está na fila: reaproveita depois
+                pending[path] = (pdf_hash, stat, True)
+                continue
+            pending[path] = (pdf_hash, stat, False)
+        
+        if verbose:
+            print(f"📚 {len(pdfs)} PDFs em {folder}: {len(pending)} novos ou alterados, "
+                  f"{summary['inalterados']} inalterados, {summary['lfs']} ponteiros LFS")
+            if removed:
+                print(f"🗑️ {len(removed)} arquivos removidos do manifesto")
+        
+        to_extract = [path for path, (_, _, duplicate) in pending.items() if not duplicate]
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(_extract_file, path, method, cache_path): path for path in to_extract}
+            for future in tqdm(as_completed(futures), total=len(futures), desc='Extraindo', disable=not verbose):
+                path = futures[future]
+                pdf_hash, stat, _ = pending[path]
+                try:
+                    num_pages, records = future.result()
+                except Exception as e:
+                    store.record_file(path, pdf_hash, stat.st_size, stat.st_mtime_ns, None, method, 'erro', str(e))
+                    summary['erros'] += 1
+                    if verbose:
+                        print(f"❌ {os.path.basename(path)}: {e}")
+                    continue
+                
+                store.put_pages(pdf_hash, method, records)
+                store.record_file(path, pdf_hash, stat.st_size, stat.st_mtime_ns, num_pages, method, 'ok')
+                summary['extraidos'] += 1
+        
+        for path, (pdf_hash, stat, duplicate) in pending.items():
+            if duplicate:
+                source = store.conn.execute(
+                    'SELECT num_pages, status, error FROM files WHERE pdf_hash = ? AND method = ? AND path != ? LIMIT 1',
+                    (pdf_hash, method, path)
+                ).fetchone()
+                store.record_file(path, pdf_hash, stat.st_size, stat.st_mtime_ns, source[0], method, source[1], source[2])
+                summary['reaproveitados'] += 1
+        
+        # Páginas de outro método que o arquivo reextraído deixou de usar
+        store.prune_pages()
+        
+        if verbose:
+            print(f"✅ Concluído: {summary}")
+            print(f"📊 Acervo: {store.stats()}")
+    
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extração incremental de texto de um acervo de PDFs")
+    parser.add_argument("pasta", help="Pasta com os PDFs (percorrida recursivamente)")
+    parser.add_argument("--saida", default="corpus.sqlite", help="Banco SQLite de saída")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Número de processos")
+    parser.add_argument("--metodo", default="best", choices=["best", "PyPDF2", "pdfplumber", "pdfminer"],
+                        help="Biblioteca de extração ('best' escolhe por página)")
+    parser.add_argument("--cache", default=None,
+                        help="Banco do PageTextCache para reaproveitar extrações anteriores")
+    args = parser.parse_args()
+    
+    run(args.pasta, args.saida, workers=args.workers, method=args.metodo, cache_path=args.cache)
+
+
+if __name__ == "__main__":
+    main()
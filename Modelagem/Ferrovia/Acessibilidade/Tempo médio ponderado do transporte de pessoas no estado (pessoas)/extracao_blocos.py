@@ -0,0 +1,320 @@
+"""
+🧩 Extração em blocos (map-reduce) para textos maiores que a janela do modelo
+
+Capítulos longos (PNL, PSTF) não cabem em um único prompt. O texto é dividido
+em blocos nas quebras de página e de seção, com uma sobreposição de linhas
+entre blocos vizinhos; cada bloco é enviado ao LLM em paralelo (map) e os
+JSONs parciais são combinados campo a campo (reduce):
+
+- listas são unidas sem repetir itens;
+- objetos são combinados recursivamente;
+- valores simples em conflito são decididos por votos entre os blocos (o
+  mesmo número em '470.930' e '470930' conta como o mesmo valor); no empate
+  vale o bloco que aparece primeiro no texto. Os conflitos ficam registrados.
+
+Uso:
+    from chat_client import ChatClient
+    from extracao_blocos import ExtracaoEmBlocos
+    
+    extrator = ExtracaoEmBlocos(ChatClient(), "qwen3:1.7b", concorrencia=2)
+    resultado = extrator.extrair(texto_capitulo, lambda bloco: prompt.format(bloco), timeout=600)
+    resultado["dados"]       # JSON combinado
+    resultado["conflitos"]   # campos com valores diferentes entre blocos
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from numeros_br import numero_br
+from perfil_proposta import PerfilPropostaExtractor
+
+# Pontos de corte, do mais forte para o mais fraco (o nível é o índice na lista)
+QUEBRAS = [
+    # Quebra de página (form feed ou a junção " \n\n " usada no notebook)
+    re.compile(r'\f| \n\n '),
+    # Início de seção: "3.2 Demanda", "D.2 Trens Regionais", "CAPÍTULO 4", linha toda em maiúsculas
+    re.compile(r'\n(?=(?:[A-Z]?\d+(?:\.\d+)*\.?\s+[A-ZÁÉÍÓÚÂÊÔÃÕÇ]|CAP[ÍI]TULO\b|[A-ZÁÉÍÓÚÂÊÔÃÕÇ][A-ZÁÉÍÓÚÂÊÔÃÕÇ \-–]{5,}\n))'),
+    # Parágrafo
+    re.compile(r'\n\s*\n'),
+    # Linha
+    re.compile(r'\n')
+]
+
+# Valores que o modelo devolve quando não preencheu o campo ("value1", "null", ...)
+VAZIO_REGEX = re.compile(r'^\s*(?:value\d*|null|none|n/?a|-+|\.\.\.)?\s*$', re.IGNORECASE)
+
+
+def dividir_texto(texto: str, max_chars: int, sobreposicao: int = 300) -> List[Dict[str, Any]]:
+    """
+    Divide o texto em blocos de até `max_chars` caracteres.
+    
+    O corte é feito na quebra mais forte (página > seção > parágrafo > linha)
+    da segunda metade do bloco; só sem nenhuma delas o texto é cortado no
+    meio. Cada bloco seguinte começa `sobreposicao` caracteres antes do fim
+    do anterior, no início de uma linha, para que um rótulo e seu valor não
+    fiquem separados.
+    
+    Returns:
+        Lista de dicts com 'indice', 'inicio', 'fim' e 'texto'
+    """
+    if max_chars <= 0:
+        raise ValueError(f"max_chars deve ser positivo: {max_chars}")
+    sobreposicao = max(0, min(sobreposicao, max_chars // 2))
+    
+    blocos = []
+    inicio = 0
+    while inicio < len(texto):
+        fim = inicio + max_chars
+        if fim >= len(texto):
+            fim = len(texto)
+        else:
+            fim = _melhor_corte(texto, inicio + max_chars // 2, fim)
+        
+        blocos.append({'indice': len(blocos), 'inicio': inicio, 'fim': fim, 'texto': texto[inicio:fim].strip()})
+        if fim >= len(texto):
+            break
+        
+        proximo = fim - sobreposicao
+        linha = texto.find('\n', proximo, fim)
+        proximo = linha + 1 if sobreposicao and linha >= 0 else fim
+        inicio = max(proximo, inicio + 1)
+    
+    return [bloco for bloco in blocos if bloco['texto']]
+
+
+def _melhor_corte(texto: str, minimo: int, maximo: int) -> int:
+    """Última quebra do nível mais forte entre `minimo` e `maximo` (ou `maximo`)"""
+    for quebra in QUEBRAS:
+        cortes = [match.end() for match in quebra.finditer(texto, minimo, maximo)]
+        if cortes:
+            return cortes[-1]
+    return maximo
+
+
+def _vazio(valor: Any) -> bool:
+    if valor is None or valor == [] or valor == {}:
+        return True
+    return isinstance(valor, str) and bool(VAZIO_REGEX.match(valor))
+
+
+def _chave_voto(valor: Any) -> str:
+    """Forma normalizada usada para contar votos ('470.930' e 470930 são o mesmo valor)"""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return repr(float(valor))
+    if isinstance(valor, str):
+        texto = ' '.join(valor.split()).lower()
+        if re.fullmatch(r'(?:R\$\s*)?-?[\d.,\s]+', texto, re.IGNORECASE):
+            try:
+                return repr(float(numero_br(texto)))
+            except ValueError:
+                pass
+        return texto
+    return json.dumps(valor, ensure_ascii=False, sort_keys=True)
+
+
+def combinar_parciais(parciais: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Combina os JSONs parciais dos blocos campo a campo.
+    
+    Args:
+        parciais: JSON de cada bloco, na ordem do texto (None para blocos sem resposta)
+    
+    Returns:
+        dict com 'dados' (JSON combinado) e 'conflitos' (lista de
+        {'campo', 'escolhido', 'valores': {valor: blocos}})
+    """
+    conflitos = []
+    dados = _combinar([(indice, parcial) for indice, parcial in enumerate(parciais) if isinstance(parcial, dict)],
+                      '', conflitos)
+    return {'dados': dados, 'conflitos': conflitos}
+
+
+def _combinar(valores, caminho, conflitos):
+    """Combina os valores (bloco, valor) de um mesmo campo"""
+    valores = [(bloco, valor) for bloco, valor in valores if not _vazio(valor)]
+    if not valores:
+        return None
+    
+    if all(isinstance(valor, dict) for _, valor in valores):
+        campos = []
+        for _, valor in valores:
+            campos.extend(campo for campo in valor if campo not in campos)
+        return {
+            campo: _combinar([(bloco, valor[campo]) for bloco, valor in valores if campo in valor],
+                             f'{caminho}.{campo}' if caminho else campo, conflitos)
+            for campo in campos
+        }
+    
+    if all(isinstance(valor, list) for _, valor in valores):
+        itens, vistos = [], set()
+        for _, valor in valores:
+            for item in valor:
+                chave = _chave_voto(item)
+                if not _vazio(item) and chave not in vistos:
+                    vistos.add(chave)
+                    itens.append(item)
+        return itens
+    
+    # Valores simples: o mais votado; no empate, o do primeiro bloco
+    votos = {}
+    for bloco, valor in valores:
+        votos.setdefault(_chave_voto(valor), []).append((bloco, valor))
+    ordem = sorted(votos.values(), key=lambda grupo: (-len(grupo), grupo[0][0]))
+    escolhido = ordem[0][0][1]
+    if len(votos) > 1:
+        conflitos.append({
+            'campo': caminho,
+            'escolhido': escolhido,
+            'valores': {json.dumps(grupo[0][1], ensure_ascii=False): [bloco for bloco, _ in grupo] for grupo in ordem}
+        })
+    return escolhido
+
+
+class ExtracaoEmBlocos:
+    """
+    Extração map-reduce: divide o texto, consulta o LLM por bloco em paralelo
+    e combina os JSONs parciais.
+    
+    O tamanho dos blocos sai do orçamento de tokens do ChatClient (janela do
+    modelo menos o prompt sem texto), então cada chamada fica em uma janela
+    pequena e rápida, sem corte silencioso pelo Ollama. Sem `num_ctx`, a
+    janela é escolhida pela janela real do modelo (contexto_modelo): a menor
+    em que cabem o prompt sem texto e `tokens_bloco` tokens de texto, e a
+    mesma janela é enviada em todas as chamadas.
+    """
+    
+    def __init__(self, client, modelo: str, max_chars: Optional[int] = None, sobreposicao: int = 300,
+                 concorrencia: int = 2, num_ctx: Optional[int] = None, tokens_bloco: int = 2048,
+                 verbose: bool = True):
+        """
+        Args:
+            client: ChatClient (ou objeto com o mesmo método chat)
+            modelo: Modelo usado em todos os blocos
+            max_chars: Tamanho máximo do texto de cada bloco (padrão: calculado pelo orçamento)
+            sobreposicao: Caracteres repetidos entre blocos vizinhos
+            concorrencia: Chamadas simultâneas ao LLM (OLLAMA_NUM_PARALLEL do servidor)
+            num_ctx: Janela de contexto enviada ao Ollama (padrão: escolhida por escolher_num_ctx)
+            tokens_bloco: Tokens de texto por bloco usados para escolher o num_ctx
+        """
+        self.client = client
+        self.modelo = modelo
+        self.max_chars = max_chars
+        self.sobreposicao = sobreposicao
+        self.concorrencia = max(1, concorrencia)
+        self.num_ctx = num_ctx
+        self.tokens_bloco = tokens_bloco
+        self.verbose = verbose
+    
+    def _print(self, message):
+        """Print condicional baseado no verbose"""
+        if self.verbose:
+            print(message)
+    
+    def escolher_num_ctx(self, montar_prompt: Callable[[str], str], max_tokens: Optional[int] = None,
+                         texto: Optional[str] = None) -> Optional[int]:
+        """
+        num_ctx das chamadas: o informado, senão a menor janela (até a máxima do
+        modelo) em que cabem o prompt sem texto e `tokens_bloco` tokens do texto.
+        
+        Returns:
+            O num_ctx, ou None se o cliente não tem orçamento de tokens
+        """
+        if self.num_ctx:
+            return self.num_ctx
+        orcamento = getattr(self.client, 'orcamento', None)
+        if orcamento is None:
+            return None
+        
+        # Janela máxima real e num_ctx do Modelfile, lidos uma vez do servidor
+        contexto_modelo = getattr(self.client, 'contexto_modelo', None)
+        if contexto_modelo is not None:
+            contexto_modelo(self.modelo)
+        
+        chars_por_token = orcamento.chars_por_token.get(self.modelo, orcamento.CHARS_POR_TOKEN)
+        chars = int(self.tokens_bloco * chars_por_token)
+        if texto is not None:
+            chars = min(chars, len(texto))
+        amostra = montar_prompt('x' * chars)
+        if orcamento.verificar(amostra, self.modelo, max_tokens)['cabe']:
+            return orcamento.janela(self.modelo)
+        # Sem janela que comporte o bloco desejado, a máxima do modelo dá o maior bloco possível
+        return orcamento.num_ctx_necessario(amostra, self.modelo, max_tokens) or orcamento.maximo(self.modelo)
+    
+    def tamanho_bloco(self, montar_prompt: Callable[[str], str], max_tokens: Optional[int] = None,
+                      num_ctx: Optional[int] = None) -> int:
+        """Caracteres de texto que cabem em um prompt na janela `num_ctx`, pelo orçamento do cliente"""
+        if self.max_chars:
+            return self.max_chars
+        
+        orcamento = getattr(self.client, 'orcamento', None)
+        if orcamento is None:
+            raise ValueError("Informe max_chars: o cliente não tem orçamento de tokens")
+        num_ctx = num_ctx or self.escolher_num_ctx(montar_prompt, max_tokens)
+        vazio = montar_prompt('')
+        verificacao = orcamento.verificar(vazio, self.modelo, max_tokens, num_ctx)
+        disponivel = verificacao['limite'] - verificacao['tokens_estimados']
+        if disponivel <= 0:
+            raise ValueError(f"O prompt sem texto já ocupa o orçamento do modelo {self.modelo} "
+                             f"({verificacao['tokens_estimados']} de {verificacao['limite']} tokens, "
+                             f"num_ctx={verificacao['num_ctx']})")
+        chars_por_token = orcamento.chars_por_token.get(self.modelo, orcamento.CHARS_POR_TOKEN)
+        return int(disponivel * chars_por_token)
+    
+    def _extrair_bloco(self, bloco, montar_prompt, chat_kwargs):
+        """Map: consulta o LLM com o texto de um bloco"""
+        inicio = time.time()
+        resposta = self.client.chat(montar_prompt(bloco['texto']), modelo=self.modelo, **chat_kwargs)
+        parcial = None if 'erro' in resposta else PerfilPropostaExtractor.parse_resposta_json(resposta.get('resposta', ''))
+        info = {
+            'indice': bloco['indice'],
+            'inicio': bloco['inicio'],
+            'fim': bloco['fim'],
+            'chars': len(bloco['texto']),
+            'tempo': round(time.time() - inicio, 2),
+            'erro': resposta.get('erro'),
+            'json_valido': parcial is not None
+        }
+        return parcial, info
+    
+    def extrair(self, texto: str, montar_prompt: Callable[[str], str], **chat_kwargs) -> Dict[str, Any]:
+        """
+        Extrai o JSON de um texto longo.
+        
+        Args:
+            texto: Texto completo (capítulo, seção ou várias páginas)
+            montar_prompt: Função que recebe o texto de um bloco e devolve o prompt
+            **chat_kwargs: Repassados para client.chat (timeout, temperature, ...)
+        
+        Returns:
+            dict com 'dados', 'conflitos', 'blocos' (resumo de cada chamada) e
+            'num_ctx' (janela enviada em todas as chamadas)
+        """
+        # A janela usada para dimensionar os blocos é a mesma enviada em todas as chamadas
+        num_ctx = chat_kwargs.get('num_ctx') or self.escolher_num_ctx(montar_prompt, chat_kwargs.get('max_tokens'), texto)
+        if num_ctx:
+            chat_kwargs['num_ctx'] = num_ctx
+        # Blocos já cabem no orçamento: um excesso indica erro de estimativa, não deve ser cortado
+        chat_kwargs.setdefault('excesso', 'recusar')
+        # Streaming: cada bloco para de gerar assim que o </json> chega
+        chat_kwargs.setdefault('stream', True)
+        
+        max_chars = self.tamanho_bloco(montar_prompt, chat_kwargs.get('max_tokens'), num_ctx)
+        blocos = dividir_texto(texto, max_chars, self.sobreposicao)
+        self._print(f"🧩 {len(texto)} caracteres em {len(blocos)} blocos de até {max_chars} "
+                    f"(num_ctx={num_ctx}, {self.concorrencia} chamadas simultâneas)")
+        
+        with ThreadPoolExecutor(max_workers=self.concorrencia) as executor:
+            resultados = list(executor.map(lambda bloco: self._extrair_bloco(bloco, montar_prompt, chat_kwargs), blocos))
+        
+        parciais = [parcial for parcial, _ in resultados]
+        combinado = combinar_parciais(parciais)
+        combinado['blocos'] = [info for _, info in resultados]
+        combinado['num_ctx'] = num_ctx
+        
+        falhas = sum(1 for info in combinado['blocos'] if not info['json_valido'])
+        self._print(f"✅ {len(blocos) - falhas}/{len(blocos)} blocos com JSON válido, "
+                    f"{len(combinado['conflitos'])} conflitos resolvidos")
+        return combinado
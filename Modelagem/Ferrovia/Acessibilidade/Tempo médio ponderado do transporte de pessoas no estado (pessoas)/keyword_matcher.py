@@ -0,0 +1,175 @@
+"""
+🔎 Busca de várias palavras-chave em uma única passada pelo texto
+
+O KeywordMatcher recebe um ou vários conjuntos de palavras-chave (ex.: os
+vocabulários de domínio do ExtracaoMaximaProcessor), monta uma única árvore
+(trie) com todas elas e devolve, para cada palavra, o número de ocorrências
+e as posições no texto. Para só saber se poucas palavras aparecem (como na
+triagem do DataStructureDetector), `palavra in texto` é mais rápido; veja
+benchmarks/bench_keyword_matcher.py.
+
+A comparação ignora maiúsculas e acentos ('estacao' e 'Estação' são a mesma
+palavra): o texto é convertido para bytes cp1252 (um byte por caractere, o
+que preserva as posições) e normalizado com uma tabela de tradução de 256
+bytes. Palavras curtas (siglas como 'VLT' ou 'ROI') só contam como palavra
+inteira, para não casar dentro de 'ferroviário'.
+
+Uso:
+    from keyword_matcher import KeywordMatcher
+    
+    matcher = KeywordMatcher({'ferroviario': ['estação', 'trem'], 'financeiro': ['receita', 'ROI']})
+    hits = matcher.find(texto)                 # {'estação': [120, 348], 'receita': [512]}
+    matcher.group_counts(hits)                 # {'ferroviario': 1, 'financeiro': 1}
+"""
+
+import re
+import unicodedata
+
+
+def _normalization_table():
+    """Tabela byte -> byte: minúscula e sem acento para cada caractere do cp1252"""
+    table = bytearray(range(256))
+    for code in range(256):
+        char = bytes([code]).decode('cp1252', errors='replace').lower()
+        if len(char) != 1:
+            continue
+        base = unicodedata.normalize('NFD', char)[0]
+        if ord(base) < 128:
+            table[code] = ord(base)
+        else:
+            encoded = char.encode('cp1252', errors='replace')
+            table[code] = encoded[0] if len(encoded) == 1 else code
+    return bytes(table)
+
+
+class KeywordMatcher:
+    """
+    Localiza todas as palavras-chave de um ou mais grupos em uma passada.
+    
+    A trie das palavras é compilada em uma única expressão regular (cada nó
+    vira um grupo de alternativas), executada pelo motor de regex em C sobre o
+    texto normalizado. O texto é percorrido uma vez, da esquerda para a
+    direita: em cada ponto é reconhecida a palavra mais longa que começa ali
+    e a busca continua do fim dela. As palavras contidas nela (ex.:
+    'passageiro' dentro de 'passageiros') são contadas a partir de uma tabela
+    montada na construção; só uma palavra que comece dentro de outra e termine
+    depois dela ficaria de fora (não ocorre nos vocabulários atuais).
+    """
+    
+    TABLE = _normalization_table()
+    
+    def __init__(self, keywords, min_substring=4):
+        """
+        Args:
+            keywords: Lista de palavras ou dict {grupo: [palavras]}
+            min_substring: Palavras mais curtas que isso só casam como palavra inteira
+        """
+        self.groups = dict(keywords) if isinstance(keywords, dict) else {None: list(keywords)}
+        
+        # Forma normalizada -> palavras originais (ex.: 'metro' e 'metrô' viram a mesma chave)
+        self.originals = {}
+        for words in self.groups.values():
+            for word in words:
+                key = self.normalize(word)
+                if word not in self.originals.setdefault(key, []):
+                    self.originals[key].append(word)
+        
+        keys = sorted(self.originals)
+        whole_word = {key for key in keys if len(key) < min_substring}
+        # Para cada palavra reconhecida: ela mesma e as palavras contidas nela,
+        # como (palavra, deslocamento, só palavra inteira)
+        self.candidates = {
+            key: ((key, 0, key in whole_word),) + tuple(
+                (other, offset, other in whole_word)
+                for other in keys if other != key for offset in self._offsets(key, other)
+            )
+            for key in keys
+        }
+        # Palavras sem outras contidas e sem restrição de palavra inteira: caminho direto
+        self.simple = {key for key, candidates in self.candidates.items()
+                       if len(candidates) == 1 and not candidates[0][2]}
+        self.pattern = re.compile(self._trie_pattern(keys)) if keys else None
+    
+    @classmethod
+    def normalize(cls, text):
+        """Texto em bytes, minúsculo e sem acentos, com um byte por caractere"""
+        return text.encode('cp1252', errors='replace').translate(cls.TABLE)
+    
+    @staticmethod
+    def _offsets(text, word):
+        offsets = []
+        index = text.find(word)
+        while index >= 0:
+            offsets.append(index)
+            index = text.find(word, index + 1)
+        return offsets
+    
+    @staticmethod
+    def _trie_pattern(keys):
+        """Expressão regular equivalente à trie das palavras (casa sempre a mais longa)"""
+        trie = {}
+        for key in keys:
+            node = trie
+            for code in key:
+                node = node.setdefault(bytes([code]), {})
+            node[b''] = {}
+        
+        def build(node):
+            alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not alternatives:
+                return b''
+            end = b'' in node
+            if len(alternatives) == 1 and not end:
+                return alternatives[0]
+            group = b'(?:' + b'|'.join(alternatives) + b')'
+            return group + b'?' if end else group
+        
+        return build(trie)
+    
+    @staticmethod
+    def _is_whole_word(normalized, start, end):
+        before = normalized[start - 1:start]
+        after = normalized[end:end + 1]
+        return not before.isalnum() and not after.isalnum()
+    
+    def find(self, text):
+        """
+        Ocorrências de cada palavra no texto.
+        
+        Returns:
+            dict {palavra original: [posições]} só com as palavras encontradas
+        """
+        if not text or self.pattern is None:
+            return {}
+        
+        normalized = self.normalize(text)
+        positions = {}
+        for match in self.pattern.finditer(normalized):
+            key, start = match.group(), match.start()
+            if key in self.simple:
+                positions.setdefault(key, []).append(start)
+                continue
+            for word, offset, whole_word in self.candidates[key]:
+                begin = start + offset
+                if whole_word and not self._is_whole_word(normalized, begin, begin + len(word)):
+                    continue
+                positions.setdefault(word, []).append(begin)
+        
+        hits = {}
+        for key, offsets in positions.items():
+            for word in self.originals[key]:
+                hits[word] = sorted(offsets)
+        return hits
+    
+    @staticmethod
+    def counts(hits):
+        """Número de ocorrências de cada palavra encontrada"""
+        return {word: len(offsets) for word, offsets in hits.items()}
+    
+    def found(self, hits, group=None):
+        """Palavras do grupo presentes no texto, na ordem em que foram cadastradas"""
+        return [word for word in self.groups[group] if word in hits]
+    
+    def group_counts(self, hits):
+        """Quantidade de palavras distintas de cada grupo presentes no texto"""
+        return {group: len(self.found(hits, group)) for group in self.groups}
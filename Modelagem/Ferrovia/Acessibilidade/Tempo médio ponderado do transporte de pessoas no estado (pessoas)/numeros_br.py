@@ -0,0 +1,182 @@
+"""
+🔢 Conversão de números no formato brasileiro
+
+Valores como '470.930', '1.102', '0,1447', '15.155.658', '2,87', 'R$ 8,45',
+'7.760 passageiros' ou '36 (km)' são convertidos para número com as mesmas
+regras em todo o projeto:
+
+- com vírgula: pontos são separadores de milhar e a vírgula é o decimal;
+- sem vírgula, grupos de 3 dígitos após pontos ('1.102', '15.155.658'): milhar;
+- sem vírgula e com um único ponto fora desse padrão ('2.87', '0.1447'): decimal;
+- prefixo de moeda, unidades e texto ao redor são ignorados (vale o primeiro número);
+- espaço como separador de milhar só antes de exatamente três dígitos ('9 967 663,00');
+- espaços de quebras do PDF dentro de um valor completo com milhar e vírgula
+  ('R$ 5 3.094,19', 'R$ 7 .707.015,67') são removidos;
+- formatos ambíguos ou misturados ('1,234.56', '12.34,5', '1.2.3', '.5') levantam ValueError
+  em vez de virar um número errado; números separados por espaço ('551 1.102',
+  '8 12,5') não são juntados: vale o primeiro.
+
+Uso:
+    from numeros_br import numero_br, parse_series, normalizar_colunas
+    
+    numero_br('15.155.658', int)                 # 15155658
+    parse_series(df['Pass.ano/km'])              # Float64, <NA> onde não há número
+    df = normalizar_colunas(df)                  # colunas numéricas tipadas
+"""
+
+import numbers
+import re
+
+import numpy as np
+import pandas as pd
+
+# Primeiro número do texto, que não pode começar nem terminar colado a outro dígito ou
+# separador ('.5', '1,234.56'). Espaços internos só em três casos, para não juntar números
+# distintos: milhar antes de exatamente três dígitos ('9 967 663,00'), antes do ponto
+# ('7 .707.015,67') e dígitos partidos pelo PDF em um valor com milhar e vírgula ('5 3.094,19')
+NUMERO_PATTERN = (
+    r'(?<![\d.,])-?'
+    r'(?:(?:\d \d{1,2}|\d{2} \d)(?=(?:\.\d{3})+,\d)|\d+(?: \d{3}(?!\d))*)'
+    r'(?: ?\.\d+)*(?:,\d+)?(?![\d]|[.,]\d)'
+)
+NUMERO_REGEX = re.compile(NUMERO_PATTERN)
+MILHAR_REGEX = re.compile(r'-?\d{1,3}(?:\.\d{3})+')
+# Célula "numérica" para a detecção de colunas: começa pelo número (após um R$ opcional)
+CELULA_NUMERICA_PATTERN = r'\s*(?:R\$\s*)?' + NUMERO_PATTERN
+
+
+def _normalizar(numero):
+    """
+    Converte o número já isolado ('470.930', '2,87') para o formato do Python
+    
+    Raises:
+        ValueError: Se os pontos não formam grupos de milhar nem um único decimal ('12.34,5', '1.2.3')
+    """
+    numero = numero.replace(' ', '')
+    if ',' in numero:
+        inteiro, decimal = numero.split(',')
+        if '.' in inteiro and not MILHAR_REGEX.fullmatch(inteiro):
+            raise ValueError(f"Número ambíguo: {numero!r}")
+        return inteiro.replace('.', '') + '.' + decimal
+    if MILHAR_REGEX.fullmatch(numero):
+        return numero.replace('.', '')
+    if numero.count('.') > 1:
+        raise ValueError(f"Número ambíguo: {numero!r}")
+    return numero
+
+
+def numero_br(texto, tipo=float):
+    """
+    Converte um valor no formato brasileiro para número.
+    
+    Args:
+        texto: Texto com o número (ou um número, devolvido como está)
+        tipo: float ou int; com int, valores inteiros são devolvidos como int
+    
+    Raises:
+        ValueError: Se o texto não contém número ou se o formato é ambíguo
+    """
+    if isinstance(texto, numbers.Number) and not isinstance(texto, bool):
+        valor = float(texto)
+        if np.isnan(valor):
+            raise ValueError("Valor vazio (NaN)")
+    else:
+        texto = str(texto)
+        match = NUMERO_REGEX.search(texto)
+        if not match or texto.lstrip().startswith('['):
+            raise ValueError(f"Número não encontrado: {texto!r}")
+        valor = float(_normalizar(match.group(0)))
+    return int(valor) if tipo is int and valor.is_integer() else valor
+
+
+def _converter_unicos(unicos):
+    """Converte os valores distintos de uma coluna (NaN onde não há número)"""
+    resultado = np.empty(len(unicos), dtype='float64')
+    for index, valor in enumerate(unicos):
+        try:
+            resultado[index] = numero_br(valor)
+        except ValueError:
+            resultado[index] = np.nan
+    return resultado
+
+
+def parse_array(valores):
+    """
+    Converte um array/lista de valores em bloco.
+    
+    Colunas já numéricas são convertidas direto pelo NumPy. Nas demais os
+    valores são fatorados (pd.factorize, em C): cada valor distinto é
+    convertido uma única vez e o resultado é espalhado pelos códigos com
+    indexação do NumPy. Colunas de fichas repetem muito os mesmos valores
+    ('6,98', '326', '27'), então o custo cai de uma conversão por célula para
+    uma por valor distinto.
+    
+    Células que já são números são mantidas; textos passam pelas regras do
+    formato brasileiro; listas ('[1, 4, 2]'), vazios e textos sem número viram NaN.
+    
+    Returns:
+        (valores, nulos): np.ndarray float64 e a máscara booleana das células sem número
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype='object')
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        resultado = serie.to_numpy(dtype='float64', na_value=np.nan)
+        return resultado, np.isnan(resultado)
+    
+    codigos, unicos = pd.factorize(serie.astype('object'), use_na_sentinel=True)
+    convertidos = np.append(_converter_unicos(unicos), np.nan)
+    # Código -1 (vazio) aponta para o NaN acrescentado no fim
+    resultado = convertidos[codigos]
+    return resultado, np.isnan(resultado)
+
+
+def parse_series(valores, tipo=float):
+    """
+    Converte uma coluna inteira para um tipo numérico anulável do pandas.
+    
+    Args:
+        valores: pd.Series, lista ou array
+        tipo: float (Float64) ou int (Int64; valores com decimais ficam <NA>)
+    
+    Returns:
+        pd.Series Float64/Int64 com o mesmo índice, <NA> onde não há número
+    """
+    resultado, nulos = parse_array(valores)
+    indice = valores.index if isinstance(valores, pd.Series) else None
+    nome = valores.name if isinstance(valores, pd.Series) else None
+    
+    if tipo is int:
+        inteiros = ~nulos & (resultado == np.floor(np.where(nulos, 0, resultado)))
+        serie = pd.array(np.where(inteiros, resultado, 0).astype('int64'), dtype='Int64')
+        serie[~inteiros] = pd.NA
+        return pd.Series(serie, index=indice, name=nome)
+    
+    serie = pd.array(resultado, dtype='Float64')
+    serie[nulos] = pd.NA
+    return pd.Series(serie, index=indice, name=nome)
+
+
+def normalizar_colunas(df, colunas=None, minimo=0.8):
+    """
+    Converte as colunas numéricas de um DataFrame (ex.: Extract_Data_PEF.csv lido como texto).
+    
+    Args:
+        df: DataFrame de entrada (não é alterado)
+        colunas: Colunas a converter; None detecta as colunas em que ao menos
+            `minimo` das células preenchidas começam por um número
+        minimo: Fração mínima de células numéricas para a detecção automática
+    
+    Returns:
+        Novo DataFrame com as colunas convertidas (Int64 se todas forem inteiras, senão Float64)
+    """
+    df = df.copy()
+    for coluna in (colunas if colunas is not None else df.columns):
+        valores, nulos = parse_array(df[coluna])
+        if colunas is None:
+            # Códigos e textos com números no meio ('RP 12-33', 'Classe Econômica: 6,98') não contam
+            preenchidas = df[coluna].notna()
+            numericas = df[coluna].astype('string').str.match(CELULA_NUMERICA_PATTERN).fillna(False)
+            if not preenchidas.any() or (numericas & preenchidas).sum() < minimo * preenchidas.sum():
+                continue
+        inteiros = bool(np.all(valores[~nulos] == np.floor(valores[~nulos])))
+        df[coluna] = parse_series(df[coluna], int if inteiros else float)
+    return df
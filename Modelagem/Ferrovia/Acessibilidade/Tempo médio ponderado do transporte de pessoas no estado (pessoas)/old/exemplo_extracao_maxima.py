@@ -4,8 +4,111 @@ Exemplo de como usar o prompt para extrair dados tabulares de strings
 """
 
 import json
+import os
 import re
-from typing import Dict, List, Any, Optional
+import sys
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable, Dict, List, Any, Optional
+
+
+@dataclass
+class OcorrenciaRegex:
+    """
+    Match de um padrão regex.
+    
+    A maioria dos matches (nomes próprios, intervalos) nunca chega à saída,
+    então o recorte de texto ao redor de cada um só é feito no primeiro
+    acesso a `contexto` e fica guardado na ocorrência.
+    """
+    
+    valor: str
+    grupos: tuple
+    posicao_inicio: int
+    posicao_fim: int
+    confianca: float
+    texto: str = field(repr=False, compare=False)
+    extrair_contexto: Callable[[str, int, int], str] = field(repr=False, compare=False)
+    
+    @cached_property
+    def contexto(self) -> str:
+        return self.extrair_contexto(self.texto, self.posicao_inicio, self.posicao_fim)
+
+
+class IndiceOcorrencias:
+    """
+    Índice dos matches regex ordenados pela posição no texto.
+    
+    Cada padrão guarda as posições de início em ordem (o finditer já as
+    devolve assim) e o índice geral junta todos os padrões em uma única lista
+    ordenada. As consultas "vizinho mais próximo" e "dentro de N caracteres"
+    usam busca binária (bisect): O(log n) para localizar, mais os itens devolvidos.
+    """
+    
+    def __init__(self, regex_dados: Dict[str, List[OcorrenciaRegex]]):
+        self.itens = {nome: list(itens) for nome, itens in regex_dados.items()}
+        self.inicios = {nome: [item.posicao_inicio for item in itens] for nome, itens in self.itens.items()}
+        todos = sorted(
+            (item.posicao_inicio, nome, indice)
+            for nome, itens in self.itens.items() for indice, item in enumerate(itens)
+        )
+        self.inicios_gerais = [inicio for inicio, _, _ in todos]
+        self.ocorrencias = [(nome, self.itens[nome][indice]) for _, nome, indice in todos]
+        # Match mais longo de cada padrão: limita quanto antes da janela um match pode começar
+        self.maior = {nome: max((item.posicao_fim - item.posicao_inicio for item in itens), default=0)
+                      for nome, itens in self.itens.items()}
+    
+    def __len__(self):
+        return len(self.ocorrencias)
+    
+    @staticmethod
+    def distancia(item: OcorrenciaRegex, inicio: int, fim: int) -> int:
+        """Caracteres entre o match e o intervalo [inicio, fim) (0 se se sobrepõem)"""
+        return max(0, item.posicao_inicio - fim, inicio - item.posicao_fim)
+    
+    def dentro(self, inicio: int, fim: int, distancia: int, padrao: Optional[str] = None) -> List[Any]:
+        """
+        Matches a até `distancia` caracteres do intervalo [inicio, fim).
+        
+        Returns:
+            Lista de itens do padrão, ou de (padrão, item) quando `padrao` é None
+        """
+        if padrao:
+            inicios, itens, maior = self.inicios.get(padrao, []), self.itens.get(padrao, []), self.maior.get(padrao, 0)
+        else:
+            inicios, itens, maior = self.inicios_gerais, self.ocorrencias, max(self.maior.values(), default=0)
+        # Um match que termina na janela começa no máximo `maior` caracteres antes dela
+        esquerda = bisect_left(inicios, inicio - distancia - maior)
+        direita = bisect_right(inicios, fim + distancia)
+        return [
+            ocorrencia for ocorrencia in itens[esquerda:direita]
+            if self.distancia(ocorrencia if padrao else ocorrencia[1], inicio, fim) <= distancia
+        ]
+    
+    def mais_proximo(self, inicio: int, fim: int, padrao: str,
+                     distancia: Optional[int] = None) -> Optional[OcorrenciaRegex]:
+        """
+        Match do padrão mais próximo do intervalo [inicio, fim).
+        
+        Os matches de um mesmo padrão não se sobrepõem (finditer), então
+        início e fim crescem juntos: basta comparar os vizinhos da posição
+        encontrada pela busca binária.
+        
+        Returns:
+            O item mais próximo (o anterior em caso de empate) ou None se não
+            houver nenhum a até `distancia` caracteres
+        """
+        inicios, itens = self.inicios.get(padrao, []), self.itens.get(padrao, [])
+        posicao = bisect_left(inicios, inicio)
+        candidatos = itens[max(0, posicao - 1):posicao + 1]
+        if not candidatos:
+            return None
+        
+        melhor = min(candidatos, key=lambda item: self.distancia(item, inicio, fim))
+        if distancia is not None and self.distancia(melhor, inicio, fim) > distancia:
+            return None
+        return melhor
 
 
 class ExtracaoMaximaProcessor:
@@ -13,10 +116,22 @@ class ExtracaoMaximaProcessor:
     Processador para extração máxima de dados tabulares usando prompts especializados
     """
     
+    # Distância máxima (em caracteres) entre dois dados para considerá-los relacionados
+    DISTANCIA_RELACAO = 80
+    
     def __init__(self):
         self.prompt_base = self._carregar_prompt_base()
         self.padroes_regex = self._definir_padroes_regex()
         self.dominios_especificos = self._definir_dominios()
+        # keyword_matcher.py fica na pasta acima de old/
+        pasta = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if pasta not in sys.path:
+            sys.path.append(pasta)
+        from keyword_matcher import KeywordMatcher
+        
+        # Vocabulários de todos os domínios em uma única busca
+        self.matcher_dominios = KeywordMatcher(self.dominios_especificos)
+        self._ocorrencias_cache = (None, {})
     
     def _carregar_prompt_base(self) -> str:
         """Carrega o prompt base para extração máxima"""
@@ -163,7 +278,7 @@ class ExtracaoMaximaProcessor:
             'idioma_detectado': 'português'  # Simplificado
         }
     
-    def _aplicar_padroes_regex(self, texto: str) -> Dict[str, List[Dict[str, Any]]]:
+    def _aplicar_padroes_regex(self, texto: str) -> Dict[str, List[OcorrenciaRegex]]:
         """Aplica todos os padrões regex definidos"""
         resultados = {}
         
@@ -172,28 +287,32 @@ class ExtracaoMaximaProcessor:
             dados_padrao = []
             
             for match in matches:
-                dados_padrao.append({
-                    'valor': match.group(0),
-                    'grupos': match.groups(),
-                    'posicao_inicio': match.start(),
-                    'posicao_fim': match.end(),
-                    'contexto': self._extrair_contexto_local(texto, match.start(), match.end()),
-                    'confianca': self._calcular_confianca_regex(match, nome_padrao)
-                })
+                # 'contexto' é calculado no primeiro acesso (só para os matches usados na saída)
+                dados_padrao.append(OcorrenciaRegex(
+                    valor=match.group(0),
+                    grupos=match.groups(),
+                    posicao_inicio=match.start(),
+                    posicao_fim=match.end(),
+                    confianca=self._calcular_confianca_regex(match, nome_padrao),
+                    texto=texto,
+                    extrair_contexto=self._extrair_contexto_local
+                ))
             
             if dados_padrao:
                 resultados[nome_padrao] = dados_padrao
         
         return resultados
     
+    def _ocorrencias_dominios(self, texto: str) -> Dict[str, List[int]]:
+        """Palavras de todos os domínios no texto (reaproveita a busca do último texto)"""
+        if self._ocorrencias_cache[0] is not texto:
+            self._ocorrencias_cache = (texto, self.matcher_dominios.find(texto))
+        return self._ocorrencias_cache[1]
+    
     def _detectar_dominio(self, texto: str) -> str:
         """Detecta o domínio principal do texto"""
-        texto_lower = texto.lower()
-        pontuacoes_dominio = {}
-        
-        for dominio, palavras_chave in self.dominios_especificos.items():
-            pontuacao = sum(1 for palavra in palavras_chave if palavra in texto_lower)
-            pontuacoes_dominio[dominio] = pontuacao
+        ocorrencias = self._ocorrencias_dominios(texto)
+        pontuacoes_dominio = self.matcher_dominios.group_counts(ocorrencias)
         
         if pontuacoes_dominio:
             return max(pontuacoes_dominio, key=pontuacoes_dominio.get)
@@ -211,10 +330,8 @@ class ExtracaoMaximaProcessor:
         
         # Identificar palavras-chave do domínio
         if dominio in self.dominios_especificos:
-            palavras_dominio = self.dominios_especificos[dominio]
-            for palavra in palavras_dominio:
-                if palavra.lower() in texto.lower():
-                    contexto['palavras_chave_encontradas'].append(palavra)
+            ocorrencias = self._ocorrencias_dominios(texto)
+            contexto['palavras_chave_encontradas'] = self.matcher_dominios.found(ocorrencias, dominio)
         
         # Identificar entidades nomeadas (simplificado)
         nomes_proprios = re.findall(r'[A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛ][a-záàâãéèêíìîóòôõúùû\s]+', texto)
@@ -248,36 +365,36 @@ class ExtracaoMaximaProcessor:
         if 'valores_monetarios' in regex_dados:
             for item in regex_dados['valores_monetarios']:
                 valores.append({
-                    'valor': item['grupos'][0],
+                    'valor': item.grupos[0],
                     'tipo': 'monetario',
                     'unidade': 'R$',
-                    'contexto': item['contexto'],
-                    'confianca': item['confianca'],
-                    'posicao': item['posicao_inicio']
+                    'contexto': item.contexto,
+                    'confianca': item.confianca,
+                    'posicao': item.posicao_inicio
                 })
         
         # Números com unidades
         if 'numeros_com_unidades' in regex_dados:
             for item in regex_dados['numeros_com_unidades']:
                 valores.append({
-                    'valor': item['grupos'][0],
+                    'valor': item.grupos[0],
                     'tipo': 'numerico_com_unidade',
-                    'unidade': item['grupos'][1],
-                    'contexto': item['contexto'],
-                    'confianca': item['confianca'],
-                    'posicao': item['posicao_inicio']
+                    'unidade': item.grupos[1],
+                    'contexto': item.contexto,
+                    'confianca': item.confianca,
+                    'posicao': item.posicao_inicio
                 })
         
         # Percentuais
         if 'percentuais' in regex_dados:
             for item in regex_dados['percentuais']:
                 valores.append({
-                    'valor': item['grupos'][0],
+                    'valor': item.grupos[0],
                     'tipo': 'percentual',
                     'unidade': '%',
-                    'contexto': item['contexto'],
-                    'confianca': item['confianca'],
-                    'posicao': item['posicao_inicio']
+                    'contexto': item.contexto,
+                    'confianca': item.confianca,
+                    'posicao': item.posicao_inicio
                 })
         
         return valores
@@ -290,11 +407,11 @@ class ExtracaoMaximaProcessor:
         if 'codigos' in regex_dados:
             for item in regex_dados['codigos']:
                 valores.append({
-                    'valor': item['grupos'][0],
+                    'valor': item.grupos[0],
                     'tipo': 'codigo',
-                    'contexto': item['contexto'],
-                    'confianca': item['confianca'],
-                    'posicao': item['posicao_inicio']
+                    'contexto': item.contexto,
+                    'confianca': item.confianca,
+                    'posicao': item.posicao_inicio
                 })
         
         # Entidades nomeadas
@@ -316,11 +433,11 @@ class ExtracaoMaximaProcessor:
         if 'datas' in regex_dados:
             for item in regex_dados['datas']:
                 datas.append({
-                    'data_original': item['grupos'][0],
-                    'formato_detectado': self._detectar_formato_data(item['grupos'][0]),
-                    'contexto': item['contexto'],
-                    'confianca': item['confianca'],
-                    'posicao': item['posicao_inicio']
+                    'data_original': item.grupos[0],
+                    'formato_detectado': self._detectar_formato_data(item.grupos[0]),
+                    'contexto': item.contexto,
+                    'confianca': item.confianca,
+                    'posicao': item.posicao_inicio
                 })
         
         return datas
@@ -332,11 +449,11 @@ class ExtracaoMaximaProcessor:
         if 'coordenadas' in regex_dados:
             for item in regex_dados['coordenadas']:
                 geograficos.append({
-                    'latitude': item['grupos'][0],
-                    'longitude': item['grupos'][1],
-                    'contexto': item['contexto'],
-                    'confianca': item['confianca'],
-                    'posicao': item['posicao_inicio']
+                    'latitude': item.grupos[0],
+                    'longitude': item.grupos[1],
+                    'contexto': item.contexto,
+                    'confianca': item.confianca,
+                    'posicao': item.posicao_inicio
                 })
         
         return geograficos
@@ -352,10 +469,10 @@ class ExtracaoMaximaProcessor:
                 for item in regex_dados[campo]:
                     tecnicos.append({
                         'tipo': campo,
-                        'valor': item['grupos'][0],
-                        'contexto': item['contexto'],
-                        'confianca': item['confianca'],
-                        'posicao': item['posicao_inicio']
+                        'valor': item.grupos[0],
+                        'contexto': item.contexto,
+                        'confianca': item.confianca,
+                        'posicao': item.posicao_inicio
                     })
         
         return tecnicos
@@ -371,10 +488,10 @@ class ExtracaoMaximaProcessor:
                 for item in regex_dados[campo]:
                     operacionais.append({
                         'tipo': campo,
-                        'valor': item['valor'],
-                        'contexto': item['contexto'],
-                        'confianca': item['confianca'],
-                        'posicao': item['posicao_inicio']
+                        'valor': item.valor,
+                        'contexto': item.contexto,
+                        'confianca': item.confianca,
+                        'posicao': item.posicao_inicio
                     })
         
         return operacionais
@@ -485,20 +602,33 @@ class ExtracaoMaximaProcessor:
         }
     
     def _identificar_relacoes_dados(self, regex_dados: Dict) -> List[Dict[str, Any]]:
-        """Identifica relações entre dados"""
+        """
+        Identifica relações entre dados próximos no texto.
+        
+        Cada quantidade de passageiros é ligada ao valor monetário mais
+        próximo, desde que esteja a até DISTANCIA_RELACAO caracteres; valores
+        em outras partes do documento não geram pares.
+        """
         relacoes = []
+        indice = IndiceOcorrencias(regex_dados)
         
-        # Exemplo: se tem valor monetário e número com unidade "passageiros", pode ser tarifa
-        if 'valores_monetarios' in regex_dados and 'numeros_com_unidades' in regex_dados:
-            for valor_monetario in regex_dados['valores_monetarios']:
-                for numero_unidade in regex_dados['numeros_com_unidades']:
-                    if 'passageiro' in numero_unidade['grupos'][1].lower():
-                        relacoes.append({
-                            'tipo': 'tarifa_por_passageiro',
-                            'valor_monetario': valor_monetario['grupos'][0],
-                            'quantidade_passageiros': numero_unidade['grupos'][0],
-                            'confianca': 0.7
-                        })
+        # Exemplo: valor monetário perto de um número com unidade "passageiros" pode ser tarifa
+        for numero_unidade in indice.itens.get('numeros_com_unidades', []):
+            if 'passageiro' not in numero_unidade.grupos[1].lower():
+                continue
+            
+            inicio, fim = numero_unidade.posicao_inicio, numero_unidade.posicao_fim
+            valor_monetario = indice.mais_proximo(inicio, fim, 'valores_monetarios', self.DISTANCIA_RELACAO)
+            if valor_monetario is None:
+                continue
+            
+            relacoes.append({
+                'tipo': 'tarifa_por_passageiro',
+                'valor_monetario': valor_monetario.grupos[0],
+                'quantidade_passageiros': numero_unidade.grupos[0],
+                'distancia': indice.distancia(valor_monetario, inicio, fim),
+                'confianca': 0.7
+            })
         
         return relacoes
     
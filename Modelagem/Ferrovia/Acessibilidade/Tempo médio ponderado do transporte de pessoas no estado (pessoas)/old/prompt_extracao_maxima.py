@@ -14,6 +14,8 @@ Uso:
 """
 
 import json
+import os
+import sys
 from typing import Dict, List, Any, Optional
 
 class PromptExtracao:
@@ -310,6 +312,36 @@ CAMPOS PRIORITÁRIOS:
         
         return prompt_base
     
+    def extrair_em_blocos(self, texto: str, client, modelo: str, contexto: str = "ferroviario",
+                          concorrencia: int = 2, **chat_kwargs) -> Dict[str, Any]:
+        """
+        Extração de textos longos (capítulos do PNL/PSTF) em blocos
+        
+        Cada bloco recebe o prompt contextualizado completo, cabe na janela do
+        modelo e é enviado em paralelo; os JSONs parciais são combinados campo
+        a campo (ver extracao_blocos.py).
+        
+        Args:
+            texto: Texto a ser analisado
+            client: ChatClient
+            modelo: Modelo a usar
+            contexto: Tipo de contexto ('ferroviario', 'financeiro', 'geografico')
+            concorrencia: Chamadas simultâneas ao LLM
+            **chat_kwargs: Repassados para client.chat (timeout, num_ctx, ...)
+            
+        Returns:
+            Dicionário com 'dados' combinados, 'conflitos' e 'blocos'
+        """
+        # extracao_blocos.py fica na pasta acima de old/ e traz pandas/numpy:
+        # importado só aqui para os demais prompts não dependerem dele
+        pasta = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if pasta not in sys.path:
+            sys.path.append(pasta)
+        from extracao_blocos import ExtracaoEmBlocos
+        
+        extrator = ExtracaoEmBlocos(client, modelo, concorrencia=concorrencia, num_ctx=chat_kwargs.pop("num_ctx", None))
+        return extrator.extrair(texto, lambda bloco: self.gerar_prompt_contextualizado(bloco, contexto), **chat_kwargs)
+    
     def extrair_dados_maximos(self, texto: str, contexto: str = "ferroviario") -> Dict[str, Any]:
         """
         Método exemplo para integração com LLM
@@ -5,9 +5,12 @@ Apenas transita informações entre cliente e modelo, sem interferir no prompt
 """
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
+import json
 import requests
 import logging
 import os
@@ -45,6 +48,7 @@ class ChatRequest(BaseModel):
     top_k: Optional[int] = 40
     top_p: Optional[float] = 0.9
     max_tokens: Optional[int] = None
+    num_ctx: Optional[int] = None  # Janela de contexto; sem ele o Ollama usa o padrão e corta o excedente
     timeout: Optional[int] = 300  # Novo parâmetro timeout (padrão 5 minutos)
 
 class ChatResponse(BaseModel):
@@ -107,11 +111,42 @@ async def get_modelos_disponiveis():
     except Exception as e:
         return {"modelos": [], "erro": str(e)}
 
+async def stream_ollama(ollama_request: Dict[str, Any], timeout_value: int):
+    """
+    Repassa os chunks NDJSON do Ollama ao cliente à medida que chegam.
+    
+    Se o cliente desconectar (ex.: parou ao receber o </json>), a tarefa é
+    cancelada e a conexão com o Ollama é fechada, o que interrompe a geração.
+    """
+    response = await run_in_threadpool(
+        requests.post, f"{OLLAMA_BASE_URL}/api/generate",
+        json=ollama_request, stream=True, timeout=timeout_value
+    )
+    try:
+        if response.status_code != 200:
+            logger.error(f"❌ Erro do Ollama: {response.status_code}")
+            yield json.dumps({"erro": f"Erro do Ollama: {response.text}", "done": True}) + "\n"
+            return
+        
+        lines = response.iter_lines()
+        while True:
+            line = await run_in_threadpool(next, lines, None)
+            if line is None:
+                break
+            if line:
+                yield line.decode("utf-8") + "\n"
+    finally:
+        response.close()
+        logger.info("🔌 Stream encerrado, conexão com o Ollama fechada")
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
     Proxy direto para conversa com modelo
     Agora aceita timeout configurável
+    
+    Com stream=True a resposta é o NDJSON do Ollama repassado chunk a chunk
+    (application/x-ndjson); o cliente pode fechar a conexão para interromper a geração.
     """
     try:
         import time
@@ -140,9 +175,17 @@ async def chat(request: ChatRequest):
         if request.max_tokens:
             ollama_request["options"]["num_predict"] = request.max_tokens
         
-        # Enviar para Ollama usando timeout configurável
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
+        # Adicionar num_ctx se especificado
+        if request.num_ctx:
+            ollama_request["options"]["num_ctx"] = request.num_ctx
+        
+        if request.stream:
+            return StreamingResponse(stream_ollama(ollama_request, timeout_value), media_type="application/x-ndjson")
+        
+        # Enviar para Ollama usando timeout configurável; em thread para não
+        # bloquear o event loop e permitir várias gerações simultâneas
+        response = await run_in_threadpool(
+            requests.post, f"{OLLAMA_BASE_URL}/api/generate",
             json=ollama_request,
             timeout=timeout_value  # Usar timeout do parâmetro
         )
@@ -1,212 +1,882 @@
 import PyPDF2
 import pdfplumber
-from pdfminer.high_level import extract_text
+import pdfminer
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
 from pdfminer.pdfpage import PDFPage
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from io import StringIO
+import gc
+import hashlib
 import os
 import re
 import json
+import queue
+import sqlite3
+import threading
 import time
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
 from pathlib import Path
 
+from numeros_br import numero_br
+
+try:
+    import psutil
+except ImportError:  # opcional: usado apenas para medir memória fora do Linux
+    psutil = None
+
+# Versões das bibliotecas: fazem parte da chave do cache de páginas
+BACKEND_VERSIONS = {
+    'PyPDF2': PyPDF2.__version__,
+    'pdfplumber': pdfplumber.__version__,
+    'pdfminer': pdfminer.__version__
+}
+
+# Assinaturas verificadas pela validação rápida
+PDF_HEADER = b'%PDF-'
+LFS_POINTER_HEADER = b'version https://git-lfs.github.com/spec/'
+SNIFF_BYTES = 4096
+
+class PDFNotMaterializedError(ValueError):
+    """O arquivo é um ponteiro do Git LFS: o PDF ainda não foi baixado (git lfs pull)"""
+
+def sniff_pdf(file_path, sniff_bytes=SNIFF_BYTES):
+    """
+    Verifica um PDF lendo apenas o início e o fim do arquivo.
+    
+    Procura o cabeçalho `%PDF-`, o `startxref`/`%%EOF` do trailer e a
+    assinatura de ponteiro do Git LFS, sem interpretar o documento.
+    
+    Returns:
+        dict com 'status' ('pdf', 'lfs_pointer' ou 'invalido'), 'versao',
+        'tamanho', 'lfs_size' (tamanho real, para ponteiros LFS) e 'motivo'
+    """
+    size = os.path.getsize(file_path)
+    info = {'status': 'invalido', 'versao': None, 'tamanho': size, 'lfs_size': None, 'motivo': None}
+    
+    with open(file_path, 'rb') as file:
+        head = file.read(sniff_bytes)
+        file.seek(max(0, size - sniff_bytes))
+        tail = file.read(sniff_bytes)
+    
+    if head.startswith(LFS_POINTER_HEADER):
+        match = re.search(rb'^size (\d+)', head, re.MULTILINE)
+        info['status'] = 'lfs_pointer'
+        info['lfs_size'] = int(match.group(1)) if match else None
+        info['motivo'] = 'ponteiro do Git LFS'
+        return info
+    
+    # A especificação permite lixo antes do cabeçalho nos primeiros 1024 bytes
+    header_pos = head.find(PDF_HEADER, 0, 1024 + len(PDF_HEADER))
+    if header_pos < 0:
+        info['motivo'] = 'cabeçalho %PDF- não encontrado'
+        return info
+    info['versao'] = head[header_pos + len(PDF_HEADER):header_pos + len(PDF_HEADER) + 3].decode('ascii', 'replace')
+    
+    if b'%%EOF' not in tail or b'startxref' not in tail:
+        info['motivo'] = 'trailer (startxref/%%EOF) ausente: arquivo truncado'
+        return info
+    
+    info['status'] = 'pdf'
+    return info
+
 class PDFReader:
     """
     Classe para leitura de PDFs usando múltiplas bibliotecas.
     Otimizada para extração de dados estruturados ferroviários.
+    
+    Pode ser usada como gerenciador de contexto para manter o documento
+    aberto (sessão) enquanto várias páginas são extraídas:
+    
+        with PDFReader(caminho) as reader:
+            reader.extract_text_from_page(209)
+            reader.extract_text_from_page(210)
+    
+    Sessões podem ser aninhadas: um `with reader:` dentro de outro não fecha
+    o documento ao sair; os arquivos são liberados ao fechar a mais externa.
+    
+    Com `cache=PageTextCache()` o texto de cada página fica gravado em disco
+    e as execuções seguintes sobre o mesmo arquivo não precisam reextraí-lo.
+    
+    Com `boilerplate=True` (ou um BoilerplateDetector) cabeçalhos, rodapés e
+    números de página repetidos são aprendidos no documento inteiro e
+    removidos do texto devolvido; o cache guarda sempre o texto original.
     """
     
-    def __init__(self, file_path, verbose=True):
+    # Bibliotecas usadas quando o limite de memória não pode ser respeitado
+    LIGHT_METHODS = ['PyPDF2']
+    # Páginas entre duas liberações quando a última não trouxe a memória abaixo do limite
+    FLUSH_INTERVAL = 25
+    
+    def __init__(self, file_path, verbose=True, cache=None, memory_limit_mb=None, boilerplate=None):
         self.file_path = file_path
         self.verbose = verbose
+        # Limite de memória (RSS em MB); None desativa o controle
+        self.memory_limit_mb = memory_limit_mb
+        # Cache de texto por página: instância de PageTextCache ou caminho do banco SQLite
+        self.cache = PageTextCache(cache) if isinstance(cache, (str, Path)) else cache
+        # Remoção de cabeçalhos/rodapés: instância de BoilerplateDetector ou True
+        self.boilerplate = BoilerplateDetector() if boilerplate is True else boilerplate
+        self._content_hash = None
+        self._num_pages = None
+        self._session_active = False
+        self._session_depth = 0
+        self._handles = {}
+        self.scorer = TextQualityScorer()
+        # Ordem de tentativa: da biblioteca mais barata para a mais cara
+        self.method_order = ['PyPDF2', 'pdfminer', 'pdfplumber']
+        self.reset_memory_report()
         self.validate_file()
     
     def validate_file(self):
-        """Valida se o arquivo PDF existe e é válido"""
+        """
+        Valida se o arquivo PDF existe e é válido.
+        
+        Lê apenas o início e o fim do arquivo (alguns KB); a interpretação
+        completa do documento fica para o primeiro uso real.
+        """
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"Arquivo não encontrado: {self.file_path}")
         
-        if not self.file_path.lower().endswith('.pdf'):
+        if not str(self.file_path).lower().endswith('.pdf'):
             raise ValueError("O arquivo deve ser um PDF")
         
-        # Verificar se o arquivo não está corrompido
-        try:
-            with open(self.file_path, 'rb') as file:
-                PyPDF2.PdfReader(file)
-        except Exception as e:
-            raise ValueError(f"Arquivo PDF corrompido ou inválido: {e}")
+        info = sniff_pdf(self.file_path)
+        if info['status'] == 'lfs_pointer':
+            raise PDFNotMaterializedError(
+                f"Arquivo é um ponteiro do Git LFS, não o PDF ({info['lfs_size']} bytes no servidor). "
+                f"Execute 'git lfs pull' para baixá-lo: {self.file_path}"
+            )
+        if info['status'] != 'pdf':
+            raise ValueError(f"Arquivo PDF corrompido ou inválido: {info['motivo']}")
     
     def _print(self, message):
         """Print condicional baseado no verbose"""
         if self.verbose:
             print(message)
     
+    def open(self):
+        """
+        Abre uma sessão de documento.
+        
+        Durante a sessão cada biblioteca abre e interpreta o PDF uma única vez;
+        as chamadas seguintes reaproveitam a árvore de páginas já carregada,
+        de modo que extrair uma página passa a ser apenas uma consulta.
+        """
+        self._session_depth += 1
+        self._session_active = True
+        return self
+    
+    def close(self):
+        """Encerra a sessão; ao fechar a mais externa, libera os arquivos abertos por cada biblioteca"""
+        self._session_depth = max(0, self._session_depth - 1)
+        if self._session_depth == 0:
+            self._close_handles()
+    
+    def _close_handles(self):
+        """Fecha os arquivos abertos por cada biblioteca e encerra a sessão"""
+        for handle in self._handles.values():
+            try:
+                handle['close']()
+            except Exception as e:
+                self._print(f"⚠️ Erro ao fechar PDF: {e}")
+        self._handles = {}
+        self._session_active = False
+    
+    def __enter__(self):
+        return self.open()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def __del__(self):
+        try:
+            self._session_depth = 0
+            self._close_handles()
+        except Exception:
+            pass
+    
+    def _open_pypdf2(self):
+        file = open(self.file_path, 'rb')
+        return {'reader': PyPDF2.PdfReader(file), 'close': file.close}
+    
+    def _open_pdfplumber(self):
+        pdf = pdfplumber.open(self.file_path)
+        return {'pdf': pdf, 'close': pdf.close}
+    
+    def _open_pdfminer(self):
+        file = open(self.file_path, 'rb')
+        try:
+            pages = list(PDFPage.get_pages(file))
+        except Exception:
+            file.close()
+            raise
+        # Gerenciador de recursos compartilhado: fontes e imagens são
+        # interpretadas uma vez e reaproveitadas entre páginas
+        return {'pages': pages, 'resources': PDFResourceManager(caching=True), 'close': file.close}
+    
+    @contextmanager
+    def _backend(self, name):
+        """
+        Entrega o objeto aberto de uma biblioteca ('PyPDF2', 'pdfplumber' ou 'pdfminer').
+        Em sessão o objeto é criado uma vez e mantido; fora dela é aberto e fechado a cada uso.
+        """
+        openers = {
+            'PyPDF2': self._open_pypdf2,
+            'pdfplumber': self._open_pdfplumber,
+            'pdfminer': self._open_pdfminer
+        }
+        
+        if self._session_active:
+            if name not in self._handles:
+                self._handles[name] = openers[name]()
+            yield self._handles[name]
+            return
+        
+        handle = openers[name]()
+        try:
+            yield handle
+        finally:
+            handle['close']()
+    
     def get_num_pages(self):
         """Retorna o número total de páginas do PDF"""
-        with open(self.file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            return len(reader.pages)
+        if self._num_pages is None:
+            try:
+                with self._backend('PyPDF2') as handle:
+                    self._num_pages = len(handle['reader'].pages)
+            except Exception as e:
+                raise ValueError(f"Arquivo PDF corrompido ou inválido: {e}")
+        return self._num_pages
     
     def extract_text_pypdf2(self, start_page=1, end_page=None):
         """
         Extrai texto usando PyPDF2 (método 1 - rápido)
         """
-        if end_page is None:
-            end_page = self.get_num_pages()
-        
-        pages = []
-        
-        with open(self.file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            total_pages = len(reader.pages)
-            
-            # Validar páginas
-            start_page = max(1, min(start_page, total_pages))
-            end_page = max(start_page, min(end_page, total_pages))
-            
-            for page_num in range(start_page - 1, end_page):
-                try:
-                    page = reader.pages[page_num]
-                    text = page.extract_text()
-                    
-                    if text and text.strip():
-                        pages.append({
-                            'page': page_num + 1,
-                            'text': text.strip(),
-                            'char_count': len(text.strip()),
-                            'method': 'PyPDF2'
-                        })
-                except Exception as e:
-                    self._print(f"⚠️ Erro ao extrair página {page_num + 1} com PyPDF2: {e}")
-                    continue
-        
-        return pages
+        return self._collect_pages('PyPDF2', start_page, end_page)
     
     def extract_text_pdfplumber(self, start_page=1, end_page=None):
         """
         Extrai texto usando pdfplumber (método 2 - mais preciso)
         """
-        if end_page is None:
-            end_page = self.get_num_pages()
-        
+        return self._collect_pages('pdfplumber', start_page, end_page)
+    
+    def extract_text_pdfminer(self, start_page=1, end_page=None):
+        """
+        Extrai texto usando pdfminer (método 3 - mais robusto)
+        """
+        return self._collect_pages('pdfminer', start_page, end_page)
+    
+    def _collect_pages(self, method_name, start_page, end_page):
+        """Monta a lista de registros de página de uma biblioteca, descartando páginas vazias"""
         pages = []
         
         try:
-            with pdfplumber.open(self.file_path) as pdf:
-                total_pages = len(pdf.pages)
-                
-                # Validar páginas
-                start_page = max(1, min(start_page, total_pages))
-                end_page = max(start_page, min(end_page, total_pages))
-                
-                for page_num in range(start_page - 1, end_page):
-                    try:
-                        page = pdf.pages[page_num]
-                        text = page.extract_text()
-                        
-                        if text and text.strip():
-                            pages.append({
-                                'page': page_num + 1,
-                                'text': text.strip(),
-                                'char_count': len(text.strip()),
-                                'method': 'pdfplumber'
-                            })
-                    except Exception as e:
-                        self._print(f"⚠️ Erro ao extrair página {page_num + 1} com pdfplumber: {e}")
-                        continue
+            for page_num, text in self.iter_text(method_name, start_page, end_page):
+                if text and text.strip():
+                    pages.append(self._make_record(page_num, text, method_name))
         
         except Exception as e:
-            self._print(f"❌ Erro ao abrir PDF com pdfplumber: {e}")
+            self._print(f"❌ Erro ao processar PDF com {method_name}: {e}")
             return []
         
         return pages
     
-    def extract_text_pdfminer(self, start_page=1, end_page=None):
+    def _clamp_range(self, start_page, end_page):
+        """Ajusta o intervalo de páginas aos limites do documento"""
+        total_pages = self.get_num_pages()
+        if end_page is None:
+            end_page = total_pages
+        start_page = max(1, min(start_page, total_pages))
+        end_page = max(start_page, min(end_page, total_pages))
+        return start_page, end_page
+    
+    def iter_text(self, method_name, start_page=1, end_page=None):
         """
-        Extrai texto usando pdfminer (método 3 - mais robusto)
+        Gera (página, texto) com a biblioteca indicada ('PyPDF2', 'pdfplumber' ou 'pdfminer').
+        
+        Com um PageTextCache configurado, as páginas já extraídas são lidas
+        do cache e apenas as que faltam são extraídas (e gravadas no cache).
+        Com um BoilerplateDetector, as linhas repetidas do documento são
+        removidas (o detector é treinado na primeira chamada, se necessário).
         """
-        if end_page is None:
-            end_page = self.get_num_pages()
+        if self.boilerplate is None:
+            yield from self._iter_text_raw(method_name, start_page, end_page)
+            return
         
-        pages = []
+        if not self.boilerplate.fitted:
+            self.fit_boilerplate()
+        for page_num, text in self._iter_text_raw(method_name, start_page, end_page):
+            yield page_num, self.boilerplate.strip(text, page_num)
+    
+    def fit_boilerplate(self, start_page=1, end_page=None, method='PyPDF2'):
+        """
+        Treina o BoilerplateDetector com as páginas do documento.
         
-        try:
-            with open(self.file_path, 'rb') as file:
-                all_pages = list(PDFPage.get_pages(file))
-                total_pages = len(all_pages)
+        Usa a biblioteca mais barata por padrão: cabeçalhos e rodapés saem
+        iguais em todas. Retorna o detector treinado.
+        """
+        if self.boilerplate is None:
+            self.boilerplate = BoilerplateDetector()
+        
+        with self._session_scope():
+            self.boilerplate.fit(
+                {'page': page_num, 'text': text}
+                for page_num, text in self._iter_text_raw(method, start_page, end_page)
+            )
+        
+        self._print(f"🧹 {len(self.boilerplate.lines) + len(self.boilerplate.numbered)} linhas repetidas "
+                    f"aprendidas em {self.boilerplate.num_pages} páginas")
+        return self.boilerplate
+    
+    def _iter_text_raw(self, method_name, start_page=1, end_page=None):
+        """Gera (página, texto) original da biblioteca ou do cache (ver iter_text)"""
+        start_page, end_page = self._clamp_range(start_page, end_page)
+        
+        if self.cache is None:
+            yield from self._iter_backend(method_name, start_page, end_page)
+            return
+        
+        pdf_hash = self.get_content_hash()
+        version = BACKEND_VERSIONS[method_name]
+        cached = self.cache.get_many(pdf_hash, method_name, version, range(start_page, end_page + 1))
+        missing = [page_num for page_num in range(start_page, end_page + 1) if page_num not in cached]
+        runs = iter(self._contiguous_runs(missing))
+        run = next(runs, None)
+        
+        page_num = start_page
+        while page_num <= end_page:
+            if run is None or page_num != run[0]:
+                yield page_num, cached[page_num]
+                page_num += 1
+                continue
+            
+            fresh = []
+            try:
+                for fresh_page, text in self._iter_backend(method_name, run[0], run[1]):
+                    if text is not None:
+                        fresh.append((fresh_page, text))
+                    yield fresh_page, text
+            finally:
+                # Grava mesmo se o consumidor interromper a iteração no meio do bloco
+                self.cache.put_many(pdf_hash, method_name, version, fresh)
+            
+            page_num = run[1] + 1
+            run = next(runs, None)
+    
+    def _iter_backend(self, method_name, start_page, end_page):
+        """
+        Gera (página, texto) direto da biblioteca, respeitando o limite de memória.
+        
+        A memória (RSS) é medida após cada página para o pico do
+        memory_report. Com memory_limit_mb definido, se o limite for
+        ultrapassado, a iteração é interrompida, os documentos abertos são
+        liberados (flush) e a extração continua da página seguinte com o
+        documento reaberto. Se a liberação não trouxer a memória abaixo do
+        limite, as seguintes ficam espaçadas de FLUSH_INTERVAL páginas.
+        """
+        iterators = {
+            'PyPDF2': self.iter_text_pypdf2,
+            'pdfplumber': self.iter_text_pdfplumber,
+            'pdfminer': self.iter_text_pdfminer
+        }
+        
+        next_page = start_page
+        while next_page <= end_page:
+            exceeded = False
+            iterator = iterators[method_name](next_page, end_page)
+            try:
+                for page_num, text in iterator:
+                    next_page = page_num + 1
+                    yield page_num, text
+                    if self._should_flush(method_name):
+                        exceeded = True
+                        break
+            finally:
+                iterator.close()
+            
+            if not exceeded:
+                return
+            self._release_memory(method_name)
+    
+    def _memory_exceeded(self):
+        """Mede a memória do processo (pico no memory_report) e indica se o limite configurado foi ultrapassado"""
+        rss_mb = current_rss_mb()
+        if rss_mb is None:
+            return False
+        
+        self.memory_report['peak_rss_mb'] = max(self.memory_report['peak_rss_mb'], rss_mb)
+        self.memory_report['pages'] += 1
+        return self.memory_limit_mb is not None and rss_mb > self.memory_limit_mb
+    
+    def _should_flush(self, method_name):
+        """Indica se os documentos devem ser liberados após a página recém-extraída"""
+        if not self._memory_exceeded():
+            return False
+        # No modo de fallback as bibliotecas leves seguem sem novas liberações
+        if self._memory_fallback and method_name in self.LIGHT_METHODS:
+            return False
+        # Liberar de novo logo após uma liberação que não bastou só reabriria o documento a cada página
+        if self.memory_report['limit_unmet']:
+            return self.memory_report['pages'] - self._last_flush_page >= self.FLUSH_INTERVAL
+        return True
+    
+    def _release_memory(self, method_name):
+        """
+        Libera os documentos abertos e os caches de layout. Se a memória
+        continuar acima do limite, o método 'best' passa a usar apenas
+        bibliotecas leves e as próximas liberações ficam espaçadas.
+        """
+        for handle in self._handles.values():
+            try:
+                handle['close']()
+            except Exception as e:
+                self._print(f"⚠️ Erro ao fechar PDF: {e}")
+        self._handles = {}
+        gc.collect()
+        self.memory_report['flushes'] += 1
+        self._last_flush_page = self.memory_report['pages']
+        
+        rss_mb = current_rss_mb() or 0.0
+        self._print(f"🧹 Limite de memória atingido: documentos liberados (RSS: {rss_mb:.0f} MB)")
+        
+        self.memory_report['limit_unmet'] = rss_mb > self.memory_limit_mb
+        if not self.memory_report['limit_unmet']:
+            return
+        if not self._memory_fallback:
+            self._memory_fallback = True
+            self.memory_report['fallback'] = True
+            self._print(f"⚠️ Memória ainda acima de {self.memory_limit_mb} MB: 'best' passa a usar apenas {self.LIGHT_METHODS}")
+        if method_name not in self.LIGHT_METHODS and method_name not in self._memory_warned:
+            self._memory_warned.add(method_name)
+            self._print(f"⚠️ O limite de {self.memory_limit_mb} MB não pode ser respeitado com {method_name}: "
+                        f"novas liberações no máximo a cada {self.FLUSH_INTERVAL} páginas")
+    
+    def reset_memory_report(self):
+        """Zera o relatório de memória (pico de RSS, flushes, fallback e limite não atingido)"""
+        self.memory_report = {
+            'memory_limit_mb': self.memory_limit_mb,
+            'peak_rss_mb': current_rss_mb() or 0.0,
+            'pages': 0,
+            'flushes': 0,
+            'fallback': False,
+            'limit_unmet': False
+        }
+        self._memory_fallback = False
+        self._memory_warned = set()
+        self._last_flush_page = 0
+        return self.memory_report
+    
+    def get_content_hash(self):
+        """Hash SHA-256 do conteúdo do PDF (calculado uma vez por leitor)"""
+        if self._content_hash is None:
+            if self.cache is not None:
+                self._content_hash = self.cache.file_hash(self.file_path)
+            else:
+                self._content_hash = PageTextCache.compute_hash(self.file_path)
+        return self._content_hash
+    
+    def iter_text_pypdf2(self, start_page=1, end_page=None):
+        """Gera (página, texto) com PyPDF2 (None se a página falhar)"""
+        start_page, end_page = self._clamp_range(start_page, end_page)
+        
+        with self._backend('PyPDF2') as handle:
+            reader = handle['reader']
+            
+            for page_num in range(start_page - 1, end_page):
+                try:
+                    text = reader.pages[page_num].extract_text()
+                except Exception as e:
+                    self._print(f"⚠️ Erro ao extrair página {page_num + 1} com PyPDF2: {e}")
+                    text = None
                 
-                # Validar páginas
-                start_page = max(1, min(start_page, total_pages))
-                end_page = max(start_page, min(end_page, total_pages))
+                yield page_num + 1, text
+    
+    def iter_text_pdfplumber(self, start_page=1, end_page=None):
+        """Gera (página, texto) com pdfplumber (None se a página falhar)"""
+        start_page, end_page = self._clamp_range(start_page, end_page)
+        
+        with self._backend('pdfplumber') as handle:
+            pdf = handle['pdf']
+            
+            for page_num in range(start_page - 1, end_page):
+                page = pdf.pages[page_num]
+                try:
+                    text = page.extract_text()
+                except Exception as e:
+                    self._print(f"⚠️ Erro ao extrair página {page_num + 1} com pdfplumber: {e}")
+                    text = None
+                finally:
+                    # Libera os objetos de caractere e layout guardados na página
+                    page.close()
                 
+                yield page_num + 1, text
+    
+    def iter_text_pdfminer(self, start_page=1, end_page=None):
+        """
+        Gera (página, texto) com pdfminer em uma única passada de análise de layout.
+        
+        O arquivo é aberto uma vez e o mesmo interpretador processa as páginas
+        em sequência, em vez de reabrir o PDF e percorrer a árvore de páginas
+        desde o início para cada página. O texto de cada página é entregue
+        assim que ela é processada (None se a página falhar).
+        """
+        start_page, end_page = self._clamp_range(start_page, end_page)
+        
+        with self._backend('pdfminer') as handle:
+            all_pages = handle['pages']
+            
+            output = StringIO()
+            device = TextConverter(handle['resources'], output, laparams=LAParams())
+            interpreter = PDFPageInterpreter(handle['resources'], device)
+            
+            try:
                 for page_num in range(start_page - 1, end_page):
                     try:
-                        # Extrair texto da página específica
-                        text = extract_text(self.file_path, page_numbers=[page_num])
-                        
-                        if text and text.strip():
-                            pages.append({
-                                'page': page_num + 1,
-                                'text': text.strip(),
-                                'char_count': len(text.strip()),
-                                'method': 'pdfminer'
-                            })
+                        interpreter.process_page(all_pages[page_num])
+                        text = output.getvalue()
                     except Exception as e:
                         self._print(f"⚠️ Erro ao extrair página {page_num + 1} com pdfminer: {e}")
-                        continue
+                        text = None
+                    
+                    output.seek(0)
+                    output.truncate(0)
+                    yield page_num + 1, text
+            finally:
+                device.close()
+    
+    def extract_text_best_method(self, start_page=1, end_page=None, threshold=None):
+        """
+        Extrai texto usando o melhor método disponível, escolhido página a página.
         
-        except Exception as e:
-            self._print(f"❌ Erro ao processar PDF com pdfminer: {e}")
+        As bibliotecas são tentadas da mais barata para a mais cara
+        (PyPDF2 → pdfminer → pdfplumber) dentro de uma sessão do documento.
+        Cada página é pontuada pelo TextQualityScorer; páginas que atingem o
+        limiar param ali e apenas as que falharem seguem para a próxima
+        biblioteca. Cada registro informa
+        a biblioteca vencedora ('method'), a nota ('quality_score') e as
+        tentativas feitas ('backends_tried').
+        """
+        self._print(f"🔍 Extraindo texto das páginas {start_page} a {end_page or 'fim'}")
+        
+        pages = list(self.iter_pages(start_page, end_page, method='best', threshold=threshold))
+        
+        if not pages:
+            self._print("❌ Nenhum método conseguiu extrair texto")
             return []
         
+        winners = {}
+        for record in pages:
+            winners[record['method']] = winners.get(record['method'], 0) + 1
+        self._print(f"🎯 Métodos vencedores: {winners} ({len(pages)} páginas)")
+        
+        if self.memory_limit_mb is not None:
+            self._print(f"📊 Pico de memória: {self.memory_report['peak_rss_mb']:.0f} MB "
+                        f"(limite {self.memory_limit_mb} MB, {self.memory_report['flushes']} liberações)")
+        else:
+            self._print(f"📊 Pico de memória: {self.memory_report['peak_rss_mb']:.0f} MB (sem limite)")
+        
         return pages
     
-    def extract_text_best_method(self, start_page=1, end_page=None):
+    def iter_pages(self, start_page=1, end_page=None, method='best', threshold=None, prefetch=0):
         """
-        Extrai texto usando o melhor método disponível.
-        Tenta múltiplas bibliotecas para garantir melhor resultado.
+        Gera os registros de página à medida que são extraídos.
+        
+        Cada registro tem o mesmo formato das listas de extract_text_*, mas é
+        entregue assim que a página fica pronta; apenas a página corrente fica
+        em memória, independentemente do tamanho do documento.
+        
+        Args:
+            start_page: Primeira página (1-indexada)
+            end_page: Última página (padrão: fim do documento)
+            method: 'best', 'PyPDF2', 'pdfplumber' ou 'pdfminer'
+            threshold: Nota mínima de qualidade para o método 'best'
+            prefetch: Se > 0, extrai em uma thread de fundo mantendo até
+                `prefetch` páginas prontas, para que o consumidor (ex.: chamada
+                ao LLM) processe uma página enquanto a seguinte é extraída.
+                Enquanto a iteração durar, o mesmo leitor não deve ser usado
+                em paralelo pelo consumidor.
         """
-        self._print(f"🔍 Extraindo texto das páginas {start_page} a {end_page or 'fim'}")
+        self._method_func(method)  # valida o método
         
-        methods = [
-            ("pdfplumber", self.extract_text_pdfplumber),
-            ("PyPDF2", self.extract_text_pypdf2),
-            ("pdfminer", self.extract_text_pdfminer)
-        ]
+        if prefetch > 0:
+            yield from self._iter_pages_prefetch(start_page, end_page, method, threshold, prefetch)
+            return
+        
+        with self._session_scope():
+            start_page, end_page = self._clamp_range(start_page, end_page)
+            
+            if method == 'best':
+                for page_num in range(start_page, end_page + 1):
+                    record = self._select_best_page(page_num, threshold)
+                    if record is not None:
+                        yield record
+                return
+            
+            for page_num, text in self.iter_text(method, start_page, end_page):
+                if text and text.strip():
+                    yield self._make_record(page_num, text, method)
+    
+    def _iter_pages_prefetch(self, start_page, end_page, method, threshold, prefetch):
+        """Executa iter_pages em uma thread de fundo com fila limitada a `prefetch` páginas"""
+        buffer = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        finished = object()
         
-        best_result = []
-        best_method = None
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
         
-        for method_name, method_func in methods:
+        def produce():
             try:
-                self._print(f"🔄 Tentando método: {method_name}")
-                result = method_func(start_page, end_page)
-                
-                if result and len(result) > len(best_result):
-                    best_result = result
-                    best_method = method_name
-                    self._print(f"✅ {method_name}: {len(result)} páginas extraídas")
-                elif result:
-                    self._print(f"✅ {method_name}: {len(result)} páginas extraídas")
-                else:
-                    self._print(f"❌ {method_name}: Nenhuma página extraída")
-                
+                for record in self.iter_pages(start_page, end_page, method, threshold):
+                    if not put(record):
+                        return
             except Exception as e:
-                self._print(f"❌ Erro com {method_name}: {e}")
+                put(e)
+            finally:
+                put(finished)
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        
+        try:
+            while True:
+                item = buffer.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+    
+    def _select_best_page(self, page_num, threshold=None):
+        """
+        Escolhe o texto de uma página tentando as bibliotecas em self.method_order
+        e parando na primeira cuja nota atinja o limiar. Se nenhuma atingir,
+        fica a de maior nota. Retorna None se nenhuma extrair texto.
+        """
+        if threshold is None:
+            threshold = self.scorer.threshold
+        
+        best = None
+        tried = []
+        
+        method_order = self.method_order
+        if self._memory_fallback:
+            method_order = [method for method in method_order if method in self.LIGHT_METHODS]
+        
+        for method_name in method_order:
+            try:
+                [(_, text)] = list(self.iter_text(method_name, page_num, page_num))
+            except Exception as e:
+                self._print(f"❌ Erro com {method_name} na página {page_num}: {e}")
                 continue
+            
+            if not text or not text.strip():
+                tried.append({'method': method_name, 'score': 0.0})
+                continue
+            
+            record = self._make_record(page_num, text, method_name)
+            record['quality_score'] = self.scorer.score(record['text'])['score']
+            tried.append({'method': method_name, 'score': record['quality_score']})
+            
+            if best is None or record['quality_score'] > best['quality_score']:
+                best = record
+            if best['quality_score'] >= threshold:
+                break
         
-        if best_result:
-            self._print(f"🎯 Melhor método: {best_method} ({len(best_result)} páginas)")
-            return best_result
-        else:
-            self._print("❌ Nenhum método conseguiu extrair texto")
-            return []
+        if best is not None:
+            best['backends_tried'] = tried
+        return best
+    
+    @staticmethod
+    def _make_record(page_num, text, method_name):
+        """Registro padrão de página extraída"""
+        return {
+            'page': page_num,
+            'text': text.strip(),
+            'char_count': len(text.strip()),
+            'method': method_name
+        }
+    
+    @staticmethod
+    def _contiguous_runs(page_numbers):
+        """Agrupa números de página ordenados em intervalos contínuos (início, fim)"""
+        runs = []
+        for page_num in page_numbers:
+            if runs and page_num == runs[-1][1] + 1:
+                runs[-1][1] = page_num
+            else:
+                runs.append([page_num, page_num])
+        return [tuple(run) for run in runs]
+    
+    @contextmanager
+    def _session_scope(self):
+        """Garante uma sessão durante o bloco, reaproveitando a atual se já existir"""
+        if self._session_active:
+            yield self
+            return
+        
+        self.open()
+        try:
+            yield self
+        finally:
+            self.close()
+    
+    def extract_range(self, start_page=1, end_page=None, workers=1, method='best',
+                      chunk_size=None, max_in_flight=None):
+        """
+        Extrai um intervalo de páginas em paralelo, usando um pool de processos.
+        
+        O intervalo é dividido em blocos de páginas; cada processo mantém sua
+        própria sessão aberta do documento e extrai os blocos que recebe. No
+        máximo `max_in_flight` blocos ficam pendentes ao mesmo tempo e o
+        resultado é remontado na ordem das páginas, idêntico ao caminho serial.
+        
+        Args:
+            start_page: Primeira página (1-indexada)
+            end_page: Última página (padrão: fim do documento)
+            workers: Número de processos (1 = serial, no processo atual)
+            method: 'best', 'PyPDF2', 'pdfplumber' ou 'pdfminer'
+            chunk_size: Páginas por bloco (padrão: ~4 blocos por processo)
+            max_in_flight: Blocos pendentes simultâneos (padrão: 2 por processo)
+        """
+        self._method_func(method)  # valida o método antes de criar processos
+        
+        total_pages = self.get_num_pages()
+        if end_page is None:
+            end_page = total_pages
+        start_page = max(1, min(start_page, total_pages))
+        end_page = max(start_page, min(end_page, total_pages))
+        
+        workers = max(1, int(workers or 1))
+        if chunk_size is None:
+            chunk_size = -(-(end_page - start_page + 1) // (workers * 4))
+        chunk_size = max(1, int(chunk_size))
+        chunks = [
+            (chunk_start, min(chunk_start + chunk_size - 1, end_page))
+            for chunk_start in range(start_page, end_page + 1, chunk_size)
+        ]
+        
+        self._print(f"🔍 Extraindo páginas {start_page} a {end_page} em {len(chunks)} blocos com {workers} processo(s)")
+        
+        if workers == 1:
+            with self._session_scope():
+                results = [self._method_func(method)(chunk_start, chunk_end) for chunk_start, chunk_end in chunks]
+            return [record for chunk in results for record in chunk]
+        
+        if max_in_flight is None:
+            max_in_flight = workers * 2
+        max_in_flight = max(1, int(max_in_flight))
+        
+        if self.boilerplate is not None and not self.boilerplate.fitted:
+            self.fit_boilerplate()
+        
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_worker_open_reader,
+                                 initargs=(self.file_path, self.cache, self.memory_limit_mb,
+                                           self.boilerplate)) as executor:
+            pending = {}
+            next_chunk = 0
+            
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                    chunk_start, chunk_end = chunks[next_chunk]
+                    future = executor.submit(_worker_extract, method, chunk_start, chunk_end)
+                    pending[future] = next_chunk
+                    next_chunk += 1
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    results[index], savings = future.result()
+                    if savings:
+                        self.boilerplate.savings.update(savings)
+                    self._print(f"✅ Bloco {index + 1}/{len(chunks)}: {len(results[index])} páginas extraídas")
+        
+        return [record for index in range(len(chunks)) for record in results[index]]
+    
+    def _method_func(self, method):
+        """Retorna o método de extração correspondente ao nome informado"""
+        methods = {
+            'best': self.extract_text_best_method,
+            'PyPDF2': self.extract_text_pypdf2,
+            'pdfplumber': self.extract_text_pdfplumber,
+            'pdfminer': self.extract_text_pdfminer
+        }
+        if method not in methods:
+            raise ValueError(f"Método desconhecido: {method}. Use um de {list(methods)}")
+        return methods[method]
     
     def extract_text_from_page(self, page_number):
         """Extrai texto de uma página específica"""
         return self.extract_text_best_method(page_number, page_number)
     
+    def iter_words(self, start_page=1, end_page=None):
+        """
+        Gera (página, palavras) com as coordenadas de cada palavra (pdfplumber).
+        
+        Cada palavra é um dict com 'text', 'x0', 'x1', 'top' e 'bottom' em pontos;
+        páginas que falham geram uma lista vazia.
+        """
+        start_page, end_page = self._clamp_range(start_page, end_page)
+        
+        with self._backend('pdfplumber') as handle:
+            pdf = handle['pdf']
+            
+            for page_num in range(start_page - 1, end_page):
+                page = pdf.pages[page_num]
+                try:
+                    words = [
+                        {key: word[key] for key in ('text', 'x0', 'x1', 'top', 'bottom')}
+                        for word in page.extract_words(keep_blank_chars=False, use_text_flow=False)
+                    ]
+                except Exception as e:
+                    self._print(f"⚠️ Erro ao extrair palavras da página {page_num + 1} com pdfplumber: {e}")
+                    words = []
+                finally:
+                    page.close()
+                
+                yield page_num + 1, words
+    
+    def extract_layout(self, start_page=1, end_page=None, extractor=None):
+        """
+        Extrai pares chave/valor e tabelas usando a posição das palavras na página.
+        
+        Evita o texto intercalado das páginas em duas colunas
+        (ex.: "6,98 Tarifa fixa (R$) 18,72 Tarifa fixa (R$)").
+        
+        Returns:
+            Lista de dicts com 'page', 'pares', 'tabelas' e 'method' ('pdfplumber_layout')
+        """
+        extractor = extractor or LayoutExtractor()
+        pages = []
+        
+        with self._session_scope():
+            for page_num, words in self.iter_words(start_page, end_page):
+                result = extractor.extract(words)
+                result['page'] = page_num
+                result['method'] = 'pdfplumber_layout'
+                pages.append(result)
+        
+        self._print(f"📐 {len(pages)} páginas com layout extraído: "
+                    f"{sum(len(page['pares']) for page in pages)} pares, "
+                    f"{sum(len(page['tabelas']) for page in pages)} tabelas")
+        return pages
+    
     def get_file_info(self):
         """Retorna informações sobre o arquivo PDF"""
         file_size = os.path.getsize(self.file_path)
@@ -219,12 +889,487 @@ class PDFReader:
             'file_name': os.path.basename(self.file_path)
         }
 
+def current_rss_mb():
+    """
+    Memória residente (RSS) do processo atual em MB.
+    Usa psutil se instalado; no Linux lê /proc; caso contrário retorna None.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    
+    try:
+        with open('/proc/self/statm') as file:
+            resident_pages = int(file.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# Leitor mantido por cada processo do pool de extract_range
+_worker_reader = None
+
+def _worker_open_reader(file_path, cache=None, memory_limit_mb=None, boilerplate=None):
+    """Inicializa o processo do pool com uma sessão própria do documento"""
+    global _worker_reader
+    _worker_reader = PDFReader(file_path, verbose=False, cache=cache, memory_limit_mb=memory_limit_mb,
+                               boilerplate=boilerplate).open()
+
+def _worker_extract(method, start_page, end_page):
+    """Extrai um bloco de páginas no processo do pool (e a economia da remoção de boilerplate)"""
+    records = _worker_reader._method_func(method)(start_page, end_page)
+    boilerplate = _worker_reader.boilerplate
+    if boilerplate is None:
+        return records, None
+    return records, {page: boilerplate.savings[page] for page in range(start_page, end_page + 1)
+                     if page in boilerplate.savings}
+
+class PageTextCache:
+    """
+    Cache persistente (SQLite) do texto extraído de cada página.
+    
+    As entradas são endereçadas pelo conteúdo: hash SHA-256 do PDF + página +
+    biblioteca + versão da biblioteca. Mover ou renomear o arquivo não invalida
+    o cache; alterar o conteúdo ou atualizar a biblioteca, sim. O tamanho total
+    é limitado e as páginas menos usadas recentemente são descartadas primeiro.
+    """
+    
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'pdf_processor', 'page_text.sqlite')
+    
+    def __init__(self, path=None, max_size_mb=512):
+        self.path = str(path or self.DEFAULT_PATH)
+        self.max_size_mb = max_size_mb
+        self._conn = None
+        self._pid = None
+    
+    def __getstate__(self):
+        # A conexão não atravessa processos: cada processo abre a sua
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        return state
+    
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'pdf_hash TEXT, page INTEGER, backend TEXT, backend_version TEXT, '
+                'text TEXT, size INTEGER, last_access REAL, '
+                'PRIMARY KEY (pdf_hash, page, backend, backend_version))'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)')
+            # Memoriza o hash por caminho/tamanho/mtime para não reler arquivos grandes
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, pdf_hash TEXT)'
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+    
+    @staticmethod
+    def compute_hash(file_path, block_size=1024 * 1024):
+        """Calcula o SHA-256 do arquivo em blocos"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def file_hash(self, file_path):
+        """Hash do conteúdo do arquivo, recalculado apenas se tamanho ou mtime mudarem"""
+        conn = self._connect()
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        
+        row = conn.execute('SELECT size, mtime_ns, pdf_hash FROM files WHERE path = ?', (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        
+        pdf_hash = self.compute_hash(path)
+        conn.execute(
+            'INSERT OR REPLACE INTO files (path, size, mtime_ns, pdf_hash) VALUES (?, ?, ?, ?)',
+            (path, stat.st_size, stat.st_mtime_ns, pdf_hash)
+        )
+        conn.commit()
+        return pdf_hash
+    
+    def get_many(self, pdf_hash, backend, backend_version, pages):
+        """Retorna {página: texto} para as páginas presentes no cache"""
+        conn = self._connect()
+        pages = list(pages)
+        found = {}
+        
+        # Consulta por faixas para respeitar o limite de parâmetros do SQLite
+        for index in range(0, len(pages), 500):
+            batch = pages[index:index + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f'SELECT page, text FROM pages WHERE pdf_hash = ? AND backend = ? '
+                f'AND backend_version = ? AND page IN ({placeholders})',
+                (pdf_hash, backend, backend_version, *batch)
+            ).fetchall()
+            found.update(rows)
+        
+        if found:
+            conn.executemany(
+                'UPDATE pages SET last_access = ? WHERE pdf_hash = ? AND backend = ? '
+                'AND backend_version = ? AND page = ?',
+                [(time.time(), pdf_hash, backend, backend_version, page) for page in found]
+            )
+            conn.commit()
+        return found
+    
+    def put_many(self, pdf_hash, backend, backend_version, items):
+        """Grava [(página, texto), ...] e aplica o limite de tamanho"""
+        if not items:
+            return
+        
+        conn = self._connect()
+        now = time.time()
+        conn.executemany(
+            'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(pdf_hash, page, backend, backend_version, text, len(text.encode('utf-8')), now)
+             for page, text in items]
+        )
+        conn.commit()
+        self._evict()
+    
+    def _evict(self):
+        """Descarta as páginas usadas há mais tempo até caber no limite (com folga de 10%)"""
+        conn = self._connect()
+        limit = self.max_size_mb * 1024 * 1024
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        if total <= limit:
+            return
+        
+        target = total - int(limit * 0.9)
+        freed = 0
+        stale = []
+        for rowid, size in conn.execute('SELECT rowid, size FROM pages ORDER BY last_access'):
+            stale.append((rowid,))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany('DELETE FROM pages WHERE rowid = ?', stale)
+        conn.commit()
+    
+    def invalidate(self, file_path=None, pdf_hash=None, backend=None):
+        """
+        Remove entradas do cache.
+        
+        Args:
+            file_path: Remove as páginas do conteúdo atual deste arquivo
+            pdf_hash: Remove as páginas deste hash de conteúdo
+            backend: Restringe a remoção a uma biblioteca
+        
+        Sem argumentos, esvazia o cache. Retorna o número de páginas removidas.
+        """
+        conn = self._connect()
+        if file_path is not None:
+            pdf_hash = self.file_hash(file_path)
+        
+        conditions = []
+        params = []
+        if pdf_hash is not None:
+            conditions.append('pdf_hash = ?')
+            params.append(pdf_hash)
+        if backend is not None:
+            conditions.append('backend = ?')
+            params.append(backend)
+        
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        removed = conn.execute(f'DELETE FROM pages{where}', params).rowcount
+        conn.commit()
+        return removed
+    
+    def clear(self):
+        """Esvazia o cache"""
+        return self.invalidate()
+    
+    def stats(self):
+        """Número de páginas e tamanho ocupado pelo cache"""
+        conn = self._connect()
+        pages, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        return {
+            'path': self.path,
+            'pages': pages,
+            'size_mb': size / (1024 * 1024),
+            'max_size_mb': self.max_size_mb
+        }
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class BoilerplateDetector:
+    """
+    Aprende as linhas repetidas (cabeçalhos, rodapés, números de página) de
+    um documento e as remove do texto das páginas.
+    
+    Só as linhas das bordas da página (as `edge_lines` primeiras e últimas)
+    são candidatas. Uma linha é repetida quando aparece em pelo menos
+    `min_pages` páginas (e `min_fraction` do documento), comparando:
+    
+    - o texto exato da linha ('Plano Estratégico Ferroviário de Minas Gerais',
+      'D.2 Trens Regionais', 'Mapa de situação');
+    - linhas que começam ou terminam com o número da página ('207',
+      '208 PEF – Plano Estratégico ... | ANEXOS'): o número é trocado por '#'
+      e guardado como deslocamento em relação ao índice da página, que é
+      constante para o número impresso e varia para dados como 'Carro de passageiros 4'.
+    
+    Linhas com números que aparecem com valores diferentes em outras páginas
+    ('Carros auxiliares 1' e 'Carros auxiliares 2') são dados, não repetição.
+    
+    Na remoção, só as linhas repetidas dentro das bordas são retiradas (um
+    título de seção como 'D.2 Trens Regionais' antes do cabeçalho não
+    impede a remoção do cabeçalho). Rótulos de campos ('Características da frota:',
+    'Total de composições: 1') nunca são removidos.
+    """
+    
+    NUMBERED_LINE = re.compile(r'^(?:(\d{1,4})\s+(.*\S)|(.*\S)\s+(\d{1,4})|(\d{1,4}))$')
+    
+    def __init__(self, edge_lines=4, min_pages=3, min_fraction=0.05, keep_pattern=r':(?:\s|$)', chars_per_token=4.0):
+        """
+        Args:
+            edge_lines: Linhas do topo e do fim de cada página analisadas
+            min_pages: Número mínimo de páginas em que a linha deve se repetir
+            min_fraction: Fração mínima das páginas do documento
+            keep_pattern: Linhas que nunca são removidas (padrão: rótulos com ':')
+            chars_per_token: Caracteres por token usados na estimativa de economia
+        """
+        self.edge_lines = edge_lines
+        self.min_pages = min_pages
+        self.min_fraction = min_fraction
+        self.keep = re.compile(keep_pattern) if keep_pattern else None
+        self.chars_per_token = chars_per_token
+        self.lines = set()
+        self.numbered = set()
+        self.num_pages = 0
+        self.savings = {}
+    
+    @property
+    def fitted(self):
+        return self.num_pages > 0
+    
+    @staticmethod
+    def _normalize(line):
+        return ' '.join(line.split())
+    
+    def _keys(self, line, page_num):
+        """Chaves de comparação da linha: texto exato e, se houver, (modelo com '#', deslocamento)"""
+        keys = [line]
+        match = self.NUMBERED_LINE.match(line)
+        if match:
+            lead, lead_rest, tail_rest, tail, alone = match.groups()
+            if alone is not None:
+                keys.append(('#', int(alone) - page_num))
+            elif lead is not None:
+                keys.append(('# ' + lead_rest, int(lead) - page_num))
+            else:
+                keys.append((tail_rest + ' #', int(tail) - page_num))
+        return keys
+    
+    def _edges(self, lines):
+        """Índices das linhas não vazias nas bordas (topo e fim) da página"""
+        filled = [index for index, line in enumerate(lines) if line]
+        return filled[:self.edge_lines], filled[::-1][:self.edge_lines]
+    
+    def fit(self, pages):
+        """
+        Aprende as linhas repetidas de um documento.
+        
+        Args:
+            pages: Registros de página ({'page', 'text'}) ou textos; para
+                textos, a posição na lista é usada como número da página
+        """
+        counts = {}
+        self.num_pages = 0
+        
+        for position, page in enumerate(pages, 1):
+            text, page_num = (page['text'], page['page']) if isinstance(page, dict) else (page, position)
+            lines = [self._normalize(line) for line in (text or '').split('\n')]
+            top, bottom = self._edges(lines)
+            
+            keys = set()
+            for index in set(top) | set(bottom):
+                if not (self.keep and self.keep.search(lines[index])):
+                    keys.update(self._keys(lines[index], page_num))
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+            self.num_pages += 1
+        
+        minimum = max(self.min_pages, self.min_fraction * self.num_pages)
+        repeated = {key for key, count in counts.items() if count >= minimum}
+        
+        # Mesmo modelo com números diferentes em outras páginas: é um dado que se repetiu
+        variants = {}
+        for key in counts:
+            if isinstance(key, str) and any(char.isdigit() for char in key):
+                variants.setdefault(re.sub(r'\d+', '#', key), set()).add(key)
+        self.lines = {
+            key for key in repeated
+            if isinstance(key, str) and len(variants.get(re.sub(r'\d+', '#', key), ())) <= 1
+        }
+        self.numbered = {key for key in repeated if not isinstance(key, str)}
+        self.savings = {}
+        return self
+    
+    def is_boilerplate(self, line, page_num):
+        """Indica se a linha (já normalizada) é repetida no documento"""
+        if not line or (self.keep and self.keep.search(line)):
+            return False
+        keys = self._keys(line, page_num)
+        return keys[0] in self.lines or any(key in self.numbered for key in keys[1:])
+    
+    def estimate_tokens(self, text):
+        """Estimativa de tokens do texto pelo número de caracteres"""
+        return int(-(-len(text) // self.chars_per_token))
+    
+    def strip(self, text, page_num):
+        """
+        Remove as linhas repetidas das bordas do texto da página.
+        
+        A economia de cada página fica em self.savings[page_num].
+        """
+        if not text or not self.fitted:
+            return text
+        
+        raw_lines = text.split('\n')
+        lines = [self._normalize(line) for line in raw_lines]
+        top, bottom = self._edges(lines)
+        removed = {index for index in set(top) | set(bottom) if self.is_boilerplate(lines[index], page_num)}
+        
+        stripped = '\n'.join(line for index, line in enumerate(raw_lines) if index not in removed).strip()
+        tokens_before = self.estimate_tokens(text)
+        tokens_after = self.estimate_tokens(stripped)
+        self.savings[page_num] = {
+            'linhas_removidas': len(removed),
+            'chars_removidos': len(text) - len(stripped),
+            'tokens_antes': tokens_before,
+            'tokens_depois': tokens_after,
+            'tokens_economizados': tokens_before - tokens_after
+        }
+        return stripped
+    
+    def report(self):
+        """Economia por página e total das páginas limpas desde o último fit"""
+        pages = [dict(page=page_num, **saving) for page_num, saving in sorted(self.savings.items())]
+        saved = sum(page['tokens_economizados'] for page in pages)
+        before = sum(page['tokens_antes'] for page in pages)
+        return {
+            'linhas_aprendidas': len(self.lines) + len(self.numbered),
+            'paginas': pages,
+            'tokens_economizados': saved,
+            'tokens_por_pagina': saved / len(pages) if pages else 0.0,
+            'reducao': saved / before if before else 0.0
+        }
+
+class FieldScanner:
+    """
+    Localiza campos rotulados sem rodar um `re.search` completo por campo.
+    
+    Cada campo é descrito pelo rótulo com que começa (texto literal) e pelo
+    padrão completo, compilado uma única vez. O texto é convertido para
+    minúsculas uma vez e as posições de cada rótulo são obtidas com
+    `str.find`; o padrão do campo só é testado (com `.match`) nessas
+    posições, na ordem do texto. O resultado é o mesmo de `re.search` com o
+    padrão completo, sem o retrocesso de `.*?` sobre o texto inteiro.
+    """
+    
+    def __init__(self, fields, flags=re.IGNORECASE):
+        """
+        Args:
+            fields: {nome: (rótulo, padrão)}; o padrão deve começar pelo rótulo
+            flags: Flags de compilação dos padrões
+        """
+        self.labels = []
+        self.field_labels = {}
+        self.patterns = {}
+        
+        for name, (label, pattern) in fields.items():
+            label = label.lower()
+            if label not in self.labels:
+                self.labels.append(label)
+            self.field_labels[name] = label
+            self.patterns[name] = re.compile(pattern, flags)
+        
+        # Usada apenas quando a conversão para minúsculas muda o tamanho do texto
+        alternatives = '|'.join(f'(?P<l{index}>{re.escape(label)})' for index, label in enumerate(self.labels))
+        self.master = re.compile(f'(?=(?:{alternatives}))', re.IGNORECASE)
+    
+    def scan(self, text):
+        """Localiza os rótulos no texto e retorna {rótulo: [posições em ordem]}"""
+        text_lower = text.lower()
+        
+        if len(text_lower) != len(text):
+            hits = {label: [] for label in self.labels}
+            for match in self.master.finditer(text):
+                hits[self.labels[int(match.lastgroup[1:])]].append(match.start())
+            return hits
+        
+        hits = {}
+        for label in self.labels:
+            positions = []
+            position = text_lower.find(label)
+            while position >= 0:
+                positions.append(position)
+                position = text_lower.find(label, position + 1)
+            hits[label] = positions
+        return hits
+    
+    def has_label(self, label, hits):
+        """Indica se o rótulo aparece no texto"""
+        return bool(hits.get(label.lower()))
+    
+    def first(self, name, text, hits, start=0):
+        """Primeira ocorrência do campo a partir de `start` (equivale a re.search)"""
+        pattern = self.patterns[name]
+        for position in hits[self.field_labels[name]]:
+            if position < start:
+                continue
+            match = pattern.match(text, position)
+            if match:
+                return match
+        return None
+
 class DataStructureDetector:
     """
     Classe para detectar dados estruturados em texto extraído de PDFs.
     Otimizada para dados ferroviários.
     """
     
+    # Campos extraídos por extract_structured_data: nome -> (rótulo inicial, padrão)
+    FIELDS = {
+        'codigo': ('código:', r'Código:\s*([A-Z0-9-]+)'),
+        'categoria': ('categoria:', r'Categoria:\s*([^\n]+)'),
+        'tipo_empreendimento': ('tipo', r'Tipo\s+de\s+Empreendimento:\s*([^\n]+)'),
+        'extensao': ('extensão', r'Extensão:\s*(\d+(?:\.\d+)?)\s*km'),
+        'tipo_bitola': ('tipo', r'Tipo\s+de\s+bitola:\s*([^\n]+)'),
+        'total_estacoes': ('estações:', r'estações:\s*(\d+)'),
+        'municipio': ('acumulada:', r'acumulada:'),
+        'tempo_viagem_ida': ('tempo', r'Tempo\s+de\s+viagem.*?ida.*?:\s*(\d+)\s*minutos'),
+        'tempo_viagem_ida_volta': ('tempo', r'Tempo\s+de\s+viagem.*?ida\s+e\s+volta.*?:\s*(\d+)\s*minutos'),
+        'viagens_mes': ('viagens', r'Viagens\s+por\s+mês:\s*(\d+)'),
+        'dias_operacao_ano': ('dias', r'Dias\s+de\s+operação\s+por\s+ano:\s*(\d+)'),
+        'demanda_ano': ('demanda', r'Demanda\s+por\s+ano:\s*([\d.,]+)\s*passageiros'),
+        'producao_quilometrica': ('produção', r'Produção\s+quilométrica\s+por\s+ano:\s*([\d.,]+)\s*km'),
+        'classe_economica': ('classe', r'Classe\s+Econômica:'),
+        'classe_executiva': ('classe', r'Classe\s+Executiva:'),
+        'tarifa_fixa': ('tarifa', r'Tarifa\s+fixa:\s*R\$\s*([\d,]+)'),
+        'tarifa_quilometrica': ('tarifa', r'Tarifa\s+quilométrica:\s*R\$\s*([\d,]+)'),
+        'pass_ano_km': ('pass', r'Pass\.ano/km:\s*([\d.,]+)'),
+        'receita_ano_km': ('receita', r'Receita\s+ano/km:\s*R\$\s*([\d.,]+)')
+    }
+    
+    _scanner = None
+    
+    MUNICIPIO_PATTERN = re.compile(
+        r'(\d+)\.\s*([^-]+?)\s*-\s*Extensão\s+acumulada:\s*(\d+(?:\.\d+)?)\s*km', re.IGNORECASE
+    )
+    
     def __init__(self, verbose=True):
         self.verbose = verbose
         self.keywords = [
@@ -233,6 +1378,10 @@ class DataStructureDetector:
             'operacional', 'física', 'receita', 'classe', 'econômica', 'executiva',
             'produção', 'tempo', 'categoria', 'empreendimento'
         ]
+        # Padrões compilados uma única vez e compartilhados entre as instâncias
+        if DataStructureDetector._scanner is None:
+            DataStructureDetector._scanner = FieldScanner(self.FIELDS)
+        self.scanner = DataStructureDetector._scanner
     
     def _print(self, message):
         """Print condicional baseado no verbose"""
@@ -257,145 +1406,597 @@ class DataStructureDetector:
     def extract_structured_data(self, text):
         """Extrai dados estruturados usando regex"""
         data = {}
+        hits = self.scanner.scan(text)
         
         # Extrair código
-        codigo_match = re.search(r'Código:\s*([A-Z0-9-]+)', text, re.IGNORECASE)
+        codigo_match = self.scanner.first('codigo', text, hits)
         if codigo_match:
             data['codigo'] = codigo_match.group(1)
         
         # Extrair categoria
-        categoria_match = re.search(r'Categoria:\s*([^\n]+)', text, re.IGNORECASE)
+        categoria_match = self.scanner.first('categoria', text, hits)
         if categoria_match:
             data['categoria'] = categoria_match.group(1).strip()
         
         # Extrair tipo de empreendimento
-        tipo_match = re.search(r'Tipo\s+de\s+Empreendimento:\s*([^\n]+)', text, re.IGNORECASE)
+        tipo_match = self.scanner.first('tipo_empreendimento', text, hits)
         if tipo_match:
             data['tipo_empreendimento'] = tipo_match.group(1).strip()
         
         # Extrair extensão
-        extensao_match = re.search(r'Extensão:\s*(\d+(?:\.\d+)?)\s*km', text, re.IGNORECASE)
+        extensao_match = self.scanner.first('extensao', text, hits)
         if extensao_match:
             data['extensao_km'] = float(extensao_match.group(1))
         
         # Extrair tipo de bitola
-        bitola_match = re.search(r'Tipo\s+de\s+bitola:\s*([^\n]+)', text, re.IGNORECASE)
+        bitola_match = self.scanner.first('tipo_bitola', text, hits)
         if bitola_match:
             data['tipo_bitola'] = bitola_match.group(1).strip()
         
         # Extrair número de estações
-        estacoes_match = re.search(r'(?:Total\s+de\s+)?estações:\s*(\d+)', text, re.IGNORECASE)
+        estacoes_match = self.scanner.first('total_estacoes', text, hits)
         if estacoes_match:
             data['total_estacoes'] = int(estacoes_match.group(1))
         
-        # Extrair municípios
+        # Extrair municípios (só procura se o rótulo "acumulada:" aparecer no texto)
         municipios = []
-        municipio_pattern = r'(\d+)\.\s*([^-]+?)\s*-\s*Extensão\s+acumulada:\s*(\d+(?:\.\d+)?)\s*km'
-        for match in re.finditer(municipio_pattern, text, re.IGNORECASE):
-            municipios.append({
-                'ordem': int(match.group(1)),
-                'municipio': match.group(2).strip(),
-                'extensao_acumulada_km': float(match.group(3))
-            })
+        if self.scanner.has_label('acumulada:', hits):
+            for match in self.MUNICIPIO_PATTERN.finditer(text):
+                municipios.append({
+                    'ordem': int(match.group(1)),
+                    'municipio': match.group(2).strip(),
+                    'extensao_acumulada_km': float(match.group(3))
+                })
         
         if municipios:
             data['municipios_atendidos'] = municipios
         
         # Extrair características operacionais
-        operacionais = self._extract_operational_data(text)
+        operacionais = self._extract_operational_data(text, hits)
         if operacionais:
             data['caracteristicas_operacionais'] = operacionais
         
         # Extrair tarifas
-        tarifas = self._extract_tariff_data(text)
+        tarifas = self._extract_tariff_data(text, hits)
         if tarifas:
             data['tarifas'] = tarifas
         
         # Extrair desempenho
-        desempenho = self._extract_performance_data(text)
+        desempenho = self._extract_performance_data(text, hits)
         if desempenho:
             data['desempenho'] = desempenho
         
         return data
     
-    def _extract_operational_data(self, text):
+    def _extract_operational_data(self, text, hits=None):
         """Extrai características operacionais"""
         operacionais = {}
+        if hits is None:
+            hits = self.scanner.scan(text)
         
         # Tempo de viagem ida
-        tempo_ida_match = re.search(r'Tempo\s+de\s+viagem.*?ida.*?:\s*(\d+)\s*minutos', text, re.IGNORECASE)
+        tempo_ida_match = self.scanner.first('tempo_viagem_ida', text, hits)
         if tempo_ida_match:
             operacionais['tempo_viagem_ida_min'] = int(tempo_ida_match.group(1))
         
         # Tempo de viagem ida e volta
-        tempo_ida_volta_match = re.search(r'Tempo\s+de\s+viagem.*?ida\s+e\s+volta.*?:\s*(\d+)\s*minutos', text, re.IGNORECASE)
+        tempo_ida_volta_match = self.scanner.first('tempo_viagem_ida_volta', text, hits)
         if tempo_ida_volta_match:
             operacionais['tempo_viagem_ida_volta_min'] = int(tempo_ida_volta_match.group(1))
         
         # Viagens por mês
-        viagens_match = re.search(r'Viagens\s+por\s+mês:\s*(\d+)', text, re.IGNORECASE)
+        viagens_match = self.scanner.first('viagens_mes', text, hits)
         if viagens_match:
             operacionais['viagens_mes'] = int(viagens_match.group(1))
         
         # Dias de operação por ano
-        dias_match = re.search(r'Dias\s+de\s+operação\s+por\s+ano:\s*(\d+)', text, re.IGNORECASE)
+        dias_match = self.scanner.first('dias_operacao_ano', text, hits)
         if dias_match:
             operacionais['dias_operacao_ano'] = int(dias_match.group(1))
         
         # Demanda por ano
-        demanda_match = re.search(r'Demanda\s+por\s+ano:\s*([\d.,]+)\s*passageiros', text, re.IGNORECASE)
-        if demanda_match:
-            demanda_str = demanda_match.group(1).replace('.', '').replace(',', '')
-            operacionais['demanda_ano'] = int(demanda_str)
+        demanda = self._numero(self.scanner.first('demanda_ano', text, hits), int)
+        if demanda is not None:
+            operacionais['demanda_ano'] = demanda
         
         # Produção quilométrica
-        producao_match = re.search(r'Produção\s+quilométrica\s+por\s+ano:\s*([\d.,]+)\s*km', text, re.IGNORECASE)
-        if producao_match:
-            producao_str = producao_match.group(1).replace('.', '').replace(',', '')
-            operacionais['producao_quilometrica_km_ano'] = int(producao_str)
+        producao = self._numero(self.scanner.first('producao_quilometrica', text, hits), int)
+        if producao is not None:
+            operacionais['producao_quilometrica_km_ano'] = producao
         
         return operacionais
     
-    def _extract_tariff_data(self, text):
+    @staticmethod
+    def _numero(match, tipo=float):
+        """Número do grupo 1 no formato brasileiro; None sem match ou com número ambíguo/malformado"""
+        if not match:
+            return None
+        try:
+            return numero_br(match.group(1), tipo)
+        except ValueError:
+            return None
+    
+    def _extract_tariff_data(self, text, hits=None):
         """Extrai dados de tarifas"""
         tarifas = {}
+        if hits is None:
+            hits = self.scanner.scan(text)
         
-        # Tarifa econômica
-        tarifa_eco_fixa = re.search(r'Classe\s+Econômica:.*?Tarifa\s+fixa:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
-        tarifa_eco_km = re.search(r'Classe\s+Econômica:.*?Tarifa\s+quilométrica:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
-        
-        if tarifa_eco_fixa or tarifa_eco_km:
-            tarifas['economica'] = {}
-            if tarifa_eco_fixa:
-                tarifas['economica']['tarifa_fixa_reais'] = float(tarifa_eco_fixa.group(1).replace(',', '.'))
-            if tarifa_eco_km:
-                tarifas['economica']['tarifa_quilometrica_reais'] = float(tarifa_eco_km.group(1).replace(',', '.'))
-        
-        # Tarifa executiva
-        tarifa_exec_fixa = re.search(r'Classe\s+Executiva:.*?Tarifa\s+fixa:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
-        tarifa_exec_km = re.search(r'Classe\s+Executiva:.*?Tarifa\s+quilométrica:\s*R\$\s*([\d,]+)', text, re.IGNORECASE | re.DOTALL)
-        
-        if tarifa_exec_fixa or tarifa_exec_km:
-            tarifas['executiva'] = {}
-            if tarifa_exec_fixa:
-                tarifas['executiva']['tarifa_fixa_reais'] = float(tarifa_exec_fixa.group(1).replace(',', '.'))
-            if tarifa_exec_km:
-                tarifas['executiva']['tarifa_quilometrica_reais'] = float(tarifa_exec_km.group(1).replace(',', '.'))
+        # Cada tarifa é a primeira ocorrência após o rótulo da classe
+        # (equivale ao antigo 'Classe ...:.*?Tarifa ...' com re.DOTALL, sem retrocesso)
+        for classe in ['economica', 'executiva']:
+            classe_match = self.scanner.first(f'classe_{classe}', text, hits)
+            if not classe_match:
+                continue
+            
+            tarifa_fixa = self.scanner.first('tarifa_fixa', text, hits, start=classe_match.end())
+            tarifa_km = self.scanner.first('tarifa_quilometrica', text, hits, start=classe_match.end())
+            
+            valores = {}
+            tarifa_fixa = self._numero(tarifa_fixa)
+            if tarifa_fixa is not None:
+                valores['tarifa_fixa_reais'] = tarifa_fixa
+            tarifa_km = self._numero(tarifa_km)
+            if tarifa_km is not None:
+                valores['tarifa_quilometrica_reais'] = tarifa_km
+            if valores:
+                tarifas[classe] = valores
         
         return tarifas
     
-    def _extract_performance_data(self, text):
+    def _extract_performance_data(self, text, hits=None):
         """Extrai dados de desempenho"""
         desempenho = {}
+        if hits is None:
+            hits = self.scanner.scan(text)
         
         # Pass.ano/km
-        pass_ano_km_match = re.search(r'Pass\.ano/km:\s*([\d.,]+)', text, re.IGNORECASE)
-        if pass_ano_km_match:
-            desempenho['pass_ano_km'] = float(pass_ano_km_match.group(1).replace('.', '').replace(',', '.'))
+        pass_ano_km = self._numero(self.scanner.first('pass_ano_km', text, hits))
+        if pass_ano_km is not None:
+            desempenho['pass_ano_km'] = pass_ano_km
         
         # Receita ano/km
-        receita_match = re.search(r'Receita\s+ano/km:\s*R\$\s*([\d.,]+)', text, re.IGNORECASE)
-        if receita_match:
-            desempenho['receita_ano_km'] = float(receita_match.group(1).replace('.', '').replace(',', '.'))
+        receita = self._numero(self.scanner.first('receita_ano_km', text, hits))
+        if receita is not None:
+            desempenho['receita_ano_km'] = receita
         
         return desempenho
+
+class TextQualityScorer:
+    """
+    Pontua rapidamente a qualidade do texto extraído de uma página.
+    
+    Combina a proporção de caracteres imprimíveis, a presença de sequências
+    típicas de mojibake (ex.: 'Ã§' no lugar de 'ç'), o tamanho do texto e os
+    acertos de palavras-chave do DataStructureDetector. A nota vai de 0 a 1.
+    """
+    
+    MOJIBAKE_MARKERS = ['Ã', 'Â', 'â€', '\ufffd', '(cid:']
+    
+    def __init__(self, keywords=None, threshold=0.75, min_chars=20):
+        if keywords is None:
+            keywords = DataStructureDetector(verbose=False).keywords
+        self.keywords = keywords
+        self.threshold = threshold
+        self.min_chars = min_chars
+    
+    def score(self, text):
+        """Retorna a nota da página e os indicadores usados no cálculo"""
+        if not text:
+            return {'score': 0.0, 'printable_ratio': 0.0, 'mojibake_ratio': 0.0, 'keyword_hits': 0}
+        
+        total = len(text)
+        printable = sum(1 for char in text if char.isprintable() or char in '\n\t')
+        printable_ratio = printable / total
+        
+        mojibake = sum(text.count(marker) for marker in self.MOJIBAKE_MARKERS)
+        mojibake_ratio = mojibake / total
+        
+        text_lower = text.lower()
+        keyword_hits = sum(1 for keyword in self.keywords if keyword in text_lower)
+        
+        # Texto limpo vale até 0.8; palavras-chave completam a nota
+        quality = printable_ratio * max(0.0, 1.0 - 20 * mojibake_ratio)
+        quality *= min(1.0, total / self.min_chars)
+        score = 0.8 * quality + 0.2 * min(1.0, keyword_hits / 3)
+        
+        return {
+            'score': round(score, 4),
+            'printable_ratio': round(printable_ratio, 4),
+            'mojibake_ratio': round(mojibake_ratio, 4),
+            'keyword_hits': keyword_hits
+        }
+
+class PageClassifier:
+    """
+    Triagem rápida das páginas de um PDF para localizar os "Perfil da Proposta".
+    
+    Cada página é classificada como início de perfil, continuação, mapa ou
+    outra, a partir do check_structured_data do DataStructureDetector e de
+    marcadores do layout. As páginas são agrupadas por proposta, de modo que
+    só as páginas com registros sejam enviadas ao LLM.
+    """
+    
+    START = 'inicio_perfil'
+    CONTINUATION = 'continuacao'
+    MAP = 'mapa'
+    OTHER = 'outro'
+    
+    PROFILE_HEADER = 'perfil da proposta'
+    START_MARKERS = ['proposta:', 'código:']
+    CONTINUATION_MARKERS = ['características da frota', 'tipo carros', 'frota total', 'total de composições']
+    # Página de mapa: título em linha própria ("Mapa de situação"), ou "mapa" com
+    # elementos de figura (legenda, escala) ou com pouco texto (só rótulos do mapa)
+    MAP_TITLE = re.compile(r'^\s*mapa(?: de situação)?\s*$', re.MULTILINE | re.IGNORECASE)
+    MAP_WORD = re.compile(r'\bmapas?\b', re.IGNORECASE)
+    MAP_MARKERS = ['legenda', 'escala']
+    MAP_MAX_WORDS = 60
+    
+    def __init__(self, detector=None, verbose=True):
+        self.detector = detector or DataStructureDetector(verbose=False)
+        self.verbose = verbose
+    
+    def _print(self, message):
+        """Print condicional baseado no verbose"""
+        if self.verbose:
+            print(message)
+    
+    def classify(self, text):
+        """
+        Classifica o texto de uma página, sem considerar as páginas vizinhas.
+        
+        Returns:
+            dict com 'label', 'is_structured', 'keyword_count' e 'codigo'
+        """
+        text = text or ''
+        text_lower = text.lower()
+        check = self.detector.check_structured_data(text)
+        
+        has_header = self.PROFILE_HEADER in text_lower
+        has_start = all(marker in text_lower for marker in self.START_MARKERS)
+        has_continuation = any(marker in text_lower for marker in self.CONTINUATION_MARKERS)
+        has_map = self.is_map(text)
+        
+        if has_start and (has_header or check['is_structured']):
+            label = self.START
+        elif has_continuation or (has_header and check['is_structured']):
+            label = self.CONTINUATION
+        elif has_map:
+            label = self.MAP
+        else:
+            label = self.OTHER
+        
+        codigo = None
+        if label == self.START:
+            codigo_match = re.search(r'Código:\s*([^\n]+)', text, re.IGNORECASE)
+            if codigo_match:
+                codigo = codigo_match.group(1).strip()
+        
+        return {
+            'label': label,
+            'is_structured': check['is_structured'],
+            'keyword_count': check['keyword_count'],
+            'codigo': codigo
+        }
+    
+    def is_map(self, text):
+        """Indica se a página é um mapa; só mencionar um mapa no texto corrido não basta"""
+        if self.MAP_TITLE.search(text):
+            return True
+        if not self.MAP_WORD.search(text):
+            return False
+        text_lower = text.lower()
+        return any(marker in text_lower for marker in self.MAP_MARKERS) or len(text.split()) <= self.MAP_MAX_WORDS
+    
+    def scan(self, reader, start_page=1, end_page=None, method='PyPDF2'):
+        """
+        Percorre as páginas uma única vez com a biblioteca mais barata e classifica cada uma.
+        
+        Uma continuação só é aceita logo após o início (ou outra continuação)
+        de um perfil; sem ele a página passa a 'outro'.
+        """
+        pages = []
+        previous = self.OTHER
+        
+        # Sessão aninhada: se o chamador já abriu o leitor, o documento continua aberto depois
+        with reader:
+            for page_num, text in reader.iter_text(method, start_page, end_page):
+                result = self.classify(text)
+                if result['label'] == self.CONTINUATION and previous not in (self.START, self.CONTINUATION):
+                    result['label'] = self.OTHER
+                result['page'] = page_num
+                pages.append(result)
+                previous = result['label']
+        
+        return pages
+    
+    def group_pages(self, pages):
+        """
+        Agrupa as páginas classificadas por proposta.
+        
+        Cada grupo começa em um início de perfil e recebe as continuações
+        seguintes; páginas de mapa não entram no grupo e 'outro' o encerra.
+        
+        Returns:
+            Lista de dicts com 'start_page', 'pages' e 'codigo'
+        """
+        groups = []
+        current = None
+        
+        for page in pages:
+            if page['label'] == self.START:
+                current = {'start_page': page['page'], 'pages': [page['page']], 'codigo': page['codigo']}
+                groups.append(current)
+            elif page['label'] == self.CONTINUATION and current is not None:
+                current['pages'].append(page['page'])
+            elif page['label'] == self.OTHER:
+                current = None
+        
+        return groups
+    
+    def locate(self, reader, start_page=1, end_page=None, method='PyPDF2'):
+        """Classifica as páginas do PDF e retorna os grupos a enviar para extração"""
+        pages = self.scan(reader, start_page, end_page, method)
+        groups = self.group_pages(pages)
+        
+        counts = {}
+        for page in pages:
+            counts[page['label']] = counts.get(page['label'], 0) + 1
+        self._print(f"🗂️ {len(pages)} páginas classificadas: {counts}")
+        self._print(f"📑 {len(groups)} perfis de proposta localizados")
+        
+        return groups
+
+
+class LayoutExtractor:
+    """
+    Extração de pares chave/valor e tabelas pela geometria das palavras.
+    
+    As páginas do "Perfil da Proposta" têm duas colunas; no texto corrido as
+    colunas se misturam. Aqui as palavras (com coordenadas do pdfplumber) são
+    agrupadas em linhas pela posição vertical e em blocos pelos espaços
+    horizontais: cada rótulo terminado em ":" recebe o valor do mesmo bloco, e
+    as tabelas conhecidas (frota, tarifas por classe, municípios) têm as
+    colunas definidas pela posição das palavras do cabeçalho.
+    """
+    
+    # Cabeçalhos de tabela: nome -> (início da linha de cabeçalho, palavras que abrem cada coluna)
+    TABLES = {
+        'frota': ('tipo carros', ('tipo', 'quantidade', 'especifica')),
+        'tarifas': ('classe', ('classe',)),
+        'municipios': ('municípios atendidos', ())
+    }
+    
+    NUMBER_PATTERN = re.compile(r'^\d[\d.,]*$')
+    
+    # Rótulos das fichas (regional e metropolitano), usados para separar dois
+    # pares que ficaram no mesmo bloco: "Proposta: Araguari/ Campos Altos Código: RP 12-33"
+    LABELS = frozenset(label.lower() for label in [
+        'Proposta', 'Código', 'Categoria', 'Versão', 'Tipo de empreendimento', 'Extensão', 'Extensão (km)',
+        'Tipo bitola', 'Total de estações', 'Tempo de viagem ida (min)', 'Tempo de viagem ida & volta (min)',
+        'Viagens (mês)', 'Dias de operação (ano)', 'Demanda (ano)', 'Produção quilométrica (km/ano)',
+        'Receita anual (R$)', 'Pass,ano/km', 'Pass.ano/km', 'Receita,ano/km', 'Receita.ano/km',
+        'Total de composições', 'Comprimento da composição (m)', 'Capacidade (PAX/viagem)',
+        'Tempo de ciclo (ida + volta)', 'Número de viagens', 'Produção quilométrica', 'Headway médio',
+        'Capacidade do Trem', 'Demanda total (dia útil)', 'Tarifa do serviço', 'Receita DU', 'Receita mês',
+        'Receita ano', 'Frota Total (operacional + reserva)', 'Total de carros de passageiros/trem'
+    ])
+    
+    def __init__(self, y_tolerance=3, x_gap=12):
+        # Diferença máxima de topo (pt) entre palavras da mesma linha
+        self.y_tolerance = y_tolerance
+        # Espaço horizontal mínimo (pt) que separa dois blocos da mesma linha
+        self.x_gap = x_gap
+    
+    def lines(self, words):
+        """Agrupa as palavras em linhas (ordem de leitura), cada uma ordenada por x"""
+        lines = []
+        for word in sorted(words, key=lambda word: (round(word['top']), word['x0'])):
+            if lines and abs(word['top'] - lines[-1][0]['top']) <= self.y_tolerance:
+                lines[-1].append(word)
+            else:
+                lines.append([word])
+        return [sorted(line, key=lambda word: word['x0']) for line in lines]
+    
+    def blocks(self, line):
+        """Divide uma linha em blocos separados por espaços maiores que x_gap"""
+        blocks = []
+        for word in line:
+            if blocks and word['x0'] - blocks[-1][-1]['x1'] <= self.x_gap:
+                blocks[-1].append(word)
+            else:
+                blocks.append([word])
+        return blocks
+    
+    @staticmethod
+    def _join(words):
+        return ' '.join(word['text'] for word in words).strip()
+    
+    def _table_name(self, line):
+        text = self._join(line).lower()
+        for name, (header, _) in self.TABLES.items():
+            if text.startswith(header):
+                return name
+        return None
+    
+    def _label_start(self, words):
+        """
+        Índice em que começa o rótulo no fim de `words` (o valor anterior fica com o que vem antes):
+        o rótulo conhecido mais longo; sem nenhum, a última palavra com inicial maiúscula.
+        """
+        for start in range(len(words)):
+            if ' '.join(words[start:]).lower() in self.LABELS:
+                return start
+        for start in range(len(words) - 1, -1, -1):
+            if words[start][:1].isupper():
+                return start
+        return len(words) - 1
+    
+    def _pairs(self, line):
+        """
+        Pares (rótulo, valor) de uma linha: em cada bloco o rótulo vai até a
+        palavra com ":" e o valor até o próximo rótulo do mesmo bloco.
+        """
+        pairs = []
+        for block in self.blocks(line):
+            label, value = None, []
+            for word in block:
+                text = word['text']
+                if ':' not in text or self.NUMBER_PATTERN.match(text):
+                    value.append(text)
+                    continue
+                before, _, after = text.partition(':')
+                label_words = value + [before] if before else value
+                if label is not None:
+                    # Dois rótulos no mesmo bloco (sem espaço entre as colunas):
+                    # o valor do anterior vai até o início do rótulo seguinte
+                    start = self._label_start(label_words)
+                    pairs.append((label, label_words[:start]))
+                    label_words = label_words[start:]
+                label = ' '.join(label_words).strip()
+                value = [after] if after else []
+            if label is not None:
+                pairs.append((label, value))
+        return [(label, ' '.join(value) if value else None) for label, value in pairs]
+    
+    def _header_columns(self, line, markers):
+        """Colunas do cabeçalho: (título, x0, x1), uma para cada palavra que abre coluna"""
+        columns = []
+        for word in line:
+            if any(word['text'].lower().startswith(marker) for marker in markers) or not columns:
+                columns.append([word['text'], word['x0'], word['x1']])
+            else:
+                columns[-1][0] += ' ' + word['text']
+                columns[-1][2] = word['x1']
+        return [tuple(column) for column in columns]
+    
+    @staticmethod
+    def _assign(line, columns):
+        """Distribui as palavras da linha nas colunas pelo centro de cada palavra"""
+        limits = [(left[2] + right[1]) / 2 for left, right in zip(columns, columns[1:])]
+        cells = [[] for _ in columns]
+        for word in line:
+            center = (word['x0'] + word['x1']) / 2
+            index = sum(1 for limit in limits if center >= limit)
+            cells[index].append(word['text'])
+        return [' '.join(cell) for cell in cells]
+    
+    def _table_rows(self, lines, start):
+        """Linhas de uma tabela a partir de `start`: até um rótulo com ":" ou um salto vertical"""
+        rows = []
+        previous = lines[start - 1]
+        for line in lines[start:]:
+            height = max(word['bottom'] - word['top'] for word in previous) or 10
+            if line[0]['top'] - previous[0]['top'] > 2.5 * height:
+                break
+            if self._table_name(line) or any(':' in word['text'] for word in line):
+                break
+            rows.append(line)
+            previous = line
+        return rows
+    
+    def _frota(self, header, rows):
+        columns = self._header_columns(header, self.TABLES['frota'][1])
+        titles = [column[0] for column in columns]
+        return [dict(zip(titles, self._assign(row, columns))) for row in rows]
+    
+    def _tarifas(self, header, rows):
+        """Grade de tarifas: {classe: {rótulo: valor}}, cada célula é "valor rótulo" """
+        columns = self._header_columns(header, self.TABLES['tarifas'][1])
+        grid = {column[0]: {} for column in columns}
+        for row in rows:
+            for (title, _, _), cell in zip(columns, self._assign(row, columns)):
+                words = cell.split()
+                numbers = [word for word in words if self.NUMBER_PATTERN.match(word)]
+                if numbers:
+                    label = ' '.join(word for word in words if word not in numbers)
+                    grid[title][label] = numbers[0]
+        return grid
+    
+    def _municipios(self, header, rows):
+        """Municípios e extensão acumulada, lidos coluna a coluna"""
+        entries = []
+        for row_index, row in enumerate(rows):
+            name = []
+            for word in row:
+                if self.NUMBER_PATTERN.match(word['text']) and name:
+                    entries.append({'x0': name[0]['x0'], 'row': row_index,
+                                    'municipio': self._join(name), 'km': word['text']})
+                    name = []
+                else:
+                    name.append(word)
+        
+        starts = []
+        for entry in sorted(entries, key=lambda entry: entry['x0']):
+            if not starts or entry['x0'] - starts[-1] > self.x_gap:
+                starts.append(entry['x0'])
+            entry['column'] = len(starts) - 1
+        
+        entries.sort(key=lambda entry: (entry['column'], entry['row']))
+        return [{'municipio': entry['municipio'], 'km': entry['km']} for entry in entries]
+    
+    def extract(self, words):
+        """
+        Extrai os pares e as tabelas de uma página.
+        
+        Args:
+            words: Palavras da página (ver PDFReader.iter_words)
+        
+        Returns:
+            dict com 'pares' ([{'chave', 'valor'}]) e 'tabelas' ({nome: linhas})
+        """
+        lines = self.lines(words)
+        pairs, tables = [], {}
+        index = 0
+        
+        while index < len(lines):
+            line = lines[index]
+            name = self._table_name(line)
+            if name:
+                rows = self._table_rows(lines, index + 1)
+                tables[name] = getattr(self, f'_{name}')(line, rows)
+                if name == 'municipios':
+                    pairs.extend({'chave': label, 'valor': value} for label, value in self._pairs(line))
+                index += 1 + len(rows)
+                continue
+            
+            for label, value in self._pairs(line):
+                if value is None:
+                    # Rótulo sem valor na linha: lista nas linhas seguintes sem ":" (ex.: Tipo de empreendimento)
+                    items = []
+                    while index + 1 < len(lines) and not self._table_name(lines[index + 1]) \
+                            and not any(':' in word['text'] for word in lines[index + 1]):
+                        text = self._join(lines[index + 1])
+                        if items and text[:1].islower():
+                            items[-1] += ' ' + text  # continuação da linha anterior
+                        else:
+                            items.append(text)
+                        index += 1
+                    value = items or None
+                pairs.append({'chave': label, 'valor': value})
+            index += 1
+        
+        return {'pares': pairs, 'tabelas': tables}
+    
+    @staticmethod
+    def to_text(result):
+        """Texto compacto "chave: valor" (uma linha por dado), para regras ou para o LLM"""
+        lines = []
+        for pair in result['pares']:
+            value = pair['valor']
+            if isinstance(value, list):
+                value = '; '.join(value)
+            if value is not None:
+                lines.append(f"{pair['chave']}: {value}")
+        
+        tables = result['tabelas']
+        if 'municipios' in tables:
+            lines.append('Municípios atendidos: ' + '; '.join(
+                f"{entry['municipio']} {entry['km']}" for entry in tables['municipios']))
+        for classe, values in tables.get('tarifas', {}).items():
+            for label, value in values.items():
+                lines.append(f"{classe} - {label}: {value}")
+        if tables.get('frota'):
+            lines.append(' | '.join(tables['frota'][0]))
+            lines.extend(' | '.join(row.values()) for row in tables['frota'])
+        return '\n'.join(lines)
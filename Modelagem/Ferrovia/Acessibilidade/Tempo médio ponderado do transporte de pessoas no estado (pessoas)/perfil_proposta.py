@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+🚆 Extração determinística do "Perfil da Proposta" do PEF
+Regras ajustadas ao layout real das fichas (trens regionais e metropolitanos),
+preenchendo o formulário JSON usado no notebook sem chamar o LLM
+"""
+
+import json
+import re
+from typing import Dict, List, Any, Optional
+
+from numeros_br import numero_br
+
+
+class PerfilPropostaExtractor:
+    """
+    Extrai os campos do "Perfil da Proposta da Ferrovia para Transporte de
+    Passageiros" a partir do texto das duas páginas da ficha.
+    
+    Há dois layouts: regional ("Extensão (km): 503", tarifas por classe) e
+    metropolitano ("Extensão: 52 (km)", "Tempo de ciclo", "Receita DU").
+    Cada campo recebe um status ('extraido', 'ausente' ou 'nao_aplicavel')
+    e uma confiança; a cobertura considera apenas os campos do layout.
+    """
+    
+    REGIONAL = 'regional'
+    METROPOLITANO = 'metropolitano'
+    
+    # Chaves do formulário do notebook; os nomes seguem os rótulos do documento
+    # ("Dias de operação (ano)", "Demanda (ano)", "Produção quilométrica (km/ano)")
+    CAMPOS_FORMULARIO = [
+        'Proposta', 'Código', 'Categoria', 'Tipo de empreendimento',
+        'Extensão (km)', 'Tipo bitola', 'Total de estações', 'Estações atendidas',
+        'Tempo de viagem ida (min)', 'Tempo de viagem ida & volta (min)', 'Viagens (mês)',
+        'Dias de operação (ano)', 'Demanda (ano)', 'Produção quilométrica (km/ano)', 'Tarifa do serviço',
+        'Receita anual (R$)', 'Pass.ano/km', 'Receita.ano/km',
+        'Frota Total (operacional + reserva)', 'Total de carros de passageiros/trem',
+        'Tipo carros', 'Quantidade/composição', 'Especificação', 'Capacidade (PAX/viagem)'
+    ]
+    
+    # Campos que só existem em um dos layouts e não estão no formulário
+    CAMPOS_EXTRAS = [
+        'Versão', 'Extensão acumulada (km)', 'Total de composições', 'Comprimento da composição (m)',
+        'Tempo de ciclo (ida + volta) (min)', 'Número de viagens (dia útil)', 'Produção quilométrica (km/dia)',
+        'Headway médio (min/hora pico manhã)', 'Capacidade do Trem (passageiros)', 'Nº de trens no Pico Manhã',
+        'Demanda total (dia útil)', 'Receita DU (R$)', 'Receita mês (R$)'
+    ]
+    
+    CAMPOS_COMUNS = [
+        'Proposta', 'Código', 'Categoria', 'Versão', 'Tipo de empreendimento', 'Extensão (km)',
+        'Total de estações', 'Tarifa do serviço', 'Receita anual (R$)', 'Pass.ano/km', 'Receita.ano/km',
+        'Tipo carros', 'Quantidade/composição', 'Especificação'
+    ]
+    
+    CAMPOS_LAYOUT = {
+        REGIONAL: CAMPOS_COMUNS + [
+            'Tipo bitola', 'Estações atendidas', 'Extensão acumulada (km)',
+            'Tempo de viagem ida (min)', 'Tempo de viagem ida & volta (min)', 'Viagens (mês)',
+            'Dias de operação (ano)', 'Demanda (ano)', 'Produção quilométrica (km/ano)',
+            'Total de composições', 'Comprimento da composição (m)', 'Capacidade (PAX/viagem)'
+        ],
+        METROPOLITANO: CAMPOS_COMUNS + [
+            'Tempo de ciclo (ida + volta) (min)', 'Número de viagens (dia útil)',
+            'Produção quilométrica (km/dia)', 'Headway médio (min/hora pico manhã)',
+            'Capacidade do Trem (passageiros)', 'Nº de trens no Pico Manhã', 'Demanda total (dia útil)',
+            'Receita DU (R$)', 'Receita mês (R$)',
+            'Frota Total (operacional + reserva)', 'Total de carros de passageiros/trem'
+        ]
+    }
+    
+    NUMERO = r'(\d[\d .,]*\d|\d)'
+    
+    # Campos numéricos de rótulo simples: nome -> (padrão, tipo)
+    PADROES_NUMERICOS = {
+        REGIONAL: {
+            'Extensão (km)': (r'Extensão \(km\):\s*' + NUMERO, float),
+            'Tempo de viagem ida (min)': (r'Tempo de viagem ida \(min\):\s*' + NUMERO, int),
+            'Tempo de viagem ida & volta (min)': (r'Tempo de viagem ida & volta \(min\):\s*' + NUMERO, int),
+            'Viagens (mês)': (r'Viagens \(mês\):\s*' + NUMERO, int),
+            'Dias de operação (ano)': (r'Dias de operação \(ano\):\s*' + NUMERO, int),
+            'Demanda (ano)': (r'Demanda \(ano\):\s*' + NUMERO, int),
+            'Produção quilométrica (km/ano)': (r'Produção quilométrica \(km/ano\):\s*' + NUMERO, int),
+            'Receita anual (R$)': (r'Receita anual \(R\$\):\s*' + NUMERO, float),
+            'Total de composições': (r'Total de composições:\s*' + NUMERO, int),
+            'Comprimento da composição (m)': (r'Comprimento da composição \(m\):\s*' + NUMERO, float),
+            'Capacidade (PAX/viagem)': (r'Capacidade \(PAX/viagem\):\s*' + NUMERO, int)
+        },
+        METROPOLITANO: {
+            'Extensão (km)': (r'Extensão:\s*' + NUMERO + r'\s*\(km\)', float),
+            'Tempo de ciclo (ida + volta) (min)': (r'Tempo de ciclo \(ida \+ volta\):\s*' + NUMERO, int),
+            'Número de viagens (dia útil)': (r'Número de viagens:\s*' + NUMERO, int),
+            'Produção quilométrica (km/dia)': (r'Produção quilométrica:\s*' + NUMERO, int),
+            'Headway médio (min/hora pico manhã)': (r'Headway médio:\s*' + NUMERO, float),
+            'Capacidade do Trem (passageiros)': (r'Capacidade do Trem:\s*' + NUMERO, int),
+            'Nº de trens no Pico Manhã': (r'N[º°o] de trens no Pico Manhã:?\s*' + NUMERO, int),
+            'Demanda total (dia útil)': (r'Demanda total \(dia útil\):\s*' + NUMERO, int),
+            'Tarifa do serviço': (r'Tarifa do serviço:\s*R\$\s*' + NUMERO, float),
+            'Receita DU (R$)': (r'Receita DU:\s*R\$\s*' + NUMERO, float),
+            'Receita mês (R$)': (r'Receita mês:\s*R\$\s*' + NUMERO, float),
+            'Receita anual (R$)': (r'Receita ano:\s*R\$\s*' + NUMERO, float),
+            'Frota Total (operacional + reserva)': (r'Frota Total \(operacional \+ reserva\):\s*' + NUMERO, int),
+            'Total de carros de passageiros/trem': (r'Total de carros de passageiros/trem:\s*' + NUMERO, int)
+        }
+    }
+    
+    PADROES_COMUNS = {
+        'Total de estações': (r'Total de estações:\s*' + NUMERO, int),
+        'Pass.ano/km': (r'Pass[.,]ano/km:\s*' + NUMERO, float),
+        'Receita.ano/km': (r'Receita[.,]ano/km:\s*' + NUMERO, float)
+    }
+    
+    # Seções que encerram as listas (tipo de empreendimento, municípios, frota)
+    FIM_SECAO = re.compile(
+        r'^(Características|Dados operacionais|Demanda e receita|Desempenho|Tarifa do serviço|'
+        r'Capacidade|Mapa de situação|Plano Estratégico|Perfil da Proposta|\d+$)', re.IGNORECASE
+    )
+    
+    # Status que contam como preenchidos na cobertura
+    PREENCHIDOS = ('extraido', 'llm')
+    
+    # Confiança atribuída aos valores vindos do LLM no modo híbrido
+    CONFIANCA_LLM = 0.5
+    
+    # Rótulos procurados no texto para montar o contexto de cada campo no modo híbrido
+    ROTULOS_CONTEXTO = {
+        'Proposta': ['Proposta:'],
+        'Código': ['Código:'],
+        'Categoria': ['Categoria:'],
+        'Versão': ['Versão:'],
+        'Tipo de empreendimento': ['Tipo de empreendimento'],
+        'Extensão (km)': ['Extensão'],
+        'Tipo bitola': ['bitola'],
+        'Total de estações': ['estações'],
+        'Estações atendidas': ['Municípios atendidos', 'Estações'],
+        'Extensão acumulada (km)': ['Municípios atendidos'],
+        'Tempo de viagem ida (min)': ['Tempo de viagem'],
+        'Tempo de viagem ida & volta (min)': ['Tempo de viagem'],
+        'Viagens (mês)': ['Viagens'],
+        'Dias de operação (ano)': ['Dias de operação'],
+        'Demanda (ano)': ['Demanda'],
+        'Produção quilométrica (km/ano)': ['Produção quilométrica'],
+        'Tarifa do serviço': ['Tarifa', 'Classe'],
+        'Receita anual (R$)': ['Receita anual', 'Receita ano'],
+        'Pass.ano/km': ['ano/km'],
+        'Receita.ano/km': ['ano/km'],
+        'Frota Total (operacional + reserva)': ['Frota'],
+        'Total de carros de passageiros/trem': ['carros de passageiros'],
+        'Tipo carros': ['Tipo carros'],
+        'Quantidade/composição': ['Tipo carros'],
+        'Especificação': ['Tipo carros'],
+        'Capacidade (PAX/viagem)': ['Capacidade'],
+        'Total de composições': ['composições'],
+        'Comprimento da composição (m)': ['Comprimento'],
+        'Tempo de ciclo (ida + volta) (min)': ['Tempo de ciclo'],
+        'Número de viagens (dia útil)': ['Número de viagens'],
+        'Produção quilométrica (km/dia)': ['Produção quilométrica'],
+        'Headway médio (min/hora pico manhã)': ['Headway'],
+        'Capacidade do Trem (passageiros)': ['Capacidade do Trem'],
+        'Nº de trens no Pico Manhã': ['trens no Pico'],
+        'Demanda total (dia útil)': ['Demanda total'],
+        'Receita DU (R$)': ['Receita DU'],
+        'Receita mês (R$)': ['Receita mês']
+    }
+    
+    # Campos em tabela/lista: o contexto é a seção inteira abaixo do rótulo
+    CAMPOS_SECAO = {
+        'Tipo de empreendimento': 'Tipo de empreendimento',
+        'Estações atendidas': 'Municípios atendidos',
+        'Extensão acumulada (km)': 'Municípios atendidos',
+        'Tipo carros': 'Tipo carros',
+        'Quantidade/composição': 'Tipo carros',
+        'Especificação': 'Tipo carros'
+    }
+    
+    PROMPT_HIBRIDO = """
+você foi designado a responder o formulario <json> com base nos dados no <contexto>,
+então responda com precisão. O contexto traz apenas as linhas próximas aos campos pedidos.
+
+# Regras:
+<regras>
+1. Use os valores exatamente como aparecem no texto; geralmente o dado está logo depois dos dois pontos (:).
+2. Números no formato brasileiro (470.930 = quatrocentos e setenta mil; 2,87 = dois vírgula oitenta e sete).
+3. Campos com lista devem ser respondidos como lista JSON.
+4. Se não encontrar um dado, responda null.
+</regras>
+
+# Formulario JSON:
+<json>
+{formulario}
+</json>
+
+# Fonte de dados:
+<contexto>
+{contexto}
+</contexto>
+
+<resposta>
+retorne o formulario <json> preenchido, ao falar dele abra com <json> e ao terminar de falar dele feche com a tag </json>.
+</resposta>
+"""
+    
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.padroes = {
+            layout: {
+                campo: (re.compile(padrao), tipo)
+                for campo, (padrao, tipo) in {**self.PADROES_COMUNS, **padroes}.items()
+            }
+            for layout, padroes in self.PADROES_NUMERICOS.items()
+        }
+    
+    def _print(self, message):
+        """Print condicional baseado no verbose"""
+        if self.verbose:
+            print(message)
+    
+    def detect_layout(self, text: str) -> Optional[str]:
+        """Identifica o layout da ficha: 'regional', 'metropolitano' ou None"""
+        if 'Extensão (km):' in text or 'Características físicas' in text:
+            return self.REGIONAL
+        if 'Dados operacionais' in text or 'Tempo de ciclo' in text:
+            return self.METROPOLITANO
+        return None
+    
+    def extract(self, text: str) -> Dict[str, Any]:
+        """
+        Extrai os campos da ficha.
+        
+        Returns:
+            dict com 'layout', 'registro' (campo -> valor, com todos os campos do
+            formulário e extras), 'campos' (campo -> status e confiança),
+            'cobertura' (fração dos campos do layout preenchidos), 'completo'
+            e 'faltantes'
+        """
+        text = text or ''
+        lines = [line.strip() for line in text.splitlines()]
+        layout = self.detect_layout(text)
+        encontrados = {}
+        
+        self._extract_cabecalho(lines, encontrados)
+        self._extract_tipo_empreendimento(lines, encontrados)
+        
+        layouts = [layout] if layout else [self.REGIONAL, self.METROPOLITANO]
+        for nome in layouts:
+            for campo, (padrao, tipo) in self.padroes[nome].items():
+                if campo not in encontrados:
+                    self._extract_numero(text, campo, padrao, tipo, encontrados)
+        
+        if layout != self.METROPOLITANO:
+            self._extract_bitola(lines, encontrados)
+            self._extract_municipios(lines, encontrados)
+            self._extract_tarifas_classes(lines, encontrados)
+        self._extract_frota(lines, encontrados)
+        
+        aplicaveis = self.CAMPOS_LAYOUT[layout] if layout else self.CAMPOS_FORMULARIO
+        registro = {}
+        campos = {}
+        for campo in self.CAMPOS_FORMULARIO + self.CAMPOS_EXTRAS:
+            if campo in encontrados:
+                registro[campo], confianca = encontrados[campo]
+                campos[campo] = {'status': 'extraido', 'confianca': confianca}
+            else:
+                registro[campo] = None
+                status = 'ausente' if campo in aplicaveis else 'nao_aplicavel'
+                campos[campo] = {'status': status, 'confianca': 0.0}
+        
+        return self._resumo({'layout': layout, 'registro': registro, 'campos': campos})
+    
+    def _resumo(self, perfil: Dict[str, Any]) -> Dict[str, Any]:
+        """(Re)calcula cobertura, confiança média e campos faltantes do perfil"""
+        layout = perfil['layout']
+        campos = perfil['campos']
+        aplicaveis = self.CAMPOS_LAYOUT[layout] if layout else self.CAMPOS_FORMULARIO
+        
+        faltantes = [campo for campo in aplicaveis if campos[campo]['status'] not in self.PREENCHIDOS]
+        cobertura = (len(aplicaveis) - len(faltantes)) / len(aplicaveis)
+        confiancas = [campos[campo]['confianca'] for campo in aplicaveis if campo not in faltantes]
+        
+        perfil.update({
+            'cobertura': round(cobertura, 4),
+            'confianca_media': round(sum(confiancas) / len(confiancas), 4) if confiancas else 0.0,
+            'completo': layout is not None and not faltantes,
+            'faltantes': faltantes
+        })
+        return perfil
+    
+    def extract_many(self, textos: Dict[Any, str]) -> Dict[Any, Dict[str, Any]]:
+        """Extrai várias fichas ({chave: texto}) e resume a cobertura"""
+        resultados = {chave: self.extract(texto) for chave, texto in textos.items()}
+        completos = sum(1 for resultado in resultados.values() if resultado['completo'])
+        self._print(f"📋 {len(resultados)} fichas: {completos} completas pelas regras, "
+                    f"{len(resultados) - completos} precisam de complemento")
+        return resultados
+    
+    def contexto_campos(self, text: str, campos: List[str], janela: int = 1) -> Dict[str, List[str]]:
+        """
+        Linhas do texto próximas aos rótulos de cada campo.
+        
+        Campos de tabela recebem a seção inteira; os demais, a linha do
+        rótulo e `janela` linhas antes e depois. Campos sem rótulo no texto
+        ficam de fora (o LLM também não teria de onde tirá-los).
+        """
+        lines = [line.strip() for line in (text or '').splitlines()]
+        contexto = {}
+        
+        for campo in campos:
+            indices = set()
+            if campo in self.CAMPOS_SECAO:
+                rotulo = self.CAMPOS_SECAO[campo]
+                for index, line in enumerate(lines):
+                    if line.startswith(rotulo):
+                        tamanho = len(self._secao(lines[index:], rotulo))
+                        indices.update(range(index, min(len(lines), index + tamanho + 1)))
+                        break
+            else:
+                rotulos = [rotulo.lower() for rotulo in self.ROTULOS_CONTEXTO.get(campo, [campo.split(' (')[0]])]
+                for index, line in enumerate(lines):
+                    if any(rotulo in line.lower() for rotulo in rotulos):
+                        indices.update(range(max(0, index - janela), min(len(lines), index + janela + 1)))
+            
+            if indices:
+                contexto[campo] = [index for index in sorted(indices) if lines[index]]
+        
+        return {campo: [lines[index] for index in indices] for campo, indices in contexto.items()}
+    
+    def build_prompt_faltantes(self, perfil: Dict[str, Any], text: str, janela: int = 1) -> Optional[str]:
+        """
+        Prompt reduzido: só os campos que as regras não preencheram e as
+        linhas próximas aos seus rótulos. Retorna None se não houver o que pedir.
+        """
+        contexto = self.contexto_campos(text, perfil['faltantes'], janela)
+        if not contexto:
+            return None
+        
+        lines = [line.strip() for line in text.splitlines()]
+        selecionadas = {line for linhas in contexto.values() for line in linhas}
+        # Mantém a ordem original do texto e não repete linhas
+        trecho = []
+        for line in lines:
+            if line in selecionadas and line not in trecho:
+                trecho.append(line)
+        
+        formulario = ',\n'.join(f'    "{campo}": null' for campo in contexto)
+        return self.PROMPT_HIBRIDO.format(formulario='{\n' + formulario + '\n}', contexto='\n'.join(trecho))
+    
+    @staticmethod
+    def parse_resposta_json(resposta: str) -> Optional[Dict[str, Any]]:
+        """Lê o JSON da resposta do LLM (entre <json> e </json>, ignorando o <think>)"""
+        if not resposta:
+            return None
+        resposta = re.sub(r'<think>.*?</think>', '', resposta, flags=re.DOTALL)
+        
+        match = re.search(r'<json>(.*?)</json>', resposta, re.DOTALL)
+        bloco = match.group(1) if match else resposta
+        match = re.search(r'\{.*\}', bloco, re.DOTALL)
+        if not match:
+            return None
+        
+        bloco = re.sub(r'\s*##.*', '', match.group(0))  # comentários do formulário
+        bloco = re.sub(r',\s*([}\]])', r'\1', bloco)   # vírgula sobrando
+        try:
+            dados = json.loads(bloco)
+        except json.JSONDecodeError:
+            return None
+        return dados if isinstance(dados, dict) else None
+    
+    def merge_resposta(self, perfil: Dict[str, Any], resposta: str) -> Dict[str, Any]:
+        """Incorpora ao perfil os campos faltantes respondidos pelo LLM"""
+        dados = self.parse_resposta_json(resposta) or {}
+        preenchidos = []
+        
+        for campo in list(perfil['faltantes']):
+            valor = dados.get(campo)
+            if valor in (None, '', []):
+                continue
+            if isinstance(valor, str) and campo in self.padroes.get(perfil['layout'] or self.REGIONAL, {}):
+                # Campo numérico respondido como texto no formato brasileiro
+                try:
+                    valor = numero_br(valor.strip(), self.padroes[perfil['layout'] or self.REGIONAL][campo][1])
+                except ValueError:
+                    pass
+            perfil['registro'][campo] = valor
+            perfil['campos'][campo] = {'status': 'llm', 'confianca': self.CONFIANCA_LLM}
+            preenchidos.append(campo)
+        
+        self._resumo(perfil)
+        perfil['llm'] = dict(perfil.get('llm') or {}, campos_preenchidos=preenchidos, json_valido=bool(dados))
+        return perfil
+    
+    def extract_hybrid(self, text: str, client, modelo: str, janela: int = 1, **chat_kwargs) -> Dict[str, Any]:
+        """
+        Modo híbrido: regras primeiro e o LLM apenas para os campos faltantes.
+        
+        Args:
+            text: Texto das páginas da ficha
+            client: ChatClient (ou objeto com o mesmo método chat)
+            modelo: Modelo usado para os campos faltantes
+            janela: Linhas de contexto antes e depois de cada rótulo
+            **chat_kwargs: Repassados para client.chat (timeout, temperature, ...)
+        
+        Returns:
+            O perfil de extract(), com os campos do LLM marcados como 'llm' e
+            um resumo da chamada em 'llm' (None se não foi necessária)
+        """
+        perfil = self.extract(text)
+        perfil['llm'] = None
+        if perfil['completo']:
+            return perfil
+        
+        prompt = self.build_prompt_faltantes(perfil, text, janela)
+        if prompt is None:
+            self._print(f"⚠️ Campos sem rótulo no texto, LLM não consultado: {perfil['faltantes']}")
+            return perfil
+        
+        self._print(f"🤖 Consultando {modelo} para {len(perfil['faltantes'])} campos ({len(prompt)} caracteres)")
+        # Streaming: a geração é encerrada assim que o </json> chega
+        chat_kwargs.setdefault('stream', True)
+        resposta = client.chat(prompt, modelo=modelo, **chat_kwargs)
+        perfil['llm'] = {
+            'prompt_chars': len(prompt),
+            'tempo_resposta': resposta.get('tempo_resposta'),
+            'orcamento': resposta.get('orcamento'),
+            'interrompido': resposta.get('interrompido'),
+            'erro': resposta.get('erro')
+        }
+        if 'erro' in resposta:
+            self._print(f"❌ Erro no LLM: {resposta['erro']}")
+            return perfil
+        
+        return self.merge_resposta(perfil, resposta.get('resposta', ''))
+    
+    def _extract_numero(self, text, campo, padrao, tipo, encontrados):
+        """Campo numérico de rótulo simples; números com espaços ou '*' recebem confiança menor"""
+        match = padrao.search(text)
+        if not match:
+            return
+        bruto = match.group(1).strip()
+        try:
+            valor = numero_br(bruto, tipo)
+        except ValueError:
+            return
+        
+        ajustado = ' ' in bruto or text[match.end():match.end() + 1] == '*'
+        encontrados[campo] = (valor, 0.8 if ajustado else 1.0)
+    
+    def _extract_cabecalho(self, lines: List[str], encontrados):
+        """Proposta, Código, Categoria e Versão"""
+        for index, line in enumerate(lines):
+            match = re.match(r'Proposta:\s*(.*?)\s*Código:\s*(.+)$', line)
+            if match and 'Proposta' not in encontrados:
+                proposta = match.group(1)
+                confianca = 1.0
+                # Nome quebrado em duas linhas: parêntese aberto continua na linha seguinte
+                if proposta.count('(') > proposta.count(')') and index + 1 < len(lines):
+                    proposta = f"{proposta} {lines[index + 1]}"
+                    confianca = 0.8
+                encontrados['Proposta'] = (proposta, confianca)
+                encontrados['Código'] = (match.group(2).strip(), 1.0)
+            
+            match = re.match(r'Categoria:\s*(.*?)\s*Versão:\s*(\S+)', line)
+            if match and 'Categoria' not in encontrados:
+                encontrados['Categoria'] = (match.group(1), 1.0)
+                encontrados['Versão'] = (match.group(2), 1.0)
+    
+    def _secao(self, lines: List[str], inicio: str) -> List[str]:
+        """Linhas após o rótulo `inicio` até o começo da próxima seção"""
+        for index, line in enumerate(lines):
+            if line.startswith(inicio):
+                secao = []
+                for seguinte in lines[index + 1:]:
+                    if self.FIM_SECAO.match(seguinte):
+                        break
+                    if seguinte:
+                        secao.append(seguinte)
+                return secao
+        return []
+    
+    def _extract_tipo_empreendimento(self, lines: List[str], encontrados):
+        """Lista de tipos (Greenfield, Brownfield ...); linhas de continuação são unidas ao item"""
+        itens = []
+        for line in self._secao(lines, 'Tipo de empreendimento:'):
+            aberto = itens and itens[-1].count('(') > itens[-1].count(')')
+            if itens and (aberto or line[0].islower() or line[0] == '('):
+                itens[-1] = f"{itens[-1]} {line}"
+            else:
+                itens.append(line)
+        if itens:
+            encontrados['Tipo de empreendimento'] = (itens, 1.0)
+    
+    def _extract_bitola(self, lines: List[str], encontrados):
+        """Uma ou mais bitolas ('Métrica (570,92 km); Mista (94,23 km)'); '-' indica não definida"""
+        bitolas = []
+        for line in lines:
+            for match in re.finditer(r'Tipo bitola:\s*(.*?)(?=\s*Tipo bitola:|\s*Total de estações:|$)', line):
+                bitolas.append(match.group(1).strip())
+        if not bitolas:
+            return
+        if bitolas == ['-']:
+            encontrados['Tipo bitola'] = (None, 1.0)
+        else:
+            encontrados['Tipo bitola'] = ('; '.join(bitolas), 1.0)
+    
+    def _extract_municipios(self, lines: List[str], encontrados):
+        """
+        Municípios atendidos e extensão acumulada.
+        A tabela é impressa em colunas: a ordem do trajeto é a leitura coluna a coluna.
+        """
+        colunas = []
+        for line in self._secao(lines, 'Municípios atendidos'):
+            pares = re.findall(r'(\D+?)\s+(\d+(?:,\d+)?)(?=\s|$)', line)
+            for coluna, (nome, km) in enumerate(pares):
+                if coluna == len(colunas):
+                    colunas.append([])
+                colunas[coluna].append((nome.strip(), numero_br(km)))
+        
+        municipios = [par for coluna in colunas for par in coluna]
+        if not municipios:
+            return
+        
+        # Confere com o total de estações declarado na ficha
+        total = encontrados.get('Total de estações', (None, 0))[0]
+        confianca = 1.0 if total == len(municipios) else 0.7
+        encontrados['Estações atendidas'] = ([nome for nome, _ in municipios], confianca)
+        encontrados['Extensão acumulada (km)'] = ([km for _, km in municipios], confianca)
+    
+    def _extract_tarifas_classes(self, lines: List[str], encontrados):
+        """Tarifas fixa e quilométrica por classe (colunas 'Classe Econômica' e 'Classe Executiva')"""
+        classes = []
+        tarifas = {}
+        for line in lines:
+            if line.startswith('Classe'):
+                classes = [classe.strip() for classe in re.findall(r'Classe\s+\S+', line)]
+                continue
+            valores = re.findall(r'([\d.,]+)\s+(Tarifa (?:fixa|quilométrica) \(R\$\))', line)
+            for coluna, (valor, rotulo) in enumerate(valores):
+                classe = classes[coluna] if coluna < len(classes) else f'Classe {coluna + 1}'
+                try:
+                    valor = numero_br(valor)
+                except ValueError:
+                    continue  # número ambíguo ou malformado: a tarifa fica sem esse valor
+                tarifas.setdefault(classe, {})[rotulo] = valor
+        if tarifas:
+            encontrados['Tarifa do serviço'] = (tarifas, 1.0 if classes else 0.7)
+    
+    def _extract_frota(self, lines: List[str], encontrados):
+        """Tabela 'Tipo carros / Quantidade / Especificação'"""
+        tipos, quantidades, especificacoes = [], [], []
+        for line in self._secao(lines, 'Tipo carros'):
+            match = re.match(r'(\D+?)\s+(\d+)(?:\s+(.+))?$', line)
+            if not match:
+                break
+            tipos.append(match.group(1).strip())
+            quantidades.append(int(match.group(2)))
+            especificacoes.append(match.group(3))
+        if tipos:
+            encontrados['Tipo carros'] = (tipos, 1.0)
+            encontrados['Quantidade/composição'] = (quantidades, 1.0)
+            encontrados['Especificação'] = (especificacoes, 1.0)
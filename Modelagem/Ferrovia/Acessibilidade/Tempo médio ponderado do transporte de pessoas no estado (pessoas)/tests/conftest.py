@@ -0,0 +1,12 @@
+"""
+Testes dos módulos do projeto (sem servidor Ollama nem PDFs do Documents/)
+
+Uso:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_PROJETO)
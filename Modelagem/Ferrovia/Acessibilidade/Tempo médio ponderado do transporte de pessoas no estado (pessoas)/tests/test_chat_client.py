@@ -0,0 +1,588 @@
+import asyncio
+import functools
+import itertools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import chat_client
+from chat_client import NUM_CTX_PADRAO, AsyncChatClient, ChatClient, OrcamentoPrompt, PrevisaoTempo, RespostaCache
+
+PAYLOAD = {
+    "modelo": "qwen3:1.7b", "prompt": "Extraia a demanda anual.", "stream": False, "timeout": 300,
+    "temperature": 0, "top_p": 0.9, "top_k": 40, "max_tokens": None, "num_ctx": None
+}
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """time.time crescente de 1 em 1 s: a ordem de last_access não depende da velocidade da máquina"""
+    contador = itertools.count(1000)
+    monkeypatch.setattr(chat_client.time, "time", lambda: float(next(contador)))
+
+
+def test_chave_muda_com_modelo_digest_prompt_e_opcoes():
+    base = RespostaCache.chave(PAYLOAD, "sha-1")
+    assert RespostaCache.chave(dict(PAYLOAD), "sha-1") == base
+    assert RespostaCache.chave(PAYLOAD, "sha-2") != base
+    assert RespostaCache.chave(dict(PAYLOAD, modelo="tinyllama:latest"), "sha-1") != base
+    assert RespostaCache.chave(dict(PAYLOAD, prompt="Outro prompt."), "sha-1") != base
+    for opcao, valor in [("temperature", 0.7), ("top_p", 0.5), ("top_k", 10), ("max_tokens", 256), ("num_ctx", 8192)]:
+        assert RespostaCache.chave(dict(PAYLOAD, **{opcao: valor}), "sha-1") != base, opcao
+
+
+def test_chave_ignora_stream_e_timeout_mas_nao_a_parada():
+    base = RespostaCache.chave(PAYLOAD, "sha-1")
+    assert RespostaCache.chave(dict(PAYLOAD, stream=True, timeout=60), "sha-1") == base
+    assert RespostaCache.chave(PAYLOAD, "sha-1", parada="json") != base
+
+
+def test_resposta_cortada_no_json_nao_volta_para_chamada_completa(tmp_path):
+    client = ChatClient(cache=RespostaCache(tmp_path / "respostas.sqlite"))
+    client._digests["qwen3:1.7b"] = "sha-1"
+    cortada = {"sucesso": True, "resposta": "<json>{}</json>", "interrompido": True}
+
+    chave_stream, resultado = client._consultar_cache(PAYLOAD, None, "json")
+    assert resultado is None
+    client.cache.gravar(chave_stream, "qwen3:1.7b", cortada)
+
+    assert client._consultar_cache(PAYLOAD, None, "json")[1] == cortada
+    chave_completa, resultado = client._consultar_cache(PAYLOAD, None)
+    assert chave_completa != chave_stream and resultado is None
+
+
+def test_cache_so_com_temperatura_zero_por_padrao(tmp_path):
+    client = ChatClient(cache=RespostaCache(tmp_path / "respostas.sqlite"))
+    client._digests["qwen3:1.7b"] = "sha-1"
+    assert client._consultar_cache(dict(PAYLOAD, temperature=0.7), None) == (None, None)
+    assert client._consultar_cache(dict(PAYLOAD, temperature=0.7), True)[0] is not None
+    assert client._consultar_cache(PAYLOAD, False) == (None, None)
+
+
+def test_eviction_descarta_as_usadas_ha_mais_tempo(tmp_path, relogio):
+    # ~1 KB de limite: cabem duas respostas de ~400 bytes
+    cache = RespostaCache(tmp_path / "respostas.sqlite", max_size_mb=1 / 1024)
+    resultado = {"resposta": "x" * 400}
+    cache.gravar("a", "m", resultado)
+    cache.gravar("b", "m", resultado)
+    assert cache.obter("a") is not None  # "a" passa a ser a mais recente
+
+    cache.gravar("c", "m", resultado)
+    assert cache.obter("b") is None
+    assert cache.obter("a") is not None and cache.obter("c") is not None
+    estatisticas = cache.estatisticas()
+    assert estatisticas["respostas"] == 2
+    assert estatisticas["size_mb"] <= cache.max_size_mb
+
+
+def test_limpar_por_modelo(tmp_path):
+    cache = RespostaCache(tmp_path / "respostas.sqlite")
+    cache.gravar("a", "qwen3:1.7b", {"resposta": "1"})
+    cache.gravar("b", "tinyllama:latest", {"resposta": "2"})
+    assert cache.limpar("qwen3:1.7b") == 1
+    assert cache.obter("a") is None and cache.obter("b") == {"resposta": "2"}
+    cache.fechar()
+
+
+def prompt_com_contexto(linhas, largura=70):
+    contexto = "\n".join(f"{i:04d} " + "x" * (largura - 5) for i in range(linhas))
+    return f"Extraia os campos em JSON.\n<contexto>\n{contexto}\n</contexto>\nResponda só com o JSON."
+
+
+class SessaoShow:
+    """Session falsa: responde ao /ollama/show e conta as chamadas"""
+
+    def __init__(self, dados=None, erro=None):
+        self.dados = dados or {}
+        self.erro = erro
+        self.chamadas = []
+
+    def post(self, url, json=None, timeout=None):
+        self.chamadas.append((url, json))
+        if self.erro:
+            raise self.erro
+        dados = self.dados
+
+        class Resposta:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return dados
+
+        return Resposta()
+
+
+def test_orcamento_janela_padrao_configuravel_e_limitada_ao_maximo():
+    orcamento = OrcamentoPrompt()
+    assert orcamento.janela("qwen3:1.7b") == NUM_CTX_PADRAO
+    assert orcamento.janela("qwen3:1.7b", 8192) == 8192
+    assert orcamento.janela("tinyllama:latest", 8192) == 2048  # máximo da família
+    assert OrcamentoPrompt(num_ctx_padrao=4096).janela("qwen3:1.7b") == 4096
+
+    orcamento.definir_contexto("qwen3:1.7b", maximo=32768, num_ctx=8192)
+    assert orcamento.janela("qwen3:1.7b") == 8192
+    assert orcamento.janela("qwen3:1.7b", 65536) == 32768
+    assert orcamento.janela("qwen3:8b") == NUM_CTX_PADRAO  # outros modelos da família não mudam
+
+
+def test_orcamento_verificar():
+    orcamento = OrcamentoPrompt(reserva_resposta=512, margem=0.1)
+    verificacao = orcamento.verificar("x" * 350, "qwen3:1.7b")
+    assert verificacao["tokens_estimados"] == 100
+    assert verificacao["limite"] == int(2048 * 0.9) - 512
+    assert verificacao["cabe"] and verificacao["excesso"] == 0
+    assert orcamento.verificar("x" * 350, "qwen3:1.7b", max_tokens=1800)["excesso"] == 100 - (1843 - 1800)
+
+
+def test_orcamento_reduzir_corta_o_fim_do_contexto():
+    orcamento = OrcamentoPrompt()
+    prompt = prompt_com_contexto(200)
+    limite = orcamento.verificar(prompt, "qwen3:1.7b")["limite"]
+    assert not orcamento.verificar(prompt, "qwen3:1.7b")["cabe"]
+
+    reduzido = orcamento.reduzir(prompt, "qwen3:1.7b", limite)
+    assert orcamento.estimar_tokens(reduzido, "qwen3:1.7b") <= limite
+    assert reduzido.startswith("Extraia os campos em JSON.\n<contexto>\n0000 ")
+    assert reduzido.endswith("\n</contexto>\nResponda só com o JSON.")
+    linhas = reduzido.split("<contexto>\n")[1].split("\n</contexto>")[0].split("\n")
+    # Linhas inteiras, do início, sem pular nenhuma
+    assert [linha[:4] for linha in linhas] == [f"{i:04d}" for i in range(len(linhas))]
+    assert 0 < len(linhas) < 200
+
+
+def test_orcamento_reduzir_sem_contexto_ou_sem_espaco():
+    orcamento = OrcamentoPrompt()
+    assert orcamento.reduzir("x" * 10000, "qwen3:1.7b", 100) is None
+    assert orcamento.reduzir(prompt_com_contexto(10), "qwen3:1.7b", 5) is None
+
+
+def test_orcamento_num_ctx_necessario():
+    orcamento = OrcamentoPrompt()
+    prompt = "x" * 17500  # 5000 tokens
+    assert orcamento.num_ctx_necessario(prompt, "qwen3:1.7b") == 6144  # (5000 + 512) / 0,9 -> 6144
+    assert orcamento.num_ctx_necessario(prompt, "tinyllama:latest") is None  # máximo de 2048
+    assert orcamento.num_ctx_necessario(prompt, "modelo-desconhecido") is None
+
+
+def test_orcamento_calibracao_descarta_medidas_implausiveis():
+    orcamento = OrcamentoPrompt()
+    orcamento.registrar("qwen3:1.7b", "x" * 400, {"tokens_prompt": 100, "tokens_gerados": 10})
+    assert orcamento.chars_por_token["qwen3:1.7b"] == pytest.approx(3.5 + 0.3 * (4.0 - 3.5))
+    orcamento.registrar("qwen3:1.7b", "x" * 400, {"tokens_prompt": 10, "tokens_gerados": 10})  # prefixo em cache
+    assert orcamento.chars_por_token["qwen3:1.7b"] == pytest.approx(3.65)
+    assert orcamento.resumo()["qwen3:1.7b"]["chamadas"] == 2
+
+
+def test_contexto_modelo_lido_uma_vez_do_show():
+    client = ChatClient()
+    client._sessao = SessaoShow({
+        "model_info": {"qwen3.context_length": 40960, "qwen3.embedding_length": 2048},
+        "parameters": "temperature 0.6\nnum_ctx 8192\ntop_k 20"
+    })
+    assert client.contexto_modelo("qwen3:1.7b") == {"maximo": 40960, "num_ctx": 8192}
+    assert client.contexto_modelo("qwen3:1.7b") == {"maximo": 40960, "num_ctx": 8192}
+    assert len(client._sessao.chamadas) == 1
+    assert client._sessao.chamadas[0][0].endswith("/ollama/show")
+    assert client.orcamento.janela("qwen3:1.7b") == 8192
+
+
+def test_contexto_modelo_sem_servidor_mantem_a_tabela():
+    client = ChatClient()
+    client._sessao = SessaoShow(erro=chat_client.requests.exceptions.ConnectionError("recusada"))
+    assert client.contexto_modelo("qwen3:1.7b") == {"maximo": None, "num_ctx": None}
+    client.contexto_modelo("qwen3:1.7b")
+    assert len(client._sessao.chamadas) == 1
+    assert client.orcamento.janela("qwen3:1.7b") == NUM_CTX_PADRAO
+
+
+def test_preparar_aumenta_num_ctx_antes_de_reduzir():
+    client = ChatClient()
+    client._contextos["qwen3:1.7b"] = {"maximo": None, "num_ctx": None}
+    prompt = prompt_com_contexto(300)  # ~6200 tokens
+
+    payload, orcamento = client._preparar(prompt, "qwen3:1.7b", False, 300, "reduzir", {})
+    assert orcamento["num_ctx_ajustado"] and not orcamento["reduzido"] and orcamento["cabe"]
+    assert payload["num_ctx"] == orcamento["num_ctx"] == 8192
+    assert payload["prompt"] == prompt
+
+    payload, orcamento = client._preparar(prompt, "qwen3:1.7b", False, 300, "reduzir", {"ajustar_num_ctx": False})
+    assert orcamento["reduzido"] and not orcamento["num_ctx_ajustado"]
+    assert payload["num_ctx"] is None and len(payload["prompt"]) < len(prompt)
+
+    payload, erro = client._preparar(prompt, "qwen3:1.7b", False, 300, "recusar", {"num_ctx": 2048})
+    assert payload is None and erro["codigo"] == "prompt_excede_contexto"
+
+
+def test_previsao_so_depois_do_minimo_de_amostras():
+    tempos = PrevisaoTempo(fator=3.0, folga=30, min_amostras=2)
+    assert tempos.prever("qwen3:1.7b", 1000) is None
+    tempos.registrar("qwen3:1.7b", 1000, 200, 30.0)  # 300 tokens equivalentes: 0,1 s/token
+    assert tempos.prever("qwen3:1.7b", 1000) is None
+    tempos.registrar("qwen3:1.7b", 1000, 200, 30.0)
+
+    previsao = tempos.prever("qwen3:1.7b", 2000)
+    assert previsao == {"previsto": 40.0, "prazo": 150, "tokens_gerados": 200}  # 0,1 * (200 + 0,1 * 2000)
+    assert tempos.prever("qwen3:1.7b", 2000, max_tokens=50)["previsto"] == 25.0
+    assert tempos.prever("tinyllama:latest", 2000) is None
+    assert tempos.resumo() == {"qwen3:1.7b": {"tokens_por_segundo": 10.0, "tokens_gerados": 200, "amostras": 2}}
+
+
+def test_previsao_media_movel_e_medidas_invalidas():
+    tempos = PrevisaoTempo(min_amostras=1)
+    tempos.registrar("qwen3:1.7b", 0, 100, 10.0)
+    tempos.registrar("qwen3:1.7b", 0, 100, 20.0)
+    assert tempos.segundos_por_token["qwen3:1.7b"] == pytest.approx(0.1 + 0.3 * (0.2 - 0.1))
+    for gerados, tempo in [(0, 10.0), (100, 0), (100, None), (None, 10.0)]:
+        tempos.registrar("qwen3:1.7b", 0, gerados, tempo)
+    assert tempos.amostras["qwen3:1.7b"] == 2
+
+
+def test_estouro_so_aumenta_a_estimativa():
+    tempos = PrevisaoTempo(min_amostras=1)
+    tempos.registrar_estouro("qwen3:1.7b", 0, 100.0)  # modelo sem medidas: nada a corrigir
+    assert tempos.prever("qwen3:1.7b", 0) is None
+
+    tempos.registrar("qwen3:1.7b", 0, 100, 10.0)
+    tempos.registrar_estouro("qwen3:1.7b", 0, 50.0)  # 0,5 s/token no mínimo
+    assert tempos.segundos_por_token["qwen3:1.7b"] == pytest.approx(0.1 + 0.3 * (0.5 - 0.1))
+    antes = tempos.segundos_por_token["qwen3:1.7b"]
+    tempos.registrar_estouro("qwen3:1.7b", 0, 1.0)  # estouro rápido não deixa o modelo "mais rápido"
+    assert tempos.segundos_por_token["qwen3:1.7b"] == pytest.approx(antes)
+
+
+def cliente_com_vazao(segundos_por_token=0.1, gerados=200):
+    client = ChatClient(tempos=PrevisaoTempo(min_amostras=1))
+    client._contextos["qwen3:1.7b"] = {"maximo": None, "num_ctx": None}
+    client.tempos.registrar("qwen3:1.7b", 0, gerados, segundos_por_token * gerados)
+    return client
+
+
+def test_preparar_envia_o_prazo_previsto_no_lugar_do_timeout():
+    client = cliente_com_vazao()
+    payload, orcamento = client._preparar("x" * 350, "qwen3:1.7b", False, 300, "reduzir", {})
+    # 100 tokens de prompt: 0,1 * (200 + 10) = 21 s previstos -> 3 * 21 + 30
+    assert orcamento["prazo"] == {"previsto": 21.0, "prazo": 93, "tokens_gerados": 200}
+    assert payload["timeout"] == 93
+
+    payload, orcamento = client._preparar("x" * 350, "qwen3:1.7b", False, 60, "reduzir", {})
+    assert orcamento["prazo"] is None and payload["timeout"] == 60  # nunca acima do timeout pedido
+    payload, orcamento = client._preparar("x" * 350, "qwen3:1.7b", False, 300, "reduzir", {"prazo_adaptativo": False})
+    assert orcamento["prazo"] is None and payload["timeout"] == 300
+
+
+class SessaoChat:
+    """Session falsa do /chat: falha com `erro` ou responde com `dados`"""
+
+    def __init__(self, dados=None, erro=None):
+        self.dados = dados
+        self.erro = erro
+        self.timeouts = []
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        self.timeouts.append((json["timeout"], timeout))
+        if self.erro:
+            raise self.erro
+        return SessaoShow(self.dados).post(url)
+
+
+def test_chamada_que_estoura_o_prazo_vira_prazo_excedido():
+    client = cliente_com_vazao()
+    client._sessao = SessaoChat(erro=chat_client.requests.exceptions.Timeout("lido"))
+    antes = client.tempos.segundos_por_token["qwen3:1.7b"]
+
+    resposta = client.chat("x" * 350, modelo="qwen3:1.7b", timeout=300)
+    assert resposta["codigo"] == "prazo_excedido" and "prazo de 93s" in resposta["erro"]
+    assert client._sessao.timeouts == [(93, 93 + 30)]
+    assert client.tempos.segundos_por_token["qwen3:1.7b"] >= antes
+
+    # Sem prazo previsto o mesmo erro continua sendo um timeout comum
+    client = ChatClient()
+    client._contextos["qwen3:1.7b"] = {"maximo": None, "num_ctx": None}
+    client._sessao = SessaoChat(erro=chat_client.requests.exceptions.Timeout("lido"))
+    assert client.chat("x" * 350, modelo="qwen3:1.7b", timeout=300)["codigo"] == "timeout"
+
+
+def test_resposta_concluida_atualiza_a_vazao():
+    client = ChatClient(tempos=PrevisaoTempo(min_amostras=1))
+    client._contextos["qwen3:1.7b"] = {"maximo": None, "num_ctx": None}
+    client._sessao = SessaoChat({"sucesso": True, "resposta": "ok", "tempo_resposta": 12.0,
+                                 "tokens_gerados": 100, "tokens_prompt": 200})
+    assert client.chat("x" * 350, modelo="qwen3:1.7b", timeout=300)["sucesso"]
+    assert client.tempos.segundos_por_token["qwen3:1.7b"] == pytest.approx(12.0 / (100 + 0.1 * 200))
+    assert client.chat("x" * 350, modelo="qwen3:1.7b", timeout=300)["orcamento"]["prazo"] is not None
+
+
+class SessaoModelos:
+    """Session falsa que conta as listagens de /modelos"""
+
+    def __init__(self, modelos, falhar=False):
+        self.modelos = modelos
+        self.falhar = falhar
+        self.listagens = 0
+
+    def get(self, url, timeout=None):
+        assert url.endswith("/modelos")
+        self.listagens += 1
+        if self.falhar:
+            raise ConnectionError("servidor fora do ar")
+        modelos = self.modelos
+
+        class Resposta:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return {"models": modelos}
+
+        return Resposta()
+
+
+def test_digest_modelo_sem_tag_e_memorizado():
+    client = ChatClient()
+    client._sessao = SessaoModelos([{"name": "tinyllama:latest", "digest": "sha-t"},
+                                    {"name": "qwen3:1.7b", "digest": "sha-q"}])
+    assert client.digest_modelo("tinyllama") == "sha-t"
+    assert client.digest_modelo("tinyllama") == "sha-t"
+    assert client.digest_modelo("tinyllama:latest") == "sha-t"
+    assert client.digest_modelo("qwen3:1.7b") == "sha-q"
+    assert client._sessao.listagens == 1
+    # Modelo não instalado: uma listagem e depois None memorizado
+    assert client.digest_modelo("llama3") is None
+    assert client.digest_modelo("llama3") is None
+    assert client._sessao.listagens == 2
+
+
+def test_digest_modelo_com_servidor_fora_do_ar_tenta_de_novo():
+    client = ChatClient()
+    client._sessao = SessaoModelos([], falhar=True)
+    assert client.digest_modelo("tinyllama") is None
+    assert client.digest_modelo("tinyllama") is None
+    assert client._sessao.listagens == 2
+
+
+class ServidorChat:
+    """Handler do httpx.MockTransport: responde o /chat com atraso e conta as requisições em andamento"""
+
+    def __init__(self):
+        self.em_andamento = 0
+        self.maximo = 0
+        self.recebidos = []
+
+    async def __call__(self, request):
+        assert request.url.path == "/chat"
+        prompt = json.loads(request.content)["prompt"]
+        self.recebidos.append(prompt)
+        self.em_andamento += 1
+        self.maximo = max(self.maximo, self.em_andamento)
+        try:
+            # Os primeiros prompts demoram mais: terminam fora da ordem de entrada
+            await asyncio.sleep(0.02 if prompt.endswith("0") else 0.005)
+            if prompt == "falha 500":
+                return httpx.Response(500, json={"detail": "erro no modelo"})
+            if prompt == "sem conexão":
+                raise httpx.ConnectError("conexão recusada", request=request)
+            return httpx.Response(200, json={"sucesso": True, "resposta": f"eco: {prompt}"})
+        finally:
+            self.em_andamento -= 1
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    servidor = ServidorChat()
+    monkeypatch.setattr(chat_client.httpx, "AsyncClient",
+                        functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(servidor)))
+    return servidor
+
+
+def cliente_assincrono(concorrencia):
+    client = AsyncChatClient(concorrencia=concorrencia)
+    client._contextos["qwen3:1.7b"] = {"maximo": None, "num_ctx": None}
+    return client
+
+
+@pytest.mark.parametrize("concorrencia", [1, 3])
+def test_chat_many_respeita_a_concorrencia_e_a_ordem(servidor, concorrencia):
+    prompts = [f"prompt {indice}" for indice in range(10)]
+    respostas = cliente_assincrono(concorrencia).chat_many_sync(prompts, modelo="qwen3:1.7b")
+    assert [resposta["resposta"] for resposta in respostas] == [f"eco: {prompt}" for prompt in prompts]
+    assert sorted(servidor.recebidos) == sorted(prompts)
+    assert servidor.maximo == concorrencia
+
+
+def test_chat_many_erro_fica_so_na_sua_resposta(servidor):
+    prompts = {209: "prompt 0", 210: "falha 500", 211: "sem conexão", 212: "prompt 3"}
+    respostas = cliente_assincrono(2).chat_many_sync(prompts, modelo="qwen3:1.7b")
+    assert list(respostas) == [209, 210, 211, 212]
+    assert respostas[209]["resposta"] == "eco: prompt 0" and respostas[212]["resposta"] == "eco: prompt 3"
+    assert respostas[210]["codigo"] == "conexao" and "500" in respostas[210]["erro"]
+    assert respostas[211]["codigo"] == "conexao" and "conexão recusada" in respostas[211]["erro"]
+
+
+def test_chat_many_sync_dentro_de_um_loop_em_execucao(servidor):
+    client = cliente_assincrono(2)
+
+    async def notebook():
+        return client.chat_many_sync(["prompt 1", "prompt 2"], modelo="qwen3:1.7b")
+
+    assert [resposta["resposta"] for resposta in asyncio.run(notebook())] == ["eco: prompt 1", "eco: prompt 2"]
+
+
+class RespostaStream:
+    """Resposta do /chat com stream=True: entrega as linhas NDJSON uma a uma e registra quantas foram lidas"""
+
+    def __init__(self, chunks):
+        self.linhas = [json.dumps(chunk).encode() for chunk in chunks]
+        self.lidas = 0
+        self.fechada = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechada = True
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        for linha in self.linhas:
+            self.lidas += 1
+            yield linha
+
+
+class SessaoStream:
+    def __init__(self, resposta):
+        self.resposta = resposta
+        self.payloads = []
+
+    def post(self, url, timeout=None, stream=False, **kwargs):
+        assert url.endswith("/chat") and stream
+        self.payloads.append(kwargs["json"])
+        return self.resposta
+
+
+def tokens(*textos, final=None):
+    return [{"response": texto, "done": False} for texto in textos] + ([final] if final else [])
+
+
+def conversar_em_stream(chunks, **kwargs):
+    client = ChatClient()
+    client._contextos["qwen3:1.7b"] = {"maximo": None, "num_ctx": None}
+    client._sessao = SessaoStream(RespostaStream(chunks))
+    recebidos = []
+    resultado = client.chat("Extraia a demanda.", modelo="qwen3:1.7b", stream=True, on_token=recebidos.append,
+                            **kwargs)
+    return resultado, recebidos, client._sessao.resposta
+
+
+def test_stream_para_quando_o_json_fecha():
+    chunks = tokens("<think>", "exemplo <json>{}</json>", "</think>", "Resposta: <json>", '{"demanda": 7760}',
+                    "</json>", " e mais texto", final={"done": True, "eval_count": 99})
+    resultado, recebidos, resposta = conversar_em_stream(chunks)
+    # O <json> dentro do raciocínio não conta
+    assert resultado["resposta"] == '<think>exemplo <json>{}</json></think>Resposta: <json>{"demanda": 7760}</json>'
+    assert resultado["interrompido"] is True
+    assert resultado["tokens_gerados"] == 6  # sem o chunk final, um token por chunk
+    assert recebidos == [chunk["response"] for chunk in chunks[:6]]
+    assert resposta.lidas == 6 and resposta.fechada
+
+
+def test_stream_sem_parar_em_json_le_ate_o_fim():
+    chunks = tokens("<json>{}</json>", " e mais texto",
+                    final={"response": "", "done": True, "eval_count": 3, "prompt_eval_count": 40})
+    resultado, recebidos, resposta = conversar_em_stream(chunks, parar_em_json=False)
+    assert resultado["resposta"] == "<json>{}</json> e mais texto"
+    assert resultado["interrompido"] is False
+    assert (resultado["tokens_gerados"], resultado["tokens_prompt"]) == (3, 40)
+    assert resposta.lidas == 3
+
+
+def test_stream_bloco_cercado_e_erro_no_meio():
+    resultado, _, resposta = conversar_em_stream(tokens("```json\n", '{"a": 1}\n', "```", "fim"))
+    assert resultado["resposta"] == '```json\n{"a": 1}\n```' and resposta.lidas == 3
+
+    resultado, _, _ = conversar_em_stream(tokens("<json>") + [{"erro": "modelo descarregado", "done": True}])
+    assert resultado["erro"] == "modelo descarregado" and resultado["codigo"] == "stream"
+
+
+def sessoes_por_thread(client, threads=4):
+    """(Session da 1ª leitura, Session da 2ª leitura) de cada thread; a barreira mantém as threads vivas juntas"""
+    barreira = threading.Barrier(threads)
+
+    def ler():
+        primeira = client.session
+        barreira.wait()
+        return primeira, client.session
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(lambda _: ler(), range(threads)))
+
+
+def test_modo_concorrente_uma_session_por_thread_com_o_mesmo_pool():
+    client = ChatClient(concorrencia=4)
+    sessoes = sessoes_por_thread(client)
+    assert all(primeira is segunda for primeira, segunda in sessoes)
+    assert len({id(primeira) for primeira, _ in sessoes}) == 4
+    for session, _ in sessoes:
+        assert session.get_adapter(f"{client.base_url}/chat") is client._adaptador
+        assert session.trust_env is False
+
+    adaptador = client._adaptador
+    assert adaptador._pool_maxsize == 4 and adaptador._pool_block is True
+    retry = adaptador.max_retries
+    assert (retry.total, retry.connect, retry.read, retry.status) == (2, 2, 0, 2)
+    assert set(retry.status_forcelist) == {502, 503} and retry.allowed_methods == {"GET", "POST"}
+    assert retry.backoff_factor == ChatClient.BACKOFF_TENTATIVAS and retry.raise_on_status is False
+
+
+def test_modo_simples_uma_session_para_todas_as_threads():
+    client = ChatClient()
+    assert {id(session) for par in sessoes_por_thread(client) for session in par} == {id(client._sessao)}
+    assert client._adaptador is None
+
+
+@pytest.fixture
+def servidor_instavel():
+    """Servidor HTTP local que responde 503 às primeiras `falhas` requisições e 200 depois"""
+    estado = {"falhas": 0, "requisicoes": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            estado["requisicoes"] += 1
+            status = 503 if estado["requisicoes"] <= estado["falhas"] else 200
+            corpo = json.dumps({"status": "saudavel" if status == 200 else "ocupado"}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    estado["url"] = f"http://127.0.0.1:{servidor.server_address[1]}"
+    yield estado
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_modo_concorrente_repete_503(servidor_instavel, monkeypatch):
+    monkeypatch.setattr(ChatClient, "BACKOFF_TENTATIVAS", 0)
+    servidor_instavel["falhas"] = 2
+    client = ChatClient(servidor_instavel["url"], concorrencia=2)
+    assert client.health_check() == {"status": "saudavel"}
+    assert servidor_instavel["requisicoes"] == 3
+
+    # Sem o modo concorrente o 503 volta na primeira resposta
+    servidor_instavel.update(falhas=4, requisicoes=0)
+    assert "503" in ChatClient(servidor_instavel["url"]).health_check()["erro"]
+    assert servidor_instavel["requisicoes"] == 1
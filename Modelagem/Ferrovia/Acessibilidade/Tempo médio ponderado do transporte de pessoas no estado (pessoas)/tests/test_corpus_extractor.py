@@ -0,0 +1,108 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from benchmarks.synthetic_pdf import gerar_pdf_perfis
+from corpus_extractor import CorpusStore, run
+
+
+@pytest.fixture
+def acervo(tmp_path):
+    """Duas pastas no mesmo banco: A com dois PDFs e B com uma cópia de um deles"""
+    pasta_a, pasta_b = tmp_path / "A", tmp_path / "B"
+    pasta_a.mkdir()
+    pasta_b.mkdir()
+    gerar_pdf_perfis(str(pasta_a / "perfis.pdf"), 3)
+    gerar_pdf_perfis(str(pasta_a / "outro.pdf"), 2)
+    shutil.copy(pasta_a / "perfis.pdf", pasta_b / "copia.pdf")
+    return {"A": str(pasta_a), "B": str(pasta_b), "banco": str(tmp_path / "corpus.sqlite")}
+
+
+def extrair(acervo, pasta, method="PyPDF2"):
+    return run(acervo[pasta], acervo["banco"], workers=1, method=method, verbose=False)
+
+
+def test_segunda_execucao_nao_reextrai(acervo):
+    assert extrair(acervo, "A")["extraidos"] == 2
+    resumo = extrair(acervo, "A")
+    assert resumo["inalterados"] == 2 and resumo["extraidos"] == 0
+
+    with CorpusStore(acervo["banco"]) as store:
+        paginas = store.get_pages(os.path.join(acervo["A"], "perfis.pdf"))
+        assert [pagina["page"] for pagina in paginas] == [1, 2, 3]
+        assert "RP 12-33" in paginas[0]["text"]
+        assert store.stats() == {"arquivos": {"ok": 2}, "paginas": 5}
+
+
+def test_conteudo_alterado_e_reextraido(acervo):
+    extrair(acervo, "A")
+    caminho = os.path.join(acervo["A"], "perfis.pdf")
+    gerar_pdf_perfis(caminho, 4)
+    os.utime(caminho, ns=(1, 1))  # mtime diferente mesmo em sistemas de arquivos com resolução grossa
+
+    resumo = extrair(acervo, "A")
+    assert resumo["extraidos"] == 1 and resumo["inalterados"] == 1
+    with CorpusStore(acervo["banco"]) as store:
+        assert len(store.get_pages(caminho)) == 4
+        assert store.get_file(caminho)["num_pages"] == 4
+        assert store.stats()["paginas"] == 4 + 2  # páginas do conteúdo antigo descartadas
+
+
+def test_arquivo_so_tocado_reaproveita_as_paginas(acervo):
+    extrair(acervo, "A")
+    os.utime(os.path.join(acervo["A"], "outro.pdf"), ns=(1, 1))
+    resumo = extrair(acervo, "A")
+    assert resumo["reaproveitados"] == 1 and resumo["extraidos"] == 0
+
+
+def test_prune_so_remove_arquivos_da_pasta_percorrida(acervo):
+    extrair(acervo, "A")
+    resumo = extrair(acervo, "B")
+    assert resumo["reaproveitados"] == 1  # cópia de A/perfis.pdf
+
+    with CorpusStore(acervo["banco"]) as store:
+        assert store.get_file(os.path.join(acervo["A"], "outro.pdf")) is not None
+        assert store.stats() == {"arquivos": {"ok": 3}, "paginas": 5}
+
+    os.remove(os.path.join(acervo["A"], "perfis.pdf"))
+    extrair(acervo, "A")
+    with CorpusStore(acervo["banco"]) as store:
+        assert store.get_file(os.path.join(acervo["A"], "perfis.pdf")) is None
+        # As páginas continuam porque a cópia em B ainda as usa
+        assert len(store.get_pages(os.path.join(acervo["B"], "copia.pdf"))) == 3
+
+    os.remove(os.path.join(acervo["B"], "copia.pdf"))
+    extrair(acervo, "B")
+    with CorpusStore(acervo["banco"]) as store:
+        assert store.stats() == {"arquivos": {"ok": 1}, "paginas": 2}
+
+
+def test_outro_metodo_nao_sobrescreve_paginas_em_uso(acervo):
+    extrair(acervo, "A", method="PyPDF2")
+    extrair(acervo, "B", method="pdfplumber")  # mesmo conteúdo de A/perfis.pdf, outro método
+
+    with CorpusStore(acervo["banco"]) as store:
+        em_a = store.get_pages(os.path.join(acervo["A"], "perfis.pdf"))
+        em_b = store.get_pages(os.path.join(acervo["B"], "copia.pdf"))
+        assert {pagina["method"] for pagina in em_a} == {"PyPDF2"}
+        assert {pagina["method"] for pagina in em_b} == {"pdfplumber"}
+        assert len(em_a) == len(em_b) == 3
+
+
+def test_banco_anterior_e_migrado(acervo):
+    conn = sqlite3.connect(acervo["banco"])
+    conn.execute("CREATE TABLE files (path TEXT PRIMARY KEY, pdf_hash TEXT, size INTEGER, mtime_ns INTEGER, "
+                 "num_pages INTEGER, method TEXT, status TEXT, error TEXT, processed_at REAL)")
+    conn.execute("CREATE TABLE pages (pdf_hash TEXT, page INTEGER, method TEXT, text TEXT, char_count INTEGER, "
+                 "quality_score REAL, PRIMARY KEY (pdf_hash, page))")
+    conn.execute("INSERT INTO files VALUES ('/x.pdf', 'h', 1, 1, 1, 'best', 'ok', NULL, 0)")
+    conn.execute("INSERT INTO pages VALUES ('h', 1, 'PyPDF2', 'texto', 5, 1.0)")
+    conn.commit()
+    conn.close()
+
+    with CorpusStore(acervo["banco"]) as store:
+        assert store.get_pages("/x.pdf") == [
+            {"page": 1, "text": "texto", "char_count": 5, "method": "PyPDF2", "quality_score": 1.0}
+        ]
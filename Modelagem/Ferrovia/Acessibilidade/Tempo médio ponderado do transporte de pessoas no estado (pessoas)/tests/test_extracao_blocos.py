@@ -0,0 +1,206 @@
+import json
+import os
+import sys
+
+import pytest
+
+from chat_client import ChatClient
+from conftest import PASTA_PROJETO
+from extracao_blocos import ExtracaoEmBlocos, combinar_parciais, dividir_texto
+
+sys.path.insert(0, os.path.join(PASTA_PROJETO, "old"))
+from prompt_extracao_maxima import PromptExtracao
+
+
+@pytest.fixture(scope="module")
+def capitulo():
+    """Páginas de PARSED_LLM.json unidas como no notebook"""
+    with open(os.path.join(PASTA_PROJETO, "PARSED_LLM.json"), encoding="utf-8") as file:
+        return " \n\n ".join(registro["text"] for registro in json.load(file).values())
+
+
+def conferir_blocos(texto, blocos, max_chars, sobreposicao):
+    """Blocos dentro do limite, em ordem, sem lacunas e com sobreposição só no início de linha"""
+    assert blocos[0]["inicio"] == 0 and blocos[-1]["fim"] == len(texto)
+    assert [bloco["indice"] for bloco in blocos] == list(range(len(blocos)))
+    for bloco in blocos:
+        assert 0 < bloco["fim"] - bloco["inicio"] <= max_chars
+        assert bloco["texto"] == texto[bloco["inicio"]:bloco["fim"]].strip()
+    for anterior, bloco in zip(blocos, blocos[1:]):
+        assert anterior["inicio"] < bloco["inicio"] <= anterior["fim"]
+        assert anterior["fim"] - bloco["inicio"] <= sobreposicao
+        if bloco["inicio"] < anterior["fim"]:
+            assert texto[bloco["inicio"] - 1] == "\n"
+
+
+@pytest.mark.parametrize("max_chars, sobreposicao", [(4000, 300), (1500, 200), (800, 0)])
+def test_dividir_texto_cobre_o_capitulo(capitulo, max_chars, sobreposicao):
+    blocos = dividir_texto(capitulo, max_chars, sobreposicao)
+    assert len(blocos) > 1
+    conferir_blocos(capitulo, blocos, max_chars, sobreposicao)
+
+
+def test_dividir_texto_prefere_quebra_de_pagina():
+    paginas = ["\n".join(f"Página {pagina} linha {linha}" for linha in range(20)) for pagina in range(3)]
+    texto = " \n\n ".join(paginas)
+    blocos = dividir_texto(texto, len(paginas[0]) + 100, 0)
+    assert [bloco["texto"] for bloco in blocos] == [pagina.strip() for pagina in paginas]
+
+
+def test_dividir_texto_corta_secao_antes_de_paragrafo():
+    texto = "Introdução geral.\n\nParágrafo um.\n3.2 Demanda\nA demanda anual é de 470.930 passageiros."
+    blocos = dividir_texto(texto, 60, 0)
+    assert blocos[1]["texto"].startswith("3.2 Demanda")
+
+
+def test_dividir_texto_sem_quebras_e_casos_limite():
+    texto = "x" * 2500
+    blocos = dividir_texto(texto, 1000, 300)
+    assert [(bloco["inicio"], bloco["fim"]) for bloco in blocos] == [(0, 1000), (1000, 2000), (2000, 2500)]
+    assert dividir_texto("curto", 1000) == [{"indice": 0, "inicio": 0, "fim": 5, "texto": "curto"}]
+    assert dividir_texto("", 1000) == []
+    with pytest.raises(ValueError):
+        dividir_texto(texto, 0)
+
+
+def test_combinar_listas_sem_repetir_e_objetos_recursivos():
+    parciais = [
+        {"municipios": ["Betim", "Contagem"], "operacao": {"viagens_mes": 27}},
+        None,
+        {"municipios": ["Contagem", "Ibirité", "value1"], "operacao": {"dias_ano": 326}},
+    ]
+    resultado = combinar_parciais(parciais)
+    assert resultado["dados"] == {
+        "municipios": ["Betim", "Contagem", "Ibirité"],
+        "operacao": {"viagens_mes": 27, "dias_ano": 326}
+    }
+    assert resultado["conflitos"] == []
+
+
+def test_combinar_numeros_iguais_em_formatos_diferentes_nao_conflitam():
+    resultado = combinar_parciais([{"demanda": "470.930"}, {"demanda": 470930}, {"tarifa": "R$ 6,98"},
+                                   {"tarifa": 6.98, "valores": ["1.102", 1102]}])
+    assert resultado["dados"] == {"demanda": "470.930", "tarifa": "R$ 6,98", "valores": ["1.102"]}
+    assert resultado["conflitos"] == []
+
+
+def test_combinar_conflito_decidido_por_votos_e_empate_pelo_primeiro_bloco():
+    resultado = combinar_parciais([
+        {"bitola": "Métrica", "categoria": "Regional"},
+        {"bitola": "Larga", "categoria": "Metropolitano"},
+        {"bitola": "larga", "categoria": "null"},
+    ])
+    assert resultado["dados"] == {"bitola": "Larga", "categoria": "Regional"}
+    assert resultado["conflitos"] == [
+        {"campo": "bitola", "escolhido": "Larga", "valores": {'"Larga"': [1, 2], '"Métrica"': [0]}},
+        {"campo": "categoria", "escolhido": "Regional", "valores": {'"Regional"': [0], '"Metropolitano"': [1]}},
+    ]
+
+
+def test_combinar_sem_dados():
+    assert combinar_parciais([]) == {"dados": None, "conflitos": []}
+    assert combinar_parciais([None, {"campo": "value"}]) == {"dados": {"campo": None}, "conflitos": []}
+
+
+class ClienteFalso:
+    """Responde com o JSON que o teste associa a cada trecho do bloco"""
+
+    def __init__(self, respostas):
+        self.respostas = respostas
+        self.prompts = []
+
+    def chat(self, prompt, modelo=None, **kwargs):
+        self.prompts.append((prompt, kwargs))
+        for trecho, dados in self.respostas.items():
+            if trecho in prompt:
+                return {"sucesso": True, "resposta": f"<json>{json.dumps(dados)}</json>"}
+        return {"sucesso": False, "erro": "sem resposta"}
+
+
+def test_extrair_combina_os_blocos():
+    texto = "Página A\nDemanda: 7.760\n \n\n Página B\nMunicípios: Betim\n \n\n Página C sem dados"
+    cliente = ClienteFalso({"Página A": {"demanda": "7.760", "municipios": []},
+                            "Página B": {"demanda": 7760, "municipios": ["Betim"]}})
+    extrator = ExtracaoEmBlocos(cliente, "qwen3:1.7b", max_chars=30, sobreposicao=0, verbose=False)
+    resultado = extrator.extrair(texto, lambda bloco: f"Extraia:\n{bloco}", timeout=60)
+
+    assert resultado["dados"] == {"demanda": "7.760", "municipios": ["Betim"]}
+    assert [info["json_valido"] for info in resultado["blocos"]] == [True, True, False]
+    assert all(kwargs["stream"] and kwargs["excesso"] == "recusar" and kwargs["timeout"] == 60
+               for _, kwargs in cliente.prompts)
+
+
+class RespostaOllama:
+    """Resposta do proxy: JSON inteiro ou NDJSON lido com iter_lines"""
+
+    def __init__(self, dados, linhas=()):
+        self.dados = dados
+        self.linhas = linhas
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.dados
+
+    def iter_lines(self):
+        return iter(self.linhas)
+
+
+class SessaoOllama:
+    """Session falsa do proxy: /ollama/show do qwen3 e /chat com um JSON por bloco"""
+
+    def __init__(self, show):
+        self.show = show
+        self.payloads = []
+
+    def post(self, url, timeout=None, stream=False, **kwargs):
+        if url.endswith("/ollama/show"):
+            return RespostaOllama(self.show)
+        self.payloads.append(kwargs["json"])
+        resposta = '<json>{"municipios": ["Bloco %d"]}</json>' % len(self.payloads)
+        linhas = [json.dumps({"response": resposta}), json.dumps({"done": True, "eval_count": 12})]
+        return RespostaOllama(None, linhas)
+
+
+@pytest.mark.parametrize("show", [
+    {"model_info": {"qwen3.context_length": 40960}, "parameters": "temperature 0.6"},
+    {},  # servidor sem model_info: vale a janela da família em CONTEXTO_MODELOS
+])
+def test_extrair_em_blocos_com_o_prompt_contextualizado(capitulo, show):
+    client = ChatClient()
+    client._sessao = SessaoOllama(show)
+    prompts = PromptExtracao()
+    vazio = prompts.gerar_prompt_contextualizado("", "ferroviario")
+    # O prompt sem texto não cabe na janela padrão do Ollama (2048 tokens)
+    assert not client.orcamento.verificar(vazio, "qwen3:1.7b")["cabe"]
+
+    resultado = prompts.extrair_em_blocos(capitulo, client, "qwen3:1.7b", timeout=600)
+    num_ctx = resultado["num_ctx"]
+    assert 2048 < num_ctx <= 40960 and num_ctx % 2048 == 0
+    assert len(resultado["blocos"]) > 1 and all(info["json_valido"] for info in resultado["blocos"])
+    assert len(resultado["dados"]["municipios"]) == len(resultado["blocos"])
+    for payload in client._sessao.payloads:
+        assert payload["num_ctx"] == num_ctx
+        assert client.orcamento.verificar(payload["prompt"], "qwen3:1.7b", None, num_ctx)["cabe"]
+
+
+def test_escolher_num_ctx_respeita_o_informado_e_o_maximo():
+    client = ChatClient()
+    client._contextos["tinyllama:latest"] = {"maximo": None, "num_ctx": None}
+    montar = lambda bloco: "Instruções. " * 500 + bloco  # ~1715 tokens sem texto
+    assert ExtracaoEmBlocos(client, "tinyllama:latest", num_ctx=4096).escolher_num_ctx(montar) == 4096
+    # tinyllama só tem 2048 tokens: o bloco desejado não cabe e fica a janela máxima, que recusa o prompt
+    extrator = ExtracaoEmBlocos(client, "tinyllama:latest", verbose=False)
+    assert extrator.escolher_num_ctx(montar) == 2048
+    with pytest.raises(ValueError, match="num_ctx=2048"):
+        extrator.tamanho_bloco(montar)
+    # Texto curto: a janela só precisa comportar o próprio texto
+    client._contextos["qwen3:1.7b"] = {"maximo": None, "num_ctx": None}
+    assert ExtracaoEmBlocos(client, "qwen3:1.7b").escolher_num_ctx(montar, texto="x" * 100) == 4096
@@ -0,0 +1,49 @@
+import os
+import sys
+
+from conftest import PASTA_PROJETO
+
+sys.path.insert(0, os.path.join(PASTA_PROJETO, "old"))
+from exemplo_extracao_maxima import ExtracaoMaximaProcessor, IndiceOcorrencias, OcorrenciaRegex
+
+TEXTO = "Demanda: 45.000 passageiros/dia. Tarifa: R$ 4,50 (econômica). Receita anual: R$ 73.500.000"
+
+
+def test_contexto_so_e_recortado_quando_lido():
+    processor = ExtracaoMaximaProcessor()
+    original, chamadas = processor._extrair_contexto_local, []
+
+    def extrair_contexto(texto, inicio, fim):
+        chamadas.append((inicio, fim))
+        return original(texto, inicio, fim)
+
+    processor._extrair_contexto_local = extrair_contexto
+    monetarios = processor._aplicar_padroes_regex(TEXTO)["valores_monetarios"]
+    assert [item.grupos[0] for item in monetarios] == ["4,50", "73.500.000"]
+    assert chamadas == []
+
+    primeiro = monetarios[0]
+    assert primeiro.contexto == TEXTO[:primeiro.posicao_fim + 50].strip()
+    assert primeiro.contexto is primeiro.contexto
+    assert chamadas == [(primeiro.posicao_inicio, primeiro.posicao_fim)]
+
+
+def test_saida_traz_o_contexto_de_cada_valor():
+    resultado = ExtracaoMaximaProcessor().extrair_dados_maximos(TEXTO)
+    valores = resultado["dados_extraidos"]["valores_numericos"]
+    assert {valor["valor"] for valor in valores if valor["tipo"] == "monetario"} == {"4,50", "73.500.000"}
+    assert all(isinstance(valor["contexto"], str) and valor["contexto"] for valor in valores)
+    assert resultado["dados_extraidos"]["relacoes_dados"][0]["valor_monetario"] == "4,50"
+
+
+def ocorrencia(inicio, fim):
+    return OcorrenciaRegex(valor="x", grupos=(), posicao_inicio=inicio, posicao_fim=fim, confianca=1.0,
+                           texto="", extrair_contexto=lambda texto, inicio, fim: "")
+
+
+def test_indice_mais_proximo_e_dentro():
+    indice = IndiceOcorrencias({"a": [ocorrencia(0, 5), ocorrencia(100, 110)], "b": [ocorrencia(40, 45)]})
+    assert indice.mais_proximo(90, 95, "a") == ocorrencia(100, 110)
+    assert indice.mais_proximo(50, 55, "a", distancia=10) is None
+    assert [nome for nome, _ in indice.dentro(30, 50, 30)] == ["a", "b"]
+    assert indice.dentro(30, 50, 30, "a") == [ocorrencia(0, 5)]
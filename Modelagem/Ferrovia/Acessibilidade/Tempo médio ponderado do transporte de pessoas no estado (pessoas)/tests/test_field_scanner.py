@@ -0,0 +1,75 @@
+import json
+import os
+import re
+
+import pytest
+
+from benchmarks.bench_field_scanner import TEXTO_LONGO, TEXTO_ROTULADO, DetectorAntigo
+from conftest import PASTA_PROJETO
+from pdf_processor import DataStructureDetector, FieldScanner
+
+
+@pytest.fixture(scope="module")
+def paginas():
+    with open(os.path.join(PASTA_PROJETO, "PARSED_LLM.json"), encoding="utf-8") as file:
+        return [registro["text"] for registro in json.load(file).values()]
+
+
+TEXTOS_DE_BORDA = [
+    "",
+    TEXTO_ROTULADO.upper(),
+    TEXTO_ROTULADO.replace("\n", " "),
+    # Tarifas da econômica depois do rótulo da executiva: o .*? com re.DOTALL atravessa as seções
+    "Classe Econômica: geral\nClasse Executiva: diferenciada\nTarifa fixa: R$ 18,72\nTarifa quilométrica: R$ 0,2685",
+    # Rótulo que não casa na primeira posição e casa na seguinte
+    "Tempo de viagem: n/d\nTempo de viagem ida: 551 minutos\nTipo: x\nTipo de bitola: Larga",
+    "Demanda por ano: sem dado. Demanda por ano: 7.760 passageiros",
+    # Minúsculas que mudam o tamanho do texto ('İ'.lower() tem dois caracteres)
+    "İ Código: RP-12\nİ Extensão: 36 km\n" + TEXTO_ROTULADO,
+    TEXTO_LONGO + TEXTO_ROTULADO,
+]
+
+
+def test_extract_structured_data_igual_as_regex_antigas(paginas):
+    antigo, novo = DetectorAntigo(), DataStructureDetector(verbose=False)
+    for texto in paginas + [TEXTO_ROTULADO, TEXTO_ROTULADO * 3, TEXTO_LONGO] + TEXTOS_DE_BORDA:
+        assert novo.extract_structured_data(texto) == antigo.extract_structured_data(texto)
+
+
+def test_texto_rotulado_preenche_todos_os_campos():
+    dados = DataStructureDetector(verbose=False).extract_structured_data(TEXTO_ROTULADO)
+    assert dados["codigo"] == "FER-002" and dados["total_estacoes"] == 8
+    assert dados["municipios_atendidos"][-1] == {"ordem": 2, "municipio": "Uberlândia", "extensao_acumulada_km": 46.7}
+    assert dados["caracteristicas_operacionais"]["tempo_viagem_ida_volta_min"] == 1102
+    assert dados["tarifas"]["executiva"] == {"tarifa_fixa_reais": 18.72, "tarifa_quilometrica_reais": 0.2685}
+    assert dados["desempenho"] == {"pass_ano_km": 2.87, "receita_ano_km": 92.24}
+
+
+@pytest.mark.parametrize("texto", TEXTOS_DE_BORDA + [TEXTO_ROTULADO])
+def test_first_equivale_a_re_search(texto):
+    scanner = FieldScanner(DataStructureDetector.FIELDS)
+    hits = scanner.scan(texto)
+    for nome, (_, padrao) in DataStructureDetector.FIELDS.items():
+        esperado = re.search(padrao, texto, re.IGNORECASE)
+        obtido = scanner.first(nome, texto, hits)
+        assert (obtido and (obtido.start(), obtido.groups())) == (esperado and (esperado.start(), esperado.groups())), nome
+
+
+def test_first_a_partir_de_start():
+    scanner = FieldScanner({"tarifa_fixa": ("tarifa", r"Tarifa\s+fixa:\s*R\$\s*([\d,]+)")})
+    texto = "Tarifa fixa: R$ 6,98\nTarifa fixa: R$ 18,72"
+    hits = scanner.scan(texto)
+    assert scanner.first("tarifa_fixa", texto, hits).group(1) == "6,98"
+    assert scanner.first("tarifa_fixa", texto, hits, start=1).group(1) == "18,72"
+    assert scanner.first("tarifa_fixa", texto, hits, start=len(texto)) is None
+    assert scanner.has_label("TARIFA", hits) and not scanner.has_label("classe", hits)
+
+
+def test_numero_malformado_deixa_so_o_campo_de_fora():
+    texto = (TEXTO_ROTULADO.replace("470.930", "1.2.3,4,5").replace("R$ 6,98", "R$ 1,2,3")
+             .replace("2,87", "1.2.3,4,5"))
+    dados = DataStructureDetector(verbose=False).extract_structured_data(texto)
+    assert "demanda_ano" not in dados["caracteristicas_operacionais"]
+    assert dados["caracteristicas_operacionais"]["producao_quilometrica_km_ano"] == 164307
+    assert dados["tarifas"]["economica"] == {"tarifa_quilometrica_reais": 0.1447}
+    assert dados["desempenho"] == {"receita_ano_km": 92.24}
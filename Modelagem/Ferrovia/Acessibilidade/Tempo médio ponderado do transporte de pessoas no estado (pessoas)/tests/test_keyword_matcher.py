@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import unicodedata
+
+import pytest
+
+from conftest import PASTA_PROJETO
+from keyword_matcher import KeywordMatcher
+from pdf_processor import DataStructureDetector
+
+sys.path.insert(0, os.path.join(PASTA_PROJETO, "old"))
+from exemplo_extracao_maxima import ExtracaoMaximaProcessor
+
+
+def _sem_acento(char):
+    base = unicodedata.normalize("NFD", char.lower())[0]
+    return base if base.isascii() else char.lower()
+
+
+def busca_simples(texto, palavras, min_substring=4):
+    """Referência: str.find de cada palavra (com sobreposição) no texto minúsculo e sem acentos"""
+    normalizado = "".join(_sem_acento(char) for char in texto)
+    hits = {}
+    for palavra in palavras:
+        chave = "".join(_sem_acento(char) for char in palavra)
+        posicoes = []
+        indice = normalizado.find(chave)
+        while indice >= 0:
+            antes, depois = normalizado[indice - 1:indice], normalizado[indice + len(chave):indice + len(chave) + 1]
+            inteira = not (antes.isascii() and antes.isalnum()) and not (depois.isascii() and depois.isalnum())
+            if len(chave) >= min_substring or inteira:
+                posicoes.append(indice)
+            indice = normalizado.find(chave, indice + 1)
+        if posicoes:
+            hits[palavra] = posicoes
+    return hits
+
+
+@pytest.fixture(scope="module")
+def textos():
+    with open(os.path.join(PASTA_PROJETO, "PARSED_LLM.json"), encoding="utf-8") as file:
+        return [registro["text"] for registro in json.load(file).values()]
+
+
+@pytest.fixture(scope="module")
+def vocabularios():
+    dominios = ExtracaoMaximaProcessor().dominios_especificos
+    return {"estrutura": DataStructureDetector(verbose=False).keywords, **dominios}
+
+
+def test_find_igual_a_busca_simples_nos_textos_do_pef(textos, vocabularios):
+    palavras = [palavra for grupo in vocabularios.values() for palavra in grupo]
+    matcher = KeywordMatcher(vocabularios)
+    for texto in textos:
+        assert matcher.find(texto) == busca_simples(texto, palavras)
+
+
+def test_find_contem_a_triagem_antiga_por_substring(textos, vocabularios):
+    palavras = [palavra for grupo in vocabularios.values() for palavra in grupo if len(palavra) >= 4]
+    matcher = KeywordMatcher(palavras)
+    for texto in textos:
+        hits = matcher.find(texto)
+        texto_lower = texto.lower()
+        assert {palavra for palavra in palavras if palavra.lower() in texto_lower} <= set(hits)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Estação de trem e ESTACAO de metrô", {"estação": [0, 18], "metro": [29], "metrô": [29], "trem": [11]}),
+    ("passageiros por passageiro", {"passageiro": [0, 16], "passageiros": [0]}),
+    ("VLT na via; o ROI e a ferroviária", {"VLT": [0], "ROI": [14], "ferrovia": [22]}),
+    ("multivlt vltx", {}),
+    ("", {}),
+])
+def test_find_casos(texto, esperado):
+    matcher = KeywordMatcher(["estação", "trem", "metro", "metrô", "passageiro", "passageiros",
+                              "VLT", "ROI", "ferrovia"])
+    assert matcher.find(texto) == esperado
+    assert matcher.find(texto) == busca_simples(texto, matcher.groups[None])
+
+
+def test_group_counts_e_found():
+    matcher = KeywordMatcher({"ferroviario": ["estação", "trem", "trilho"], "financeiro": ["receita", "ROI"]})
+    hits = matcher.find("A receita da estação cobre o trem; a receita cresce.")
+    assert KeywordMatcher.counts(hits) == {"receita": 2, "estação": 1, "trem": 1}
+    assert matcher.found(hits, "ferroviario") == ["estação", "trem"]
+    assert matcher.group_counts(hits) == {"ferroviario": 2, "financeiro": 1}
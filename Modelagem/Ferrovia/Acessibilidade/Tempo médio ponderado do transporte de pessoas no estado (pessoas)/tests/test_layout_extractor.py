@@ -0,0 +1,95 @@
+import pytest
+
+from benchmarks.synthetic_pdf import gerar_pdf_perfil_colunas, gerar_pdf_perfis
+from pdf_processor import LayoutExtractor, PDFReader
+
+
+def extrair(caminho):
+    with PDFReader(caminho, verbose=False) as reader:
+        return reader.extract_layout(1, 1)[0]
+
+
+@pytest.fixture(scope="module")
+def linhas(tmp_path_factory):
+    """Perfil de LINHAS_PERFIL: cada linha é um único bloco, com dois pares em várias delas"""
+    return extrair(gerar_pdf_perfis(str(tmp_path_factory.mktemp("pdf") / "linhas.pdf"), 1))
+
+
+@pytest.fixture(scope="module")
+def colunas(tmp_path_factory):
+    return extrair(gerar_pdf_perfil_colunas(str(tmp_path_factory.mktemp("pdf") / "colunas.pdf")))
+
+
+def pares(resultado):
+    return {par["chave"]: par["valor"] for par in resultado["pares"]}
+
+
+def test_dois_rotulos_no_mesmo_bloco(linhas):
+    assert [(par["chave"], par["valor"]) for par in linhas["pares"][:4]] == [
+        ("Proposta", "Araguari/ Campos Altos"),
+        ("Código", "RP 12-33"),
+        ("Categoria", "Proposta Regional"),
+        ("Versão", "00"),
+    ]
+    assert pares(linhas) == {
+        "Proposta": "Araguari/ Campos Altos", "Código": "RP 12-33", "Categoria": "Proposta Regional",
+        "Versão": "00", "Características físicas": None, "Extensão (km)": "503", "Tipo bitola": "Métrica",
+        "Total de estações": "8", "Características operacionais": None, "Tempo de viagem ida (min)": "551",
+        "Tempo de viagem ida & volta (min)": "1.102", "Viagens (mês)": "27", "Dias de operação (ano)": "326",
+        "Demanda (ano)": "470.930", "Produção quilométrica (km/ano)": "164.307", "Desempenho da linha": None,
+        "Receita anual (R$)": "15.155.658", "Pass,ano/km": "2,87", "Receita,ano/km": "92,24",
+    }
+
+
+def test_duas_colunas(colunas):
+    valores = pares(colunas)
+    assert valores["Proposta"] == "Belo Horizonte/ Janaúba" and valores["Código"] == "RP 14-26"
+    assert valores["Categoria"] == "Proposta Regional" and valores["Versão"] == "00"
+    assert valores["Tipo de empreendimento"] == ["Greenfield", "Brownfield (via compartilhada com operação da carga)"]
+    assert valores["Tipo bitola"] == "Métrica (570,92 km)"
+    assert valores["Tempo de viagem ida & volta (min)"] == "1.490"
+    assert valores["Capacidade (PAX/viagem)"] == "569"
+
+
+def test_tabelas_das_duas_colunas(colunas):
+    tabelas = colunas["tabelas"]
+    assert [entrada["municipio"] for entrada in tabelas["municipios"]] == [
+        "Belo Horizonte", "Santa Luzia", "Vespasiano", "Araçaí", "Cordisburgo", "Curvelo", "Bocaiúva", "Montes Claros"
+    ]
+    assert tabelas["municipios"][-1]["km"] == "519,00"
+    assert tabelas["tarifas"] == {
+        "Classe Econômica": {"Tarifa fixa (R$)": "6,98", "Tarifa quilométrica (R$)": "0,1447"},
+        "Classe Executiva": {"Tarifa fixa (R$)": "18,72", "Tarifa quilométrica (R$)": "0,2685"},
+    }
+    assert [linha["Tipo carros"] for linha in tabelas["frota"]] == ["Locomotiva", "Carro de passageiros",
+                                                                    "Carros auxiliares"]
+    assert tabelas["frota"][0]["Quantidade/composição"] == "1"
+
+
+def palavras(texto, x=50.0, top=100.0):
+    """Palavras de uma linha, separadas por 3 pt (um único bloco)"""
+    resultado = []
+    for texto_palavra in texto.split():
+        largura = 5.0 * len(texto_palavra)
+        resultado.append({"text": texto_palavra, "x0": x, "x1": x + largura, "top": top, "bottom": top + 10})
+        x += largura + 3
+    return resultado
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Proposta: Araguari/ Campos Altos Código: RP 12-33", [("Proposta", "Araguari/ Campos Altos"), ("Código", "RP 12-33")]),
+    ("Extensão (km): 503 Tipo bitola: Métrica", [("Extensão (km)", "503"), ("Tipo bitola", "Métrica")]),
+    # Rótulo fora da lista: começa na última palavra com inicial maiúscula
+    ("Operador: Concessionária estadual Sede: Belo Horizonte", [("Operador", "Concessionária estadual"),
+                                                                ("Sede", "Belo Horizonte")]),
+    ("Proposta: Código: RP 12-33", [("Proposta", None), ("Código", "RP 12-33")]),
+])
+def test_pairs_separa_no_inicio_do_rotulo_seguinte(texto, esperado):
+    assert LayoutExtractor()._pairs(palavras(texto)) == esperado
+
+
+def test_to_text(colunas):
+    texto = LayoutExtractor.to_text(colunas)
+    assert "Proposta: Belo Horizonte/ Janaúba" in texto
+    assert "Classe Executiva - Tarifa fixa (R$): 18,72" in texto
+    assert "Municípios atendidos: Belo Horizonte 0,00; Santa Luzia 23,45" in texto
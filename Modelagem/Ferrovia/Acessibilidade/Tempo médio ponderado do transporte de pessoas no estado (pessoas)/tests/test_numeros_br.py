@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from numeros_br import normalizar_colunas, numero_br, parse_array, parse_series
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("470.930", 470930),
+    ("1.102", 1102),
+    ("15.155.658", 15155658),
+    ("0,1447", 0.1447),
+    ("2,87", 2.87),
+    ("2.87", 2.87),
+    ("R$ 8,45", 8.45),
+    ("R$ 92.484.188,00", 92484188.0),
+    ("7.760 passageiros", 7760),
+    ("36 (km)", 36),
+    ("144* (min)", 144),
+    ("-3,5", -3.5),
+    ("Extensão: 52.", 52),
+    # Milhar separado por espaço: exatamente três dígitos depois de cada espaço
+    ("9 967 663,00", 9967663.0),
+    ("459 475,00", 459475.0),
+    # Quebras do PDF dentro de um valor com milhar e vírgula (PARSED_LLM.json)
+    ("R$ 5 3.094,19", 53094.19),
+    ("R$ 1 00.705,72", 100705.72),
+    ("R$ 6 6.490,63", 66490.63),
+    ("R$ 7 .707.015,67", 7707015.67),
+])
+def test_numero_br(texto, esperado):
+    assert numero_br(texto) == pytest.approx(esperado)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("551 1.102", 551),
+    ("8 12,5", 8),
+    ("3, 4 e 5", 3),
+    ("2020-2030", 2020),
+])
+def test_numero_br_nao_junta_numeros_distintos(texto, esperado):
+    assert numero_br(texto) == esperado
+
+
+@pytest.mark.parametrize("texto", [".5", "1,234.56", "12.34,5", "1.2.3", "sem número", "", "['6,98', '18,72']"])
+def test_numero_br_rejeita_formatos_ambiguos(texto):
+    with pytest.raises(ValueError):
+        numero_br(texto)
+
+
+def test_numero_br_tipo_int():
+    assert numero_br("15.155.658", int) == 15155658
+    assert isinstance(numero_br("15.155.658", int), int)
+    assert numero_br("2,5", int) == 2.5
+    assert numero_br(7.0, int) == 7
+    with pytest.raises(ValueError):
+        numero_br(float("nan"))
+
+
+def test_parse_array_igual_a_numero_br_celula_a_celula():
+    valores = ["470.930", "2,87", "2,87", None, "", "551 1.102", "1,234.56", "R$ 5 3.094,19",
+               "[1, 4, 2]", 326, 6.98, "326", np.nan]
+    resultado, nulos = parse_array(valores)
+    for valor, convertido, nulo in zip(valores, resultado, nulos):
+        try:
+            esperado = numero_br(valor)
+        except (ValueError, TypeError):
+            esperado = None
+        if esperado is None or (isinstance(valor, float) and np.isnan(valor)):
+            assert nulo, valor
+        else:
+            assert not nulo and convertido == pytest.approx(esperado), valor
+
+
+def test_parse_array_coluna_numerica():
+    resultado, nulos = parse_array(pd.Series([1.5, None, 3], dtype="float64"))
+    assert resultado[0] == 1.5 and resultado[2] == 3
+    assert list(nulos) == [False, True, False]
+
+
+def test_parse_series_e_normalizar_colunas():
+    serie = parse_series(pd.Series(["1.102", "2,5", None], name="km"), int)
+    assert serie.dtype == "Int64" and serie.name == "km"
+    assert serie[0] == 1102 and serie.isna().tolist() == [False, True, True]
+
+    df = pd.DataFrame({"Demanda": ["7.760", "58.240", None], "Proposta": ["RP 12-33", "Linha A", "Linha B"]})
+    normalizado = normalizar_colunas(df)
+    assert normalizado["Demanda"].dtype == "Int64"
+    assert normalizado["Demanda"].tolist()[:2] == [7760, 58240]
+    assert normalizado["Proposta"].tolist() == df["Proposta"].tolist()
@@ -0,0 +1,220 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+import pdf_processor
+from benchmarks.synthetic_pdf import gerar_pdf_perfis
+from pdf_processor import PageClassifier, PageTextCache, PDFNotMaterializedError, PDFReader, sniff_pdf
+
+
+@pytest.fixture(scope="module")
+def pdf_perfis(tmp_path_factory):
+    return str(gerar_pdf_perfis(str(tmp_path_factory.mktemp("pdf") / "perfis.pdf"), 60))
+
+
+@pytest.fixture
+def rss(monkeypatch):
+    """RSS simulado: o teste define o valor devolvido por current_rss_mb"""
+    medida = {"mb": 100.0}
+    monkeypatch.setattr(pdf_processor, "current_rss_mb", lambda: medida["mb"])
+    return medida
+
+
+def test_pico_de_memoria_medido_sem_limite(pdf_perfis, rss):
+    reader = PDFReader(pdf_perfis, verbose=False)
+    rss["mb"] = 321.0
+    assert len(list(reader.iter_text("PyPDF2", 1, 5))) == 5
+    assert reader.memory_report["peak_rss_mb"] == 321.0
+    assert reader.memory_report["pages"] == 5
+    assert reader.memory_report["flushes"] == 0
+
+
+def test_liberacao_que_resolve_nao_espaca_as_seguintes(pdf_perfis, rss, monkeypatch):
+    reader = PDFReader(pdf_perfis, verbose=False, memory_limit_mb=500)
+    rss["mb"] = 900.0
+    # A liberação traz a memória abaixo do limite; a página seguinte volta a estourar
+    liberar = reader._release_memory
+
+    def liberar_e_baixar(method_name):
+        rss["mb"] = 100.0
+        liberar(method_name)
+        rss["mb"] = 900.0
+
+    monkeypatch.setattr(reader, "_release_memory", liberar_e_baixar)
+    assert len(list(reader.iter_text("pdfplumber", 1, 10))) == 10
+    assert reader.memory_report["flushes"] == 10
+    assert not reader.memory_report["limit_unmet"]
+
+
+def test_limite_inatingivel_com_metodo_explicito_espaca_liberacoes(pdf_perfis, rss, capsys):
+    reader = PDFReader(pdf_perfis, verbose=True, memory_limit_mb=500)
+    rss["mb"] = 900.0
+    textos = list(reader.iter_text("pdfplumber", 1, 60))
+
+    assert [page for page, _ in textos] == list(range(1, 61))
+    assert all(text for _, text in textos)
+    # Uma liberação na 1ª página e depois no máximo uma a cada FLUSH_INTERVAL páginas
+    assert reader.memory_report["flushes"] == 1 + (60 - 1) // PDFReader.FLUSH_INTERVAL
+    assert reader.memory_report["limit_unmet"] and reader.memory_report["fallback"]
+    saida = capsys.readouterr().out
+    assert saida.count("não pode ser respeitado com pdfplumber") == 1
+
+
+def test_limite_inatingivel_em_best_usa_so_bibliotecas_leves(pdf_perfis, rss):
+    reader = PDFReader(pdf_perfis, verbose=False, memory_limit_mb=500)
+    rss["mb"] = 900.0
+    paginas = list(reader.iter_pages(1, 10, method="best", threshold=1.1))
+    assert len(paginas) == 10
+    assert all(pagina["backends_tried"] == [{"method": "PyPDF2", "score": pagina["quality_score"]}]
+               for pagina in paginas[1:])
+    assert reader.memory_report["flushes"] == 1
+
+
+TEXTO_CORRIDO = ("O estudo de demanda considerou as zonas de tráfego do estado. " * 8
+                 + "A localização de cada proposta aparece no mapa do Anexo D.")
+
+
+@pytest.mark.parametrize("texto, mapa", [
+    (TEXTO_CORRIDO, False),
+    ("Mapa de situação\nBelo Horizonte\nSanta Luzia\n" + TEXTO_CORRIDO, True),
+    (TEXTO_CORRIDO + "\nLegenda: linha proposta", True),
+    ("Mapa\nBetim\nIbirité\nNova Lima", True),
+    ("Betim Ibirité Nova Lima Sabará", False),
+])
+def test_page_classifier_is_map(texto, mapa):
+    assert PageClassifier(verbose=False).is_map(texto) is mapa
+
+
+def test_page_classifier_mencao_a_mapa_nao_e_pagina_de_mapa():
+    classificador = PageClassifier(verbose=False)
+    assert classificador.classify(TEXTO_CORRIDO)["label"] == PageClassifier.OTHER
+    assert classificador.classify("Mapa de situação\nBetim")["label"] == PageClassifier.MAP
+
+
+def test_scan_em_sessao_do_chamador_nao_fecha_o_documento(pdf_perfis):
+    classificador = PageClassifier(verbose=False)
+    with PDFReader(pdf_perfis, verbose=False) as reader:
+        paginas = classificador.scan(reader, 1, 3)
+        assert reader._session_active and "PyPDF2" in reader._handles
+    assert not reader._session_active and not reader._handles
+    assert [pagina["label"] for pagina in paginas] == [PageClassifier.START] * 3
+    assert paginas[0]["codigo"] == "RP 12-33"
+
+    # Sem sessão do chamador, scan abre e fecha a sua
+    reader = PDFReader(pdf_perfis, verbose=False)
+    assert len(classificador.scan(reader, 1, 2)) == 2
+    assert not reader._session_active and not reader._handles
+
+
+PONTEIRO_LFS = (b"version https://git-lfs.github.com/spec/v1\n"
+                b"oid sha256:4d7a214614ab2935c943f9e0ff69d22eadbb8f32b1258daaa5e2ca24d17e2393\n"
+                b"size 48213577\n")
+
+
+def test_sniff_pdf_ponteiro_lfs(tmp_path):
+    caminho = tmp_path / "PNL.pdf"
+    caminho.write_bytes(PONTEIRO_LFS)
+    info = sniff_pdf(caminho)
+    assert info["status"] == "lfs_pointer"
+    assert info["lfs_size"] == 48213577 and info["tamanho"] == len(PONTEIRO_LFS)
+    assert info["versao"] is None
+
+    with pytest.raises(PDFNotMaterializedError, match="git lfs pull"):
+        PDFReader(str(caminho), verbose=False)
+
+
+def test_sniff_pdf_valido_truncado_e_invalido(pdf_perfis, tmp_path):
+    info = sniff_pdf(pdf_perfis)
+    assert info["status"] == "pdf" and info["versao"] and info["motivo"] is None
+
+    conteudo = Path(pdf_perfis).read_bytes()
+    truncado = tmp_path / "truncado.pdf"
+    truncado.write_bytes(conteudo[:len(conteudo) // 2])
+    assert sniff_pdf(truncado)["status"] == "invalido"
+    assert "truncado" in sniff_pdf(truncado)["motivo"]
+
+    # Lixo antes do cabeçalho (permitido nos primeiros 1024 bytes)
+    com_prefixo = tmp_path / "prefixo.pdf"
+    com_prefixo.write_bytes(b"\0" * 500 + conteudo)
+    assert sniff_pdf(com_prefixo)["status"] == "pdf"
+
+    html = tmp_path / "pagina.pdf"
+    html.write_bytes(b"<html><body>Not Found</body></html>")
+    assert sniff_pdf(html)["motivo"] == "cabeçalho %PDF- não encontrado"
+
+    # Arquivo inválido não é confundido com ponteiro LFS
+    for caminho in (truncado, html):
+        with pytest.raises(ValueError) as erro:
+            PDFReader(str(caminho), verbose=False)
+        assert not isinstance(erro.value, PDFNotMaterializedError)
+
+
+@pytest.fixture(scope="module")
+def serial(pdf_perfis):
+    """Páginas 3 a 40 extraídas no processo atual, por método"""
+    reader = PDFReader(pdf_perfis, verbose=False)
+    return {method: reader.extract_range(3, 40, workers=1, method=method) for method in ("PyPDF2", "best")}
+
+
+@pytest.mark.parametrize("method", ["PyPDF2", "best"])
+def test_extract_range_paralelo_igual_ao_serial(pdf_perfis, serial, method):
+    # Blocos de 5 páginas e no máximo 2 pendentes: os blocos terminam fora de ordem e são remontados
+    paralelo = PDFReader(pdf_perfis, verbose=False).extract_range(3, 40, workers=3, method=method,
+                                                                  chunk_size=5, max_in_flight=2)
+    assert [record["page"] for record in paralelo] == list(range(3, 41))
+    assert paralelo == serial[method]
+
+
+def test_extract_range_paralelo_grava_no_cache(pdf_perfis, serial, tmp_path):
+    cache = PageTextCache(tmp_path / "paginas.sqlite")
+    paralelo = PDFReader(pdf_perfis, verbose=False, cache=cache).extract_range(3, 40, workers=2, method="PyPDF2")
+    assert paralelo == serial["PyPDF2"]
+    assert cache.stats()["pages"] == 38
+
+    # Segunda leitura, serial e com o cache preenchido pelos processos: mesmo resultado
+    relido = PDFReader(pdf_perfis, verbose=False, cache=cache).extract_range(3, 40, method="PyPDF2")
+    assert relido == serial["PyPDF2"]
+    assert cache.stats()["pages"] == 38
+
+
+@pytest.mark.parametrize("boilerplate", [None, True])
+@pytest.mark.parametrize("method", ["PyPDF2", "best"])
+def test_iter_pages_prefetch_mantem_a_ordem(pdf_perfis, method, boilerplate):
+    esperado = list(PDFReader(pdf_perfis, verbose=False, boilerplate=boilerplate).iter_pages(1, 30, method=method))
+    reader = PDFReader(pdf_perfis, verbose=False, boilerplate=boilerplate)
+    paginas = list(reader.iter_pages(1, 30, method=method, prefetch=3))
+    assert [pagina["page"] for pagina in paginas] == list(range(1, 31))
+    assert paginas == esperado
+    if boilerplate:
+        assert not any("Plano Estratégico Ferroviário" in pagina["text"] for pagina in paginas)
+    assert reader._session_depth == 0 and reader._handles == {}
+
+
+def test_iter_pages_prefetch_encerra_quando_o_consumidor_para(pdf_perfis):
+    threads = threading.active_count()
+    reader = PDFReader(pdf_perfis, verbose=False)
+    paginas = reader.iter_pages(1, 60, method="PyPDF2", prefetch=2)
+    assert [next(paginas)["page"] for _ in range(3)] == [1, 2, 3]
+    assert threading.active_count() == threads + 1  # produtor bloqueado com a fila cheia
+
+    paginas.close()
+    assert threading.active_count() == threads
+    assert reader._session_depth == 0 and reader._handles == {}
+
+
+def test_iter_pages_prefetch_repassa_o_erro_do_produtor(pdf_perfis, monkeypatch):
+    reader = PDFReader(pdf_perfis, verbose=False)
+    extrair = reader._make_record
+
+    def falhar_na_quinta(page_num, text, method_name):
+        if page_num == 5:
+            raise RuntimeError("página corrompida")
+        return extrair(page_num, text, method_name)
+
+    monkeypatch.setattr(reader, "_make_record", falhar_na_quinta)
+    paginas = []
+    with pytest.raises(RuntimeError, match="página corrompida"):
+        for pagina in reader.iter_pages(1, 10, method="PyPDF2", prefetch=2):
+            paginas.append(pagina["page"])
+    assert paginas == [1, 2, 3, 4]
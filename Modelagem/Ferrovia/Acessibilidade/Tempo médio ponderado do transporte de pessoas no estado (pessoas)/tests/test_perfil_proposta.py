@@ -0,0 +1,152 @@
+import json
+import os
+
+import pytest
+
+from conftest import PASTA_PROJETO
+from perfil_proposta import PerfilPropostaExtractor
+
+TARIFAS = ("Classe Econômica Classe Executiva\n"
+           "{fixa} Tarifa fixa (R$) 18,72 Tarifa fixa (R$)\n"
+           "0,1447 Tarifa quilométrica (R$) 0,2685 Tarifa quilométrica (R$)\n")
+
+
+def test_tarifas_por_classe():
+    registro = PerfilPropostaExtractor().extract(TARIFAS.format(fixa="6,98"))["registro"]
+    assert registro["Tarifa do serviço"] == {
+        "Classe Econômica": {"Tarifa fixa (R$)": 6.98, "Tarifa quilométrica (R$)": 0.1447},
+        "Classe Executiva": {"Tarifa fixa (R$)": 18.72, "Tarifa quilométrica (R$)": 0.2685},
+    }
+
+
+def test_tarifa_malformada_fica_de_fora():
+    registro = PerfilPropostaExtractor().extract(TARIFAS.format(fixa="1.2.3,4,5"))["registro"]
+    assert registro["Tarifa do serviço"]["Classe Econômica"] == {"Tarifa quilométrica (R$)": 0.1447}
+    assert registro["Tarifa do serviço"]["Classe Executiva"]["Tarifa fixa (R$)"] == 18.72
+
+
+@pytest.fixture(scope="module")
+def fichas():
+    with open(os.path.join(PASTA_PROJETO, "PARSED_LLM.json"), encoding="utf-8") as file:
+        return {pagina: registro["text"] for pagina, registro in json.load(file).items()}
+
+
+def test_todas_as_fichas_do_pef_completas_pelas_regras(fichas):
+    resultados = PerfilPropostaExtractor(verbose=False).extract_many(fichas)
+    assert all(resultado["completo"] and resultado["cobertura"] == 1.0 for resultado in resultados.values())
+    layouts = [resultado["layout"] for resultado in resultados.values()]
+    assert layouts.count("regional") == 12 and layouts.count("metropolitano") == 7
+
+
+def test_ficha_regional(fichas):
+    perfil = PerfilPropostaExtractor(verbose=False).extract(fichas["209"])
+    registro = perfil["registro"]
+    assert registro["Proposta"] == "Araguari/ Campos Altos"
+    assert (registro["Código"], registro["Versão"]) == ("RP 12-33", "00")
+    assert registro["Tipo de empreendimento"] == ["Greenfield", "Brownfield (via compartilhada com operação da carga)"]
+    assert registro["Extensão (km)"] == 503.0 and registro["Tipo bitola"] == "Métrica"
+    assert registro["Total de estações"] == 8
+    assert registro["Estações atendidas"][:3] == ["Araguari", "Uberlândia", "Uberaba"]
+    assert registro["Extensão acumulada (km)"][-1] == 503.0
+    assert registro["Tempo de viagem ida & volta (min)"] == 1102 and registro["Demanda (ano)"] == 470930
+    assert registro["Receita anual (R$)"] == 15155658.0 and registro["Pass.ano/km"] == 2.87
+    assert registro["Tipo carros"] == ["Locomotiva", "Carro de passageiros", "Carros auxiliares"]
+    assert registro["Quantidade/composição"] == [1, 4, 2] and registro["Capacidade (PAX/viagem)"] == 285
+    assert perfil["campos"]["Headway médio (min/hora pico manhã)"]["status"] == "nao_aplicavel"
+    assert perfil["confianca_media"] == 1.0
+
+
+def test_ficha_metropolitana(fichas):
+    perfil = PerfilPropostaExtractor(verbose=False).extract(fichas["233"])
+    registro = perfil["registro"]
+    assert (registro["Código"], registro["Categoria"]) == ("Linha A", "Metropolitana")
+    assert registro["Extensão (km)"] == 52.0 and registro["Tempo de ciclo (ida + volta) (min)"] == 144
+    assert registro["Headway médio (min/hora pico manhã)"] == 10.45
+    assert registro["Demanda total (dia útil)"] == 58240 and registro["Tarifa do serviço"] == 8.45
+    assert registro["Frota Total (operacional + reserva)"] == 64
+    assert registro["Quantidade/composição"] == [14, 4, 2]
+    assert perfil["campos"]["Demanda (ano)"]["status"] == "nao_aplicavel"
+    # "R$ 7 .707.015,67": número remontado, com confiança menor
+    assert registro["Receita mês (R$)"] == 7707015.67
+    assert perfil["campos"]["Receita mês (R$)"] == {"status": "extraido", "confianca": 0.8}
+
+
+def test_campo_sem_valor_fica_ausente(fichas):
+    texto = fichas["209"].replace("Demanda (ano): 470.930", "Demanda (ano): n/d")
+    perfil = PerfilPropostaExtractor(verbose=False).extract(texto)
+    assert perfil["registro"]["Demanda (ano)"] is None
+    assert perfil["campos"]["Demanda (ano)"] == {"status": "ausente", "confianca": 0.0}
+    assert perfil["faltantes"] == ["Demanda (ano)"] and not perfil["completo"]
+    assert 0.9 < perfil["cobertura"] < 1.0
+
+
+def test_texto_sem_ficha():
+    perfil = PerfilPropostaExtractor(verbose=False).extract("Capítulo 3 - Metodologia")
+    assert perfil["layout"] is None and perfil["cobertura"] == 0.0 and not perfil["completo"]
+    assert perfil["faltantes"] == PerfilPropostaExtractor.CAMPOS_FORMULARIO
+
+
+class ClienteLLM:
+    """ChatClient falso: devolve a resposta definida pelo teste e guarda os prompts"""
+
+    def __init__(self, resposta):
+        self.resposta = resposta
+        self.chamadas = []
+
+    def chat(self, prompt, modelo=None, **kwargs):
+        self.chamadas.append((prompt, modelo, kwargs))
+        return self.resposta
+
+
+def sem_valor(texto):
+    """Ficha 209 com dois campos ilegíveis (o rótulo continua no texto)"""
+    return (texto.replace("Demanda (ano): 470.930", "Demanda (ano): n/d")
+            .replace("Capacidade (PAX/viagem): 285", "Capacidade (PAX/viagem):"))
+
+
+def test_hibrido_ficha_completa_nao_chama_o_llm(fichas):
+    cliente = ClienteLLM({"sucesso": True, "resposta": ""})
+    perfil = PerfilPropostaExtractor(verbose=False).extract_hybrid(fichas["209"], cliente, "qwen3:1.7b")
+    assert perfil["completo"] and perfil["llm"] is None and cliente.chamadas == []
+
+
+def test_hibrido_pede_so_os_campos_faltantes(fichas):
+    resposta = ('<think>A demanda é 470.930 e a capacidade 285.</think>\n'
+                '<json>{"Demanda (ano)": "470.930", "Capacidade (PAX/viagem)": 285,}</json>')
+    cliente = ClienteLLM({"sucesso": True, "resposta": resposta, "tempo_resposta": 1.5, "interrompido": True})
+    perfil = PerfilPropostaExtractor(verbose=False).extract_hybrid(sem_valor(fichas["209"]), cliente, "qwen3:1.7b",
+                                                                  timeout=60)
+
+    [(prompt, modelo, kwargs)] = cliente.chamadas
+    assert modelo == "qwen3:1.7b" and kwargs == {"timeout": 60, "stream": True}
+    formulario = prompt.split("# Formulario JSON:\n<json>")[1].split("</json>")[0]
+    assert json.loads(formulario) == {"Demanda (ano)": None, "Capacidade (PAX/viagem)": None}
+    contexto = prompt.split("# Fonte de dados:\n<contexto>")[1].split("</contexto>")[0]
+    assert "Demanda (ano): n/d" in contexto and "Capacidade (PAX/viagem):" in contexto
+    assert "Tarifa fixa" not in contexto and "Araguari" not in contexto
+    assert len(prompt) < len(fichas["209"])
+
+    assert perfil["registro"]["Demanda (ano)"] == 470930 and perfil["registro"]["Capacidade (PAX/viagem)"] == 285
+    assert perfil["campos"]["Demanda (ano)"] == {"status": "llm", "confianca": PerfilPropostaExtractor.CONFIANCA_LLM}
+    assert perfil["completo"] and perfil["faltantes"] == [] and perfil["confianca_media"] < 1.0
+    assert perfil["llm"]["campos_preenchidos"] == ["Demanda (ano)", "Capacidade (PAX/viagem)"]
+    assert perfil["llm"]["json_valido"] and perfil["llm"]["interrompido"]
+
+
+def test_hibrido_resposta_parcial_ou_com_erro(fichas):
+    texto = sem_valor(fichas["209"])
+    extrator = PerfilPropostaExtractor(verbose=False)
+
+    parcial = extrator.extract_hybrid(texto, ClienteLLM({"resposta": '<json>{"Demanda (ano)": null}</json>'}), "m")
+    assert parcial["faltantes"] == ["Demanda (ano)", "Capacidade (PAX/viagem)"] and parcial["llm"]["json_valido"]
+
+    com_erro = extrator.extract_hybrid(texto, ClienteLLM({"erro": "Timeout", "codigo": "timeout"}), "m")
+    assert com_erro["llm"]["erro"] == "Timeout" and not com_erro["completo"]
+    assert com_erro["registro"]["Demanda (ano)"] is None
+
+
+def test_hibrido_campo_sem_rotulo_nao_chama_o_llm(fichas):
+    texto = fichas["209"].replace("Demanda (ano): 470.930", "")
+    cliente = ClienteLLM({"sucesso": True, "resposta": ""})
+    perfil = PerfilPropostaExtractor(verbose=False).extract_hybrid(texto, cliente, "qwen3:1.7b")
+    assert perfil["faltantes"] == ["Demanda (ano)"] and perfil["llm"] is None and cliente.chamadas == []
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import PASTA_PROJETO
+
+pytest.importorskip("fastapi")
+sys.path.insert(0, os.path.join(PASTA_PROJETO, "ollama-docker-fastapi"))
+import app as proxy
+
+
+class RespostaOllama:
+    """requests.Response do /api/generate com stream=True: linhas NDJSON e o registro do close()"""
+
+    def __init__(self, chunks, status_code=200):
+        self.linhas = [json.dumps(chunk).encode() for chunk in chunks]
+        self.status_code = status_code
+        self.text = "model not found"
+        self.lidas = 0
+        self.fechada = False
+
+    def iter_lines(self):
+        for linha in self.linhas:
+            self.lidas += 1
+            yield linha
+
+    def close(self):
+        self.fechada = True
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """Substitui o requests.post do proxy; o teste define a resposta em ollama['resposta']"""
+    chamadas = {"resposta": None, "requests": []}
+
+    def post(url, json=None, stream=False, timeout=None):
+        chamadas["requests"].append({"url": url, "json": json, "stream": stream, "timeout": timeout})
+        return chamadas["resposta"]
+
+    monkeypatch.setattr(proxy.requests, "post", post)
+    return chamadas
+
+
+CHUNKS = [{"response": "<json>", "done": False}, {"response": "{}", "done": False},
+          {"response": "</json>", "done": False}, {"response": "", "done": True, "eval_count": 3}]
+
+
+def ler(gerador, limite=None):
+    async def consumir():
+        recebidos = []
+        async for linha in gerador:
+            recebidos.append(linha)
+            if len(recebidos) == limite:
+                break
+        await gerador.aclose()  # o que o Starlette faz quando o cliente desconecta
+        return recebidos
+
+    return asyncio.run(consumir())
+
+
+def test_stream_repassa_as_linhas_em_ordem(ollama):
+    resposta = ollama["resposta"] = RespostaOllama(CHUNKS)
+    resposta.linhas.insert(2, b"")  # linha vazia (keep-alive) não é repassada
+    linhas = ler(proxy.stream_ollama({"model": "qwen3:1.7b", "stream": True}, 60))
+    assert [json.loads(linha) for linha in linhas] == CHUNKS
+    assert all(linha.endswith("\n") for linha in linhas)
+    assert resposta.fechada
+    assert ollama["requests"][0]["stream"] is True and ollama["requests"][0]["timeout"] == 60
+
+
+def test_cliente_que_desconecta_fecha_a_conexao_com_o_ollama(ollama):
+    resposta = ollama["resposta"] = RespostaOllama(CHUNKS)
+    linhas = ler(proxy.stream_ollama({"model": "qwen3:1.7b", "stream": True}, 60), limite=1)
+    assert len(linhas) == 1
+    assert resposta.fechada and resposta.lidas == 1
+
+
+def test_erro_do_ollama_vira_um_chunk_final(ollama):
+    resposta = ollama["resposta"] = RespostaOllama([], status_code=404)
+    linhas = ler(proxy.stream_ollama({"model": "inexistente", "stream": True}, 60))
+    assert [json.loads(linha) for linha in linhas] == [{"erro": "Erro do Ollama: model not found", "done": True}]
+    assert resposta.fechada
+
+
+def test_chat_com_stream_responde_ndjson(ollama):
+    from fastapi.testclient import TestClient
+
+    ollama["resposta"] = RespostaOllama(CHUNKS)
+    with TestClient(proxy.app) as client:
+        resposta = client.post("/chat", json={"modelo": "qwen3:1.7b", "prompt": "Extraia.", "stream": True,
+                                              "num_ctx": 8192, "timeout": 60})
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(linha) for linha in resposta.text.splitlines()] == CHUNKS
+    enviado = ollama["requests"][0]["json"]
+    assert enviado["stream"] is True and enviado["options"]["num_ctx"] == 8192